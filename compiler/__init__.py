@@ -1,5 +1,8 @@
 from asmgenerator import *
 from compilererror import CompilerError
+from compileserver import CompileServer
 from dccompiler import DCCompiler
 from dcparser import DCParser
 from dctokenizer import DCTokenizer
+from modulecache import ModuleCache
+from optimizerstatistics import OptimizerStatistics, writeStatisticsJson
@@ -1,4 +1,9 @@
+import copy
+
 class Instruction(object):
+	# whether the optimizer should try its rules on this instruction again
+	dirty = True
+
 	def __init__(self, opcode, a, b = None):
 		self.opcode = opcode
 		self.a = a
@@ -11,6 +16,15 @@ class Instruction(object):
 			return 1 + self.a.size()
 		return 1 + self.a.size() + self.b.size()
 
+	def cycles(self):
+		'''Returns the cycles the instruction takes; an IF instruction that fails takes one more.'''
+
+		if self.opcode == Comment or self.opcode == Label:
+			return 0
+
+		# every next word takes a cycle to read
+		return opcodeCycles[self.opcode] + self.size() - 1
+
 	def asm(self):
 		return self.opcode(self.a, self.b)
 
@@ -55,7 +69,17 @@ def Comment(a, b):
 	return '\n; %s' % a
 
 def Label(a, b):
-	return '\n\t:%s' % a.asm()
+	# not a.asm(): the LabelReference is shared with the jumps, which may use the address
+	return '\n\t:%s' % a.name
+
+# cycles of each instruction on the DCPU-16, without reading next words
+opcodeCycles = {
+	SET: 1, AND: 1, BOR: 1, XOR: 1,
+	ADD: 2, SUB: 2, MUL: 2, SHL: 2, SHR: 2,
+	DIV: 3, MOD: 3,
+	IFE: 2, IFN: 2, IFG: 2, IFB: 2,
+	JSR: 2,
+}
 
 
 class Register(object):
@@ -77,7 +101,6 @@ Z = Register('Z')
 I = Register('I')
 J = Register('J')
 Registers = A, B, C, X, Y, Z, I, J
-TempStorage = A
 RepeatCounter = B
 
 class SimpleValue(object):
@@ -137,91 +160,303 @@ class Pointer(object):
 		return '[%s]' % self.location
 
 class DataField(object):
-	def __init__(self, location):
-		dataFieldAddress(location)
-		self.location = location
+	# start of the data fields; set by count once the program size is known
+	memoryOffset = 0
+
+	def __init__(self, context, location):
+		self.address = dataFieldAddress(context, location)
 
 	def size(self):
 		return 1
 	
 	def asm(self):
-		return '[%s]' % (dataFieldAddress(self.location) + memoryOffset)
+		return '[%s]' % (self.address + self.memoryOffset)
 
 class Literal(object):
 	def __init__(self, value):
 		self.value = value % 0x10000
 
 	def size(self):
+		# 0x00-0x1f are encoded in the operand itself
 		if self.value < 0x20:
-			return 1
-		return 0
+			return 0
+		return 1
 
 	def asm(self):
 		return '%s' % self.value
 
 class LabelReference(object):
+	# whether the label is at an address below 0x20; set by count
+	short = False
+	address = None
+
 	def __init__(self, name):
 		self.name = name.replace('.', '__dot__')
 
 	def size(self):
-		return 1 # TODO
+		if self.short:
+			return 0
+		return 1
 
 	def asm(self):
+		# assemblers encode labels as a next word, so short ones are written as their address
+		if self.short:
+			return '%d' % self.address
 		return self.name
 
+class MemoryAddress(object):
+	'''
+	The address of a word after the code, such as the address of a data field.
+	The value is only known once count has set memoryOffset.
+	'''
 
-def count(program):
-	global memoryOffset
+	memoryOffset = 0
+	short = False
 
-	instructions = 0
-	codeWords = 0
-	address = 0
+	def __init__(self, offset):
+		self.offset = offset
 
-	for instruction in program:
-		size = instruction.size()
+	def value(self):
+		return (self.offset + self.memoryOffset) % 0x10000
+
+	def size(self):
+		if self.short:
+			return 0
+		return 1
+
+	def asm(self):
+		return '%d' % self.value()
+
+class FreeMemoryStart(MemoryAddress):
+	'''The address of the first word after the data fields; count sets the offset.'''
+
+	def __init__(self):
+		MemoryAddress.__init__(self, 0)
+
+
+class CompilationContext(object):
+	'''
+	The state of a single compilation: the label counter and the addresses of
+	the data fields. Compilations with separate contexts do not affect each other.
+	'''
+
+	def __init__(self):
+		self.thislabel = -1
+
+		self.memoryAddresses = {}
+		self.memoryAddress = 0
 
-		instruction.address = address
+		# start of the data fields; known after the program has been counted
+		self.memoryOffset = 0
 
-		if size == 0:
+		# (name, address) of every data field used while recording function code
+		self.dataFieldUses = None
+
+def count(context, program):
+	'''
+	Returns the number of instructions, code words and data words of the
+	program, and sets the address of every instruction. Labels and memory
+	addresses below 0x20 fit in the operand itself; as that makes the code
+	shorter and moves other labels below 0x20, the sizes are determined by
+	repeating until nothing changes. Sizes only ever shrink, so this ends.
+	'''
+
+	labelReferences = []
+	memoryAddresses = []
+	dataFields = []
+
+	for instruction in program:
+		if instruction.opcode == Label:
 			continue
 
-		instructions += 1
-		codeWords += size
-		address += size
+		for operand in (instruction.a, instruction.b):
+			if isinstance(operand, LabelReference):
+				# code may be reused from an earlier compilation, so start over
+				operand.short = False
+				labelReferences.append(operand)
+			elif isinstance(operand, MemoryAddress):
+				operand.short = False
+				memoryAddresses.append(operand)
 
-	memoryOffset = codeWords
-	return instructions, codeWords, memoryAddress
+				if isinstance(operand, FreeMemoryStart):
+					operand.offset = context.memoryAddress
+			elif isinstance(operand, DataField):
+				dataFields.append(operand)
 
-thislabel = -1
+	changed = True
 
-def nextlabel(name = 'unnamed'):
-	global thislabel
-	
-	thislabel += 1
+	while changed:
+		instructions = 0
+		address = 0
+		labels = {}
+
+		for instruction in program:
+			instruction.address = address
+
+			if instruction.opcode == Label:
+				labels[instruction.a.name] = address
+
+			size = instruction.size()
+
+			if size == 0:
+				continue
+
+			instructions += 1
+			address += size
 
-	return LabelReference('%s_label_%X' % (name, thislabel))
+		codeWords = address
+		changed = False
 
-memoryAddresses = {}
-memoryAddress = 0
+		for operand in labelReferences:
+			operand.address = labels.get(operand.name)
 
-def dataFieldAddress(dataField):
-	global memoryAddress
+			if not operand.short and operand.address is not None and operand.address < 0x20:
+				operand.short = True
+				changed = True
 
+		for operand in memoryAddresses:
+			operand.memoryOffset = codeWords
+
+			if not operand.short and operand.value() < 0x20:
+				operand.short = True
+				changed = True
+
+	context.memoryOffset = codeWords
+
+	for operand in dataFields:
+		operand.memoryOffset = codeWords
+
+	return instructions, codeWords, context.memoryAddress
+
+def cost(program):
+	'''
+	Returns the (cycles, words) it takes to run the instructions of program
+	once, the cycles first; code generators compare alternatives by it.
+	'''
+
+	return sum(instruction.cycles() for instruction in program), sum(instruction.size() for instruction in program)
+
+def usesRegister(program, register):
+	'''Returns whether an instruction in program uses the register, directly or through a pointer.'''
+
+	for instruction in program:
+		for operand in (instruction.a, instruction.b):
+			if operand is register or getattr(operand, 'register', None) is register:
+				return True
+
+	return False
+
+def loopDepths(program):
+	'''
+	Returns the number of loops around each instruction of program, where a
+	loop is the code from a label to a jump back to it.
+	'''
+
+	depths = [0] * len(program)
+	labels = {}
+
+	for position, instruction in enumerate(program):
+		if instruction.opcode == Label:
+			labels[instruction.a.name] = position
+		elif instruction.opcode == SET and isinstance(instruction.a, PC) and isinstance(instruction.b, LabelReference):
+			start = labels.get(instruction.b.name)
+
+			if start is not None:
+				for inside in xrange(start, position + 1):
+					depths[inside] += 1
+
+	return depths
+
+def nextlabel(context, name = 'unnamed'):
+	context.thislabel += 1
+
+	return LabelReference('%s_label_%X' % (name, context.thislabel))
+
+def dataFieldAddress(context, dataField):
 	if dataField.constant:
 		raise Exception('Internal error: cannot assign address to constant')
 
-	if dataField.name not in memoryAddresses:
-		if memoryAddress == 0x1000:
+	if dataField.name not in context.memoryAddresses:
+		if context.memoryAddress == 0x1000:
 			# Use 0x1000 as an arbitrary limit. This allows for 4096 words of space.
 			# Allowing more is not useful right now; more code memory would be required.
 			dataField.error('Ran out of external address space for data fields!')
 
-		memoryAddresses[dataField.name] = memoryAddress
-		memoryAddress += 1
+		context.memoryAddresses[dataField.name] = context.memoryAddress
+		context.memoryAddress += 1
+
+	if context.dataFieldUses is not None:
+		context.dataFieldUses.append((dataField.name, context.memoryAddresses[dataField.name]))
+
+	return context.memoryAddresses[dataField.name]
 
-	return memoryAddresses[dataField.name]
+class FunctionCode(object):
+	'''
+	The code of a single function, together with the labels and data field
+	addresses it was generated with, so a later compilation can reuse it.
+	'''
+
+	def __init__(self, code, firstLabel, labelCount, dataFieldUses):
+		self.code = code
+		self.firstLabel = firstLabel
+		self.labelCount = labelCount
+		self.dataFieldUses = dataFieldUses
+
+def recordFunctionCode(context, generate):
+	'''Calls generate and returns the code it returns as a FunctionCode.'''
+
+	firstLabel = context.thislabel + 1
+	context.dataFieldUses = []
+
+	try:
+		code = generate()
+		return FunctionCode(code, firstLabel, context.thislabel + 1 - firstLabel, context.dataFieldUses)
+	finally:
+		context.dataFieldUses = None
+
+def restoreFunctionCode(context, functionCode, datafields):
+	'''
+	Prepares recorded function code for use in the current compilation, giving
+	its labels the numbers they would get if the code was generated now.
+	Returns None if the data fields used by the code have different addresses.
+	'''
+
+	for name, address in functionCode.dataFieldUses:
+		if name not in datafields or dataFieldAddress(context, datafields[name]) != address:
+			return None
+
+	offset = context.thislabel + 1 - functionCode.firstLabel
+	lastLabel = functionCode.firstLabel + functionCode.labelCount
+
+	# a label and the instructions referencing it may share a LabelReference
+	renamed = set()
+
+	for instruction in functionCode.code:
+		for operand in (instruction.a, instruction.b):
+			if not isinstance(operand, LabelReference) or id(operand) in renamed:
+				continue
+
+			renamed.add(id(operand))
+
+			if operand.name.startswith('func_') or operand.name.startswith('ret_') or '_label_' not in operand.name:
+				continue
+
+			name, number = operand.name.rsplit('_label_', 1)
+			number = int(number, 16)
+
+			if functionCode.firstLabel <= number < lastLabel:
+				operand.name = '%s_label_%X' % (name, number + offset)
+
+	context.thislabel += functionCode.labelCount
+
+	return functionCode.code
+
+def transform(context, datafields, functions, generate=None):
+	'''
+	Returns the program for the given functions. generate is called to get the
+	code of each function; by default the function's code is generated directly.
+	'''
 
-def transform(datafields, functions):
 	program = []
 
 	# TODO: do we need to null-initialize fields?
@@ -235,27 +470,33 @@ def transform(datafields, functions):
 	#			program.append(Asm('MOV direct,#data', 'ACC', datafield.default))
 	#			program.append(Asm('MOVX @DPTR,A'))
 
-	program += startCode
+	# the optimizer changes instructions in place, so every program gets its own copy
+	program += copy.deepcopy(startCode)
 
 	for function in functions.values():
 		index = len(program)
-		program += function.transformToAsm()
+
+		if generate is None:
+			program += function.transformToAsm(context)
+		else:
+			program += generate(function)
+
+		if len(program) > index:
+			# the code may be optimized already, but not together with the code before it
+			program[index].dirty = True
 
 	return program
 
-def programToAsm(program, options):
-	global memoryOffset
-	lines = []
-	codeAddressAliases = []
+def writeAsm(context, program, outputfile):
+	'''Writes the assembly for the program to outputfile, one instruction at a time.'''
 
-	ignore, codeWords, ignore = count(program)
+	ignore, codeWords, ignore = count(context, program)
 
 	for instruction in program:
-		lines.append(instruction.asm())
-
-	lines.append('\n')
+		outputfile.write(instruction.asm())
+		outputfile.write('\n')
 
-	return '\n'.join(lines)
+	outputfile.write('\n')
 
 # data
 
@@ -1,4 +1,6 @@
 from asmgenerator import *
+from controlflowgraph import ControlFlowGraph, pseudoOpcodes, skipOpcodes
+from peepholerules import ruleIndex
 from pprint import pprint
 
 class AsmOptimizer(object):
@@ -6,45 +8,219 @@ class AsmOptimizer(object):
 	The AsmOptimizer optimizes a given assembly program for size.
 	In nearly all cases, a smaller program is faster than an equivalent
 	larger program.
+
+	When fragment is True, the program is the code of a single function. Its
+	first label is an entry point, and labels referenced but not defined in the
+	fragment are assumed to be defined elsewhere in the final program.
+
+	When statistics is an OptimizerStatistics, every rule application is
+	counted in it. New labels are numbered by the CompilationContext.
 	'''
 
 	#condJumps = ('JZ rel', 'JNZ rel', 'JC rel', 'JNC rel', 'JB bit,rel', 'JNB bit,rel', 'JBC bit,rel', 'CJNE A,direct,rel', 'CJNE A,#data,rel', 'CJNE Rn,#data,rel', 'CJNE @Ri,#data,rel', 'DJNZ Rn,rel', 'DJNZ direct,rel')
 	#uncondJumps = ('AJMP addr11', 'LJMP addr16', 'SJMP rel')
 	#jumps = condJumps + uncondJumps
 
-	def __init__(self, program, options):
+	# skip instructions and the skip instruction with the opposite condition
+	invertedOpcodes = {IFE: IFN, IFN: IFE}
+
+	def __init__(self, context, program, options, fragment=False, statistics=None):
+		self.context = context
 		self.program = program
 		self.options = options
+		self.fragment = fragment
+		self.statistics = statistics
+		self.buffer = None
+
+		# the ControlFlowGraph of the program, until the program changes
+		self.graph = None
+
+		# instructions are dirty until the rules found nothing to do with them
+		self.analysisNeeded = True
+
+		if statistics:
+			statistics.startRun()
 
 	def doPass(self):
+		'''
+		Applies the optimizations once, and returns whether anything changed.
+		The label and dead code analysis is only redone when the previous pass
+		changed the control flow, and the rules are only tried at positions
+		around instructions that changed. Passes give the same result as when
+		every pass tries everything everywhere.
+		'''
+
+		modified = False
+
+		threadJumps = self.tryThreadJumps
+		invertBranches = self.tryInvertBranches
+		eliminateDeadCode = self.tryEliminateDeadCode
+
+		if self.statistics:
+			self.statistics.startPass(self.codeWords())
+
+			threadJumps = self.statistics.counted(threadJumps, self.codeWords)
+			invertBranches = self.statistics.counted(invertBranches, self.codeWords)
+			eliminateDeadCode = self.statistics.counted(eliminateDeadCode, self.codeWords)
+
+		if self.analysisNeeded:
+			self.analysisNeeded = False
+
+			self.determineInstructionLocations()
+			self.locateLabels()
+			self.mergeLabels()
+
+			if threadJumps():
+				# jumped over code may now be dead
+				self.analysisNeeded = True
+				modified = True
+
+			if invertBranches():
+				self.analysisNeeded = True
+				modified = True
+
+			if self.analysisNeeded:
+				self.locateLabels()
+
+			if self.tryRemoveDeadLabels():
+				# labels may now be next to each other
+				self.analysisNeeded = True
+
+			if eliminateDeadCode():
+				# removed jumps may leave labels unused
+				self.analysisNeeded = True
+				modified = True
+
+		modified |= self.applyRules()
+
+		return modified
+
+	def applyRules(self):
+		'''
+		Tries the rules at every position where one of the two instructions the
+		rules look at changed since the rules were last tried there. The rules
+		only depend on those instructions, so they cannot match anywhere else.
+		'''
+
 		modified = False
-		self.pos = 0
+		buffer = self.buffer = InstructionBuffer(self.program)
+
+		while not buffer.atEnd():
+			if not (buffer.get(0).dirty or buffer.canGet(1) and buffer.get(1).dirty):
+				buffer.advance()
+				continue
+
+			before = buffer.window()
+
+			changed = self.tryRemoveComment()
+
+			if self.applyMatchingRules():
+				changed = True
+				modified = True
 
-		self.determineInstructionLocations()
-		self.locateLabels()
-		self.mergeLabels()
-		self.tryRemoveDeadLabels()
+			if not changed:
+				buffer.get(0).dirty = False
+				buffer.advance()
+				continue
 
-		modified |= self.tryEliminateDeadCode()
+			# try again around the change in the next pass
+			after = buffer.window()
 
-		while self.pos < len(self.program):
-			self.tryRemoveComment()
+			for instruction in before + after:
+				if self.changesControlFlow(instruction):
+					self.analysisNeeded = True
 
-			modified |= self.tryOptimizePushLocation()
-			modified |= self.tryOptimizePushPop()
-			modified |= self.tryOptimizePushDiscard()
-			modified |= self.tryOptimizeDiscardPush()
-			modified |= self.tryOptimizePeekPop()
-			modified |= self.tryOptimizeSetPC()
-			modified |= self.tryOptimizeTailCall()
-			modified |= self.tryOptimizeNoop()
+			for instruction in after:
+				instruction.dirty = True
 
-			self.pos += 1
+			buffer.advance()
 
-		self.pos = 0
+		self.program[:] = buffer.instructions()
+		self.buffer = None
+		self.graph = None
 
 		return modified
 
+	def applyMatchingRules(self):
+		'''
+		Applies the rules at the current position, in the order of the rule
+		table. Only the rules indexed under the opcode of the current instruction
+		are tried; when a rule changes the program, the rules after it are
+		looked up again for the instruction now at the current position.
+		'''
+
+		buffer = self.buffer
+		applied = False
+		nextRule = 0
+
+		# the rules would change which instruction a skip skips
+		if buffer.skippable():
+			return False
+
+		while not buffer.atEnd():
+			for order, rule in ruleIndex.candidates(buffer.get(0).opcode):
+				if order < nextRule:
+					continue
+
+				instructions = rule.match(buffer)
+				words = 0
+
+				if instructions is not None:
+					# rules only change the instructions they matched, so the words
+					# they save can be counted there instead of in the whole program
+					following = buffer.remaining() - len(instructions)
+					words -= sum(instruction.size() for instruction in instructions)
+
+					rule.rewrite(buffer, *instructions)
+
+					words += buffer.codeWords(buffer.remaining() - following)
+
+				if self.statistics:
+					self.statistics.record(rule.name, instructions is not None, words)
+
+				if instructions is not None:
+					applied = True
+					nextRule = order + 1
+					break
+			else:
+				break
+
+		return applied
+
+	def changesControlFlow(self, instruction):
+		'''Returns whether changing the instruction may change labels or reachable code.'''
+
+		return instruction.opcode in (Label, JSR, IFE, IFN, IFG, IFB) or isinstance(instruction.a, PC)
+
+	def removeInstructions(self, keep):
+		'''
+		Removes the instructions for which keep returns False, and marks the
+		instructions next to them for the peephole rules. Returns whether any
+		instruction was removed.
+		'''
+
+		instructions = []
+		removed = False
+
+		for instruction in self.program:
+			if not keep(instruction):
+				removed = True
+				continue
+
+			if removed:
+				# the rules look at this instruction together with the one before it
+				instruction.dirty = True
+				removed = False
+
+			instructions.append(instruction)
+
+		if len(instructions) == len(self.program):
+			return False
+
+		self.program[:] = instructions
+		self.graph = None
+		return True
+
 	def determineInstructionLocations(self):
 		'''
 		Calculates the current address for each instruction.
@@ -67,223 +243,331 @@ class AsmOptimizer(object):
 				self.labels[instruction.a.name] = instruction
 
 	def mergeLabels(self):
-		for label in self.labels:
-			sourceLabel = self.labels[label].a.name
-			index = self.program.index(self.labels[label])
+		# label name -> the last label of the run of consecutive labels it starts
+		targetLabels = {}
+		run = []
 
-			if self.program[index + 1].opcode != Label:
+		for instruction in self.program:
+			if instruction.opcode == Label:
+				run.append(instruction.a.name)
 				continue
 
-			while self.program[index + 1].opcode == Label:
-				index += 1
+			for sourceLabel in run[:-1]:
+				targetLabels[sourceLabel] = run[-1]
 
-			targetLabel = self.program[index].a.name
+			run = []
 
-			for instruction in self.program:
-				if isinstance(instruction.a, LabelReference) and instruction.a.name == sourceLabel:
-					instruction.a.name = targetLabel
-				if isinstance(instruction.b, LabelReference) and instruction.b.name == sourceLabel:
-					instruction.b.name = targetLabel
+		if not targetLabels:
+			return
+
+		self.graph = None
+
+		for instruction in self.program:
+			if instruction.opcode == Label:
+				# the merged labels are left unused, and removed as dead labels
+				continue
+
+			# references may be shared with the label, so they are replaced rather than renamed
+			if isinstance(instruction.a, LabelReference) and instruction.a.name in targetLabels:
+				instruction.a = LabelReference(targetLabels[instruction.a.name])
+				instruction.dirty = True
+			if isinstance(instruction.b, LabelReference) and instruction.b.name in targetLabels:
+				instruction.b = LabelReference(targetLabels[instruction.b.name])
+				instruction.dirty = True
 
 	def tryRemoveDeadLabels(self):
 		for label in self.labels:
 			self.labels[label].targeted = False
 
+		if self.fragment:
+			for instruction in self.program:
+				if instruction.opcode == Label:
+					instruction.targeted = True
+					break
+
 		for instruction in self.program:
 			if instruction.opcode in (Label, ):
 				continue
 			elif instruction.opcode == JSR:
-				self.labels[instruction.a.name].targeted = True
+				if not self.isExternal(instruction.a):
+					self.labels[instruction.a.name].targeted = True
 			elif isinstance(instruction.b, LabelReference) and instruction.b.name in self.labels:
 				self.labels[instruction.b.name].targeted = True
 
-		for label in self.labels:
-			if not self.labels[label].targeted:
-				index = self.program.index(self.labels[label])
-				self.remove(index, index)
+		return self.removeInstructions(lambda instruction: instruction.opcode != Label or instruction.targeted)
 
 	def tryEliminateDeadCode(self):
-		locationsToVisit = [0]
+		reachable = self.controlFlowGraph().reachableBlocks()
 
 		for instruction in self.program:
 			instruction.reachable = False
 
-		while locationsToVisit:
-			location = locationsToVisit.pop()
+		for block in reachable:
+			for instruction in block.instructions:
+				instruction.reachable = True
 
-			instruction = self.program[location]
-			if instruction.reachable:
-				continue
+		return self.removeInstructions(lambda instruction: instruction.reachable)
 
-			instruction.reachable = True
-
-			# quick hack
-			if instruction.opcode in (IFE, IFN, IFG, IFB):
-				locationsToVisit.append(location + 2)
-			elif instruction.opcode in (JSR,):
-				locationsToVisit.append(self.program.index(self.labels[instruction.a.name]))
-			elif isinstance(instruction.a, PC):
-				if instruction.opcode != SET:
-					raise Exception("Internal error: optimizer bailing out on unpredictable jump opcode")
-				if isinstance(instruction.b, Pop):
-					continue
-				if not isinstance(instruction.b, LabelReference):
-					print instruction.asm()
-					raise Exception("Internal error: optimizer bailing out on unpredictable jump target")
+	def tryThreadJumps(self):
+		'''
+		Makes jumps go straight to the final target of a chain of jumps, and
+		replaces pushing a constant that a skip instruction then pops and tests,
+		and skip instructions that only test constants, with a jump to where the
+		test leads.
+		'''
+
+		modified = self.threadJumpChains(self.controlFlowGraph())
+		modified |= self.threadKnownTests(self.controlFlowGraph())
+
+		return modified
+
+	def threadJumpChains(self, graph):
+		modified = False
 
-				locationsToVisit.append(self.program.index(self.labels[instruction.b.name]))
+		for instruction in self.program:
+			if not self.isJump(instruction):
 				continue
 
-			locationsToVisit.append(location + 1)
+			target = instruction.b
+			visited = set()
 
-		location = 0
+			while isinstance(target, LabelReference) and target.name not in visited:
+				visited.add(target.name)
 
-		modified = False
+				position = graph.destination(target.name)
+				if position is None or position == len(self.program):
+					break
+
+				next = self.program[position]
+				if not (next.opcode == SET and isinstance(next.a, PC) and isinstance(next.b, (LabelReference, Pop))):
+					break
 
-		while location < len(self.program):
-			if self.program[location].reachable:
-				location += 1
+				target = next.b
+
+			if isinstance(target, Pop):
+				instruction.b = Pop()
+			elif target.name != instruction.b.name:
+				instruction.b = LabelReference(target.name)
 			else:
-				del self.program[location]
-				modified = True
+				continue
+
+			instruction.dirty = True
+			modified = True
+			self.graph = None
 
 		return modified
 
-	def tryRemoveComment(self):
-		if self.get(0).opcode == Comment:
-			self.remove(0, 0)
+	def threadKnownTests(self, graph):
+		program = self.program
 
-	def tryOptimizePushLocation(self):
-		if not (self.canGet(1)):
-			return False
+		# position -> instructions replacing the instruction there
+		replacements = {}
+		# position -> name of a new label before the instruction there
+		newLabels = {}
 
-		push = self.get(0)
-		other = self.get(1)
+		for position, push in enumerate(program):
+			if push.opcode in skipOpcodes and isinstance(push.a, Literal) and isinstance(push.b, Literal):
+				# the test itself, with nothing to pop
+				value = None
+			elif push.opcode == SET and isinstance(push.a, Push) and isinstance(push.b, Literal):
+				value = push.b.value
+			else:
+				continue
+			if graph.isSkippable(position):
+				continue
 
-		if not (push.opcode == SET and isinstance(push.a, Push) and isinstance(push.b, Literal)):
-			return False
+			if value is None:
+				replaced = [position]
+				test = position
+			elif position + 1 < len(program) and self.isJump(program[position + 1]):
+				# SET PUSH, k; SET PC, label
+				replaced = [position, position + 1]
+				test = graph.destination(program[position + 1].b.name)
+			else:
+				# SET PUSH, k followed by the test
+				replaced = [position]
+				test = graph.nextInstruction(position)
 
-		if other.opcode in (JSR, Label) or isinstance(other.a, (Push, Peek, Pop, PC, SP)) or isinstance(other.b, (Pop, Peek, Push, PC, SP)):
-			return False
+			if test is None or test == len(program):
+				continue
 
-		if not(isinstance(push.b, Literal)) and push.b.asm() == other.a.asm():
+			outcome = self.testOutcome(program[test], value)
+			if outcome is None:
+				continue
+
+			conditional = graph.nextInstruction(test)
+			if conditional == len(program):
+				continue
+
+			if outcome:
+				jump = program[conditional]
+
+				if jump.opcode == SET and isinstance(jump.a, PC) and isinstance(jump.b, Pop):
+					target = Pop()
+				elif self.isJump(jump):
+					target = LabelReference(jump.b.name)
+				else:
+					target = self.labelBefore(test + 1, conditional, newLabels)
+			else:
+				if conditional + 1 == len(program):
+					continue
+
+				target = self.labelBefore(conditional + 1, graph.nextInstruction(conditional), newLabels)
+
+			replacements[replaced[0]] = [Instruction(SET, PC(), target)]
+			for other in replaced[1:]:
+				replacements[other] = []
+
+		if not replacements:
 			return False
 
-		self.remove(0, 0)
-		self.insert(1, push)
+		self.rewrite(replacements, newLabels)
 		return True
 
-	def tryOptimizePushDiscard(self):
-		if not self.canGet(1):
-			return False
+	def testOutcome(self, test, value):
+		'''
+		Returns whether the skip instruction test succeeds when it pops value,
+		or only tests constants if value is None; None if that is not known.
+		'''
 
-		if not (self.get(1).opcode == ADD and isinstance(self.get(1).a, SP) and isinstance(self.get(1).b, Literal) and self.get(1).b.value >= 1):
-			return False
+		if test.opcode not in skipOpcodes:
+			return None
 
-		if not (self.get(0).opcode in (SET, MOD, AND, BOR, XOR) and isinstance(self.get(0).a, Push) and not isinstance(self.get(0).b, (Push, Pop))):
-				return False
+		operands = []
 
-		self.get(1).b.value -= 1
-		self.remove(0, 0)
-		return True
+		for operand in (test.a, test.b):
+			if isinstance(operand, Pop):
+				operands.append(value)
+			elif isinstance(operand, Literal):
+				operands.append(operand.value)
+			else:
+				return None
 
-	def tryOptimizeDiscardPush(self):
-		if not self.canGet(1):
-			return False
+		# both operands pop, or neither does while there is a value
+		if isinstance(test.a, Pop) == isinstance(test.b, Pop) and value is not None:
+			return None
 
-		discard = self.get(0)
+		a, b = operands
 
-		if not (discard.opcode == ADD and isinstance(discard.a, SP) and isinstance(discard.b, Literal) and discard.b.value == 1):
-			return False
+		if test.opcode == IFE:
+			return a == b
+		elif test.opcode == IFN:
+			return a != b
+		elif test.opcode == IFG:
+			return a > b
+		else:
+			return a & b != 0
 
-		push = self.get(1)
+	def labelBefore(self, start, end, newLabels):
+		'''
+		Returns a reference to a label between positions start and end, where
+		only labels and comments are. Adds a new label before end if there is
+		none.
+		'''
 
-		if not (push.opcode == SET and isinstance(push.a, Push)):
-			return False
+		for instruction in self.program[start:end]:
+			if instruction.opcode == Label:
+				return LabelReference(instruction.a.name)
 
-		self.remove(0, 0)
-		push.a = Peek()
-		return True
+		if end not in newLabels:
+			newLabels[end] = nextlabel(self.context, 'thread').name
 
-	def tryOptimizePeekPop(self):
-		if not self.canGet(1):
-			return False
+		return LabelReference(newLabels[end])
 
-		peek = self.get(0)
-		pop = self.get(1)
+	def tryInvertBranches(self):
+		'''
+		Removes conditional jumps over a single instruction by inverting the
+		skip instruction, so IFE x, y; SET PC, label; z; :label becomes
+		IFN x, y; z. DCPU-16 1.1 has no inverse of IFG and IFB. Also removes
+		conditional jumps to the next instruction, keeping the stack effect of
+		the skip instruction.
+		'''
 
-		if not (peek.opcode in (SET, ADD, SUB, MUL, DIV, MOD, SHL, SHR, AND, BOR, XOR) and isinstance(peek.a, Peek)):
-			return False
+		graph = self.controlFlowGraph()
+		program = self.program
 
-		if not (pop.opcode == SET and isinstance(pop.b, Pop)) or isinstance(pop.a, (Peek, Push)):
-			return False
+		replacements = {}
 
-		if not (peek.b.asm() == pop.a.asm()):
-			return False
+		for position, test in enumerate(program):
+			if test.opcode not in skipOpcodes or graph.isSkippable(position):
+				continue
+			if position + 1 == len(program) or not self.isJump(program[position + 1]):
+				continue
 
-		pop.opcode = peek.opcode
-		self.remove(0, 0)
-		return True
+			label = graph.labelPositions.get(program[position + 1].b.name)
+			if label is None or label < position:
+				continue
 
-	def tryOptimizePushPop(self):
-		if not self.canGet(1):
-			return False
+			skipped = graph.nextInstruction(position + 1)
 
-		if not (self.get(0).opcode == SET and isinstance(self.get(0).a, Push)):
-			return False
-		if isinstance(self.get(0).b, (Push, Peek, Pop)):
-			return False
-		if not isinstance(self.get(1).b, Pop):
-			return False
+			if label < skipped:
+				# the jump goes to the next instruction either way
+				if isinstance(test.a, Push) or isinstance(test.b, Push):
+					continue
 
-		source = self.get(0)
-		target = self.get(1)
+				pops = len([operand for operand in (test.a, test.b) if isinstance(operand, Pop)])
 
-		self.remove(0,1)
+				replacements[position] = [Instruction(ADD, SP(), Literal(pops))] if pops else []
+				replacements[position + 1] = []
+			elif test.opcode in self.invertedOpcodes and skipped < label < graph.nextInstruction(skipped) and program[skipped].opcode not in skipOpcodes:
+				test.opcode = self.invertedOpcodes[test.opcode]
+				test.dirty = True
 
-		if source.b.asm() != target.a.asm():
-			self.insert(0, Instruction(target.opcode, target.a, source.b))
-		
-		return True
+				replacements[position + 1] = []
 
-	def tryOptimizeTailCall(self):
-		if not self.canGet(1):
+		if not replacements:
 			return False
 
-		if not (self.get(0).opcode == JSR and self.get(1).opcode == SET and isinstance(self.get(1).a, PC) and isinstance(self.get(1).b, Pop)):
-			return False
+		self.rewrite(replacements, {})
+		return True
 
-		instr = self.get(0)
+	def isJump(self, instruction):
+		'''Returns whether the instruction is SET PC, label.'''
 
-		instr.opcode = SET
-		instr.b = instr.a
-		instr.a = PC()
-		return True
+		return instruction.opcode == SET and isinstance(instruction.a, PC) and isinstance(instruction.b, LabelReference)
 
-	def tryOptimizeSetPC(self):
-		if not self.canGet(1):
-			return False
+	def rewrite(self, replacements, newLabels):
+		'''
+		Replaces the instruction at each position in replacements with the
+		given instructions, and adds a label with the given name before each
+		position in newLabels.
+		'''
 
-		source = self.get(0)
-		target = self.get(1)
+		instructions = []
+		replaced = False
 
-		if not (target.opcode == Label and source.opcode == SET and isinstance(source.a, PC)):
-			return False
-		if not (isinstance(source.b, LabelReference) and source.b.name == target.a.name):
-			return False
+		for position, instruction in enumerate(self.program + [None]):
+			if position in newLabels:
+				instructions.append(Instruction(Label, LabelReference(newLabels[position])))
 
-		self.remove(0, 0)
+			if instruction is None:
+				break
 
-		return True
+			if position in replacements:
+				instructions += replacements[position]
+				replaced = True
+				continue
 
-	def tryOptimizeNoop(self):
-		target = self.get(0)
+			if replaced:
+				# the rules look at this instruction together with the one before it
+				instruction.dirty = True
+				replaced = False
 
-		if (target.opcode in (ADD, SUB, SHL, SHR, BOR, XOR) and isinstance(target.b, Literal) and target.b.value == 0):
-			self.remove(0, 0)
-			return True
+			instructions.append(instruction)
+
+		self.program[:] = instructions
+		self.graph = None
+
+	def controlFlowGraph(self):
+		'''Returns the ControlFlowGraph of the program, building it again only after the program changed.'''
 
-		if (target.opcode in (MUL, DIV) and isinstance(target.b, Literal) and target.b.value == 1):
+		if self.graph is None:
+			self.graph = ControlFlowGraph(self.program, self.fragment)
+
+		return self.graph
+
+	def tryRemoveComment(self):
+		if self.get(0).opcode == Comment:
 			self.remove(0, 0)
 			return True
 
@@ -291,14 +575,78 @@ class AsmOptimizer(object):
 
 	# -----
 
+	def isExternal(self, labelReference):
+		return self.fragment and labelReference.name not in self.labels
+
+	def codeWords(self):
+		return sum(instruction.size() for instruction in self.program)
+
 	def canGet(self, offset):
-		return self.pos + offset < len(self.program)
+		return self.buffer.canGet(offset)
 
 	def get(self, offset):
-		return self.program[self.pos + offset]
+		return self.buffer.get(offset)
 
 	def remove(self, start, end):
-		del self.program[self.pos + start:self.pos + end + 1]
+		self.buffer.remove(start, end)
 
 	def insert(self, offset, *asm):
-		self.program[self.pos + offset:self.pos + offset] = asm
+		self.buffer.insert(offset, asm)
+
+class InstructionBuffer(object):
+	'''
+	Holds a program while the peephole rules walk over it. Instructions before
+	the current position are kept in order in done, the others in reverse order
+	in todo, so reading, removing and inserting around the current position
+	only touches the ends of the lists.
+	'''
+
+	def __init__(self, program):
+		self.done = []
+		self.todo = program[::-1]
+
+	def atEnd(self):
+		return not self.todo
+
+	def advance(self):
+		self.done.append(self.todo.pop())
+
+	def skippable(self):
+		'''Returns whether the instruction at the current position may be skipped by the instruction before it.'''
+
+		for instruction in reversed(self.done):
+			if instruction.opcode not in pseudoOpcodes:
+				return instruction.opcode in skipOpcodes
+
+		return False
+
+	def window(self):
+		'''Returns the instructions the rules look at, and the one before them.'''
+
+		return self.done[-1:] + self.todo[-1:-3:-1]
+
+	def canGet(self, offset):
+		return offset < len(self.todo)
+
+	def get(self, offset):
+		return self.todo[-1 - offset]
+
+	def remaining(self):
+		'''Returns the number of instructions from the current position on.'''
+
+		return len(self.todo)
+
+	def codeWords(self, count):
+		'''Returns the code words of the count instructions from the current position on.'''
+
+		return sum(instruction.size() for instruction in self.todo[len(self.todo) - count:])
+
+	def remove(self, start, end):
+		del self.todo[len(self.todo) - 1 - end:len(self.todo) - start]
+
+	def insert(self, offset, asm):
+		index = len(self.todo) - offset
+		self.todo[index:index] = asm[::-1]
+
+	def instructions(self):
+		return self.done + self.todo[::-1]
@@ -0,0 +1,90 @@
+from inliner import syntaxItems
+from syntaxitems import AddressOf, Assignment, Call, Decrement, Identifier, Increment, SetBit
+
+def usedNames(function):
+	'''Returns the names of the functions called and the qualified names used in function.'''
+
+	calls = set()
+	names = set()
+
+	if not function.hasStatementBlock:
+		return calls, names
+
+	for item in syntaxItems(function.statementblock):
+		if isinstance(item, Call):
+			calls.add(item.function)
+		elif isinstance(item, Identifier):
+			names.add(item.name)
+		elif isinstance(item, AddressOf):
+			names.add(item.field)
+		elif isinstance(item, (Assignment, Decrement, Increment, SetBit)):
+			names.add(item.target)
+
+	return calls, names
+
+class CallGraph(object):
+	'''
+	The functions each function calls and the data fields it uses, and what
+	is reachable from the roots: main.main, which the start code calls, and
+	the compilerservices module provided by the compiler. Functions and data
+	fields that are not reachable need not be generated.
+	'''
+
+	def __init__(self, datafields, functions):
+		# function -> names of the functions it calls
+		self.calls = {}
+
+		# function -> names of the data fields it uses
+		self.uses = {}
+
+		for function in functions.values():
+			calls, names = usedNames(function)
+
+			self.calls[function.name] = calls
+			self.uses[function.name] = set(name for name in names if name in datafields)
+
+		self.roots = ['main.main'] + sorted(name for name in functions if name.startswith('compilerservices.'))
+
+		self.functions = set()
+		self.datafields = set(name for name in datafields if name.startswith('compilerservices.'))
+
+		pending = list(self.roots)
+
+		while pending:
+			name = pending.pop()
+			if name in self.functions:
+				continue
+
+			self.functions.add(name)
+			self.datafields.update(self.uses[name])
+			pending.extend(self.calls[name])
+
+		self.removedFunctions = sorted(set(functions) - self.functions)
+		self.removedDatafields = sorted(set(datafields) - self.datafields)
+
+	def reachable(self, datafields, functions):
+		'''Returns the reachable data fields and functions.'''
+
+		return dict((name, datafields[name]) for name in self.datafields), dict((name, functions[name]) for name in self.functions)
+
+	def write(self, out):
+		print >>out, 'Call graph (roots: %s)' % ', '.join(self.roots)
+
+		for name in sorted(self.functions):
+			print >>out, '  %s' % name
+
+			if self.calls[name]:
+				print >>out, '    calls: %s' % ', '.join(sorted(self.calls[name]))
+			if self.uses[name]:
+				print >>out, '    uses: %s' % ', '.join(sorted(self.uses[name]))
+
+		print >>out, 'Removed functions: %s' % (', '.join(self.removedFunctions) or 'none')
+		print >>out, 'Removed data fields: %s' % (', '.join(self.removedDatafields) or 'none')
+
+	def toJson(self):
+		return {
+			'roots': self.roots,
+			'functions': dict((name, {'calls': sorted(self.calls[name]), 'uses': sorted(self.uses[name])}) for name in self.functions),
+			'removedFunctions': self.removedFunctions,
+			'removedDatafields': self.removedDatafields,
+		}
@@ -0,0 +1,209 @@
+import copy
+import json
+import os
+import SocketServer
+import stat
+import StringIO
+import threading
+
+from compilererror import CompilerError
+from dccompiler import DCCompiler
+from dcparser import sharedParser
+from modulecache import ModuleCache
+import asmgenerator
+
+class CompileServer(object):
+	'''
+	Compiles programs sent as JSON requests, one request per line. A request
+	looks like
+
+	    {"id": 1, "files": {"main.dc": "..."}, "options": {"optimize": false}}
+
+	Modules not in files are looked up in the module search path. The reply
+	has the same id and contains the assembly, program statistics and the
+	compiler messages, or an error:
+
+	    {"id": 1, "ok": true, "asm": "...", "statistics": {...}, "messages": [...]}
+
+	Parsed modules and generated function code are kept in a cache in memory
+	(or in the cache directory), so modules such as the stdlib are only parsed
+	once. Requests are handled concurrently, and replies are written as soon
+	as they are done, so they may arrive out of order.
+	'''
+
+	# options a request may change, and the type of their values
+	requestOptions = {
+		'optimize': bool,
+		'verboseinfo': bool,
+		'timeReport': bool,
+		'optimizerReport': bool,
+		'inlineLimit': int,
+		'inlineReport': bool,
+		'callGraph': bool,
+		'stackReport': bool,
+		'stackSize': int,
+	}
+
+	# options that may also be null, to use their default
+	nullableOptions = ('stackSize',)
+
+	def __init__(self, options):
+		self.options = options
+		self.cache = ModuleCache(options.cacheDirectory, options.cacheSize * 1024 * 1024)
+
+	def warmUp(self):
+		'''Loads the parser and parses the modules in the module search path into the cache.'''
+
+		sharedParser(self.options)
+
+		compiler = DCCompiler(self.cache, out=StringIO.StringIO(), sources={})
+
+		for path in self.options.moduleSearchPath:
+			for filename in sorted(os.listdir(path)):
+				if not filename.endswith('.dc'):
+					continue
+
+				try:
+					compiler.parse(self.options, filename[:-3])
+				except CompilerError:
+					# reported when a request uses the module
+					pass
+
+	def optionError(self, name, value):
+		'''Returns the error for a request option value of the wrong type, or None if it is valid.'''
+
+		if value is None and name in self.nullableOptions:
+			return None
+
+		if self.requestOptions[name] is bool:
+			if not isinstance(value, bool):
+				return "Option '%s' must be true or false" % name
+		# bool is a subclass of int
+		elif isinstance(value, bool) or not isinstance(value, (int, long)) or value < 0:
+			return "Option '%s' must be a whole number of at least 0" % name
+
+		return None
+
+	def compile(self, request):
+		'''Returns the reply to a single request.'''
+
+		reply = {'id': request.get('id')}
+
+		options = copy.copy(self.options)
+		for name, value in request.get('options', {}).iteritems():
+			if name not in self.requestOptions:
+				reply.update(ok=False, error="Unknown option '%s'" % name)
+				return reply
+
+			error = self.optionError(name, value)
+			if error:
+				reply.update(ok=False, error=error)
+				return reply
+
+			setattr(options, name, value)
+
+		options.optimizerReportJson = None
+		options.timeReportJson = None
+
+		files = dict((filename, source.encode('utf-8')) for filename, source in request.get('files', {}).iteritems())
+
+		messages = StringIO.StringIO()
+		compiler = DCCompiler(self.cache, out=messages, sources=files)
+
+		try:
+			program = compiler.compile(options)
+		except CompilerError as e:
+			reply.update(ok=False, error=str(e), messages=messages.getvalue().splitlines())
+			return reply
+
+		output = StringIO.StringIO()
+		asmgenerator.writeAsm(compiler.context, program, output)
+
+		instructions, codeWords, memoryWords = asmgenerator.count(compiler.context, program)
+
+		reply.update(ok=True, asm=output.getvalue(), messages=messages.getvalue().splitlines())
+		reply['statistics'] = {'instructions': instructions, 'codeWords': codeWords, 'memoryWords': memoryWords}
+
+		if options.timeReport:
+			reply['timeReport'] = compiler.timeReport.phases
+
+		if options.optimizerReport and options.optimize:
+			reply['optimizerReport'] = dict((item.name, item.toJson()) for item in (compiler.functionStatistics, compiler.programStatistics))
+
+		if options.inlineReport and compiler.inliner:
+			reply['inlineReport'] = compiler.inliner.toJson()
+
+		if options.callGraph and compiler.callGraph:
+			reply['callGraph'] = compiler.callGraph.toJson()
+
+		if options.stackReport:
+			reply['stackReport'] = compiler.stackAnalysis.toJson()
+
+		return reply
+
+	def handle(self, line):
+		'''Returns the reply to a request line, as a line of JSON.'''
+
+		try:
+			request = json.loads(line)
+		except ValueError as e:
+			reply = {'id': None, 'ok': False, 'error': 'Invalid request: %s' % e}
+		else:
+			if isinstance(request, dict):
+				try:
+					reply = self.compile(request)
+				except Exception as e:
+					# keep serving other requests
+					reply = {'id': request.get('id'), 'ok': False, 'error': 'Internal error: %s' % e}
+			else:
+				reply = {'id': None, 'ok': False, 'error': 'Invalid request: expected an object'}
+
+		return json.dumps(reply) + '\n'
+
+	def serveStream(self, input, output):
+		'''Handles the requests read from input on separate threads, until input ends.'''
+
+		lock = threading.Lock()
+		threads = []
+
+		def handle(line):
+			reply = self.handle(line)
+
+			with lock:
+				output.write(reply)
+				output.flush()
+
+		for line in iter(input.readline, ''):
+			if not line.strip():
+				continue
+
+			thread = threading.Thread(target=handle, args=(line,))
+			thread.start()
+			threads.append(thread)
+
+			threads = [thread for thread in threads if thread.is_alive()]
+
+		for thread in threads:
+			thread.join()
+
+	def serveSocket(self, path):
+		'''Accepts connections on the Unix socket at path, each handled like a stream.'''
+
+		server = self
+
+		class Handler(SocketServer.StreamRequestHandler):
+			def handle(self):
+				server.serveStream(self.rfile, self.wfile)
+
+		# remove the socket left behind by a previous server
+		if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+			os.remove(path)
+
+		socketServer = SocketServer.ThreadingUnixStreamServer(path, Handler)
+		socketServer.daemon_threads = True
+
+		try:
+			socketServer.serve_forever()
+		finally:
+			socketServer.server_close()
+			os.remove(path)
@@ -0,0 +1,304 @@
+from asmgenerator import *
+
+# instructions that skip the next instruction when their condition is false
+skipOpcodes = (IFE, IFN, IFG, IFB)
+
+# instructions that take no space, and are not skipped over themselves
+pseudoOpcodes = (Comment, Label)
+
+class BasicBlock(object):
+	'''
+	A run of instructions that is only entered at its first instruction and
+	only left after its last one. Labels start a block; jumps, skip instructions
+	and the instructions they may skip end one. JSR does not end a block, as
+	the called function returns to the next instruction; the blocks it calls
+	are kept in calls.
+	'''
+
+	def __init__(self, index, start, instructions):
+		self.index = index
+		# position of the first instruction in the program
+		self.start = start
+		self.instructions = instructions
+
+		self.successors = []
+		self.predecessors = []
+		self.calls = []
+
+		# the Subroutine the block belongs to, or None if no function reaches it;
+		# set by ControlFlowGraph.subroutines
+		self.subroutine = None
+
+		# ends with SET PC, POP
+		self.returns = False
+		# jumps to a label outside the fragment
+		self.exits = False
+		# jumps to an address that is only known when the program runs
+		self.unpredictable = False
+
+	def labels(self):
+		'''Returns the names of the labels at the start of the block.'''
+
+		names = []
+
+		for instruction in self.instructions:
+			if instruction.opcode == Label:
+				names.append(instruction.a.name)
+			elif instruction.opcode != Comment:
+				break
+
+		return names
+
+	def last(self):
+		'''Returns the last instruction that is not a label or comment, or None.'''
+
+		for instruction in reversed(self.instructions):
+			if instruction.opcode not in pseudoOpcodes:
+				return instruction
+
+		return None
+
+	def __repr__(self):
+		return '<BasicBlock %d %s>' % (self.index, ' '.join(self.labels()))
+
+class Subroutine(object):
+	'''
+	The blocks of a single function: its entry block and the blocks reachable
+	from there without calling or jumping to another function. A jump to the
+	entry of another function is a tail call. The name is the label of the
+	entry block, or None for the code at the start of the program.
+	'''
+
+	def __init__(self, name, entry):
+		self.name = name
+		self.entry = entry
+		self.blocks = []
+
+	def __repr__(self):
+		return '<Subroutine %s>' % self.name
+
+class ControlFlowGraph(object):
+	'''
+	The basic blocks of an assembly program and the control flow between them,
+	following DCPU-16 semantics: IFE, IFN, IFG and IFB continue at the next
+	instruction or skip it, SET PC jumps, SET PC, POP returns and JSR calls.
+	The instructions themselves are shared with the program, not copied.
+
+	When fragment is True, the program is the code of a single function, and
+	labels it references but does not define are outside of it.
+	'''
+
+	def __init__(self, program, fragment=False):
+		self.program = program
+		self.fragment = fragment
+
+		self.blocks = []
+		# label name -> the block containing the label
+		self.labels = {}
+		# label name -> position of the label in the program
+		self.labelPositions = {}
+		# the Subroutines, found when first needed
+		self.subroutineList = None
+
+		# whether any block jumps to an unknown address
+		self.unpredictable = False
+
+		self.splitBlocks()
+		self.connectBlocks()
+
+	def nextInstruction(self, position):
+		'''
+		Returns the position of the first instruction after position that is not
+		a label or comment, such as the instruction a skip at position skips.
+		'''
+
+		position += 1
+
+		while position < len(self.program) and self.program[position].opcode in pseudoOpcodes:
+			position += 1
+
+		return position
+
+	def isSkippable(self, position):
+		'''Returns whether the instruction at position may be skipped by the instruction before it.'''
+
+		position -= 1
+
+		while position >= 0 and self.program[position].opcode in pseudoOpcodes:
+			position -= 1
+
+		return position >= 0 and self.program[position].opcode in skipOpcodes
+
+	def destination(self, name):
+		'''
+		Returns the position of the first instruction that runs after jumping to
+		the label, or None if the label is not defined.
+		'''
+
+		position = self.labelPositions.get(name)
+
+		if position is None:
+			return None
+
+		return self.nextInstruction(position)
+
+	def splitBlocks(self):
+		program = self.program
+		leaders = set([0])
+
+		for position, instruction in enumerate(program):
+			opcode = instruction.opcode
+
+			if opcode == Label:
+				if instruction.a.name in self.labelPositions:
+					raise Exception("Internal error: duplicate label '%s'" % instruction.a.name)
+
+				self.labelPositions[instruction.a.name] = position
+
+				if position == 0 or program[position - 1].opcode != Label:
+					leaders.add(position)
+			elif opcode in skipOpcodes:
+				leaders.add(position + 1)
+				leaders.add(self.nextInstruction(position) + 1)
+			elif isinstance(instruction.a, PC):
+				leaders.add(position + 1)
+
+		leaders = sorted(leader for leader in leaders if leader < len(program))
+
+		# position -> block, for every instruction
+		self.blockAt = []
+
+		for index, start in enumerate(leaders):
+			end = leaders[index + 1] if index + 1 < len(leaders) else len(program)
+
+			block = BasicBlock(index, start, program[start:end])
+			self.blocks.append(block)
+			self.blockAt += [block] * (end - start)
+
+		for name, position in self.labelPositions.iteritems():
+			self.labels[name] = self.blockAt[position]
+
+	def target(self, labelReference):
+		'''Returns the block with the label, or None if the label is outside the fragment.'''
+
+		block = self.labels.get(labelReference.name)
+
+		if block is None and not self.fragment:
+			raise Exception("Internal error: jump to undefined label '%s'" % labelReference.name)
+
+		return block
+
+	def connectBlocks(self):
+		for block in self.blocks:
+			for instruction in block.instructions:
+				if instruction.opcode == JSR:
+					if isinstance(instruction.a, LabelReference):
+						callee = self.target(instruction.a)
+						if callee is not None:
+							block.calls.append(callee)
+					else:
+						block.unpredictable = True
+
+			end = block.start + len(block.instructions)
+			instruction = block.last()
+
+			if instruction is None:
+				successors = [end]
+			elif instruction.opcode in skipOpcodes:
+				position = block.start + block.instructions.index(instruction)
+				successors = [position + 1, self.nextInstruction(position) + 1]
+			elif isinstance(instruction.a, PC):
+				successors = []
+
+				if instruction.opcode == SET and isinstance(instruction.b, Pop):
+					block.returns = True
+				elif instruction.opcode == SET and isinstance(instruction.b, LabelReference):
+					target = self.target(instruction.b)
+					if target is None:
+						block.exits = True
+					else:
+						block.successors.append(target)
+				else:
+					block.unpredictable = True
+			else:
+				successors = [end]
+
+			for position in successors:
+				if position < len(self.program) and self.blockAt[position] not in block.successors:
+					block.successors.append(self.blockAt[position])
+
+			for successor in block.successors:
+				successor.predecessors.append(block)
+
+			if block.unpredictable:
+				self.unpredictable = True
+
+	def subroutines(self):
+		'''Returns the Subroutine of every function in the program, in program order.'''
+
+		if self.subroutineList is None:
+			self.subroutineList = []
+			self.findSubroutines()
+
+		return self.subroutineList
+
+	def findSubroutines(self):
+		if not self.blocks:
+			return
+
+		entries = set([self.blocks[0]])
+
+		for block in self.blocks:
+			entries.update(block.calls)
+
+			# the code generator starts every function with its func_ label
+			for name in block.labels():
+				if name.startswith('func_'):
+					entries.add(block)
+
+		for entry in sorted(entries, key=lambda block: block.index):
+			labels = entry.labels()
+			subroutine = Subroutine(labels[0] if labels else None, entry)
+			self.subroutineList.append(subroutine)
+
+			todo = [entry]
+
+			while todo:
+				block = todo.pop()
+				if block.subroutine is not None:
+					continue
+
+				block.subroutine = subroutine
+				subroutine.blocks.append(block)
+
+				todo += [successor for successor in block.successors if successor not in entries]
+
+			subroutine.blocks.sort(key=lambda block: block.index)
+
+	def reachableBlocks(self):
+		'''
+		Returns the set of blocks that may run: the blocks reachable from the
+		start of the program through jumps, skips and calls. When a jump is
+		unpredictable, every block with a label may be reached.
+		'''
+
+		if not self.blocks:
+			return set()
+
+		todo = [self.blocks[0]]
+
+		if self.unpredictable:
+			todo += [block for block in self.blocks if block.labels()]
+
+		reachable = set()
+
+		while todo:
+			block = todo.pop()
+			if block in reachable:
+				continue
+
+			reachable.add(block)
+			todo += block.successors
+			todo += block.calls
+
+		return reachable
@@ -1,109 +1,283 @@
+import hashlib
+import multiprocessing
 import os.path
+import sys
 
 import json
 
 from asmoptimizer import AsmOptimizer
+from callgraph import CallGraph
 from compilererror import CompilerError
 from dcconstants import Constants
-from dcparser import DCParser
+from dcparser import sharedParser
+from inliner import Inliner
+from loopoptimizer import LoopOptimizer
+from modulecache import CacheCounter, ModuleCache
+from optimizerstatistics import OptimizerStatistics
+from stackanalysis import StackAnalysis
+from symboltable import globalScope, moduleScope
+from timereport import TimeReport
 import asmgenerator
 
 class DCCompiler(object):
 
+	def __init__(self, cache=None, out=None, sources=None):
+		'''
+		cache is an optional ModuleCache that is kept between compilations.
+		By default, the compiler uses the cache configured in the options.
+		Messages are written to out, or to standard output if out is None.
+		sources optionally maps file names to source code; when given, it
+		replaces the working directory as the first place to look for modules.
+		'''
+
+		self.cache = cache
+		self.keepCache = cache is not None
+		self.cacheCounter = CacheCounter()
+		self.out = out or sys.stdout
+		self.sources = sources
+
 	def compile(self, options):
 		modules = Constants() # dict
 		nextModules = set(['main'])
 
+		if not self.keepCache:
+			self.cache = self.createCache(options)
+
+		# the cache may be shared with other compilations
+		self.cacheCounter = CacheCounter()
+
+		self.context = asmgenerator.CompilationContext()
+
+		self.timeReport = TimeReport()
+
+		if options.optimizerReport or options.optimizerReportJson:
+			self.functionStatistics = OptimizerStatistics('functions')
+			self.programStatistics = OptimizerStatistics('program')
+		else:
+			self.functionStatistics = None
+			self.programStatistics = None
+
+		self.inliner = None
+		self.callGraph = None
+		self.stackAnalysis = None
+
 		for path in options.moduleSearchPath:
 			if not os.path.isdir(path):
 				raise CompilerError(None, None, "Module search path '%s' does not exist" % path)
-				
-		while nextModules:
-			nextModule = nextModules.pop()
-			if nextModule in modules:
-				continue
 
-			if options.verboseprogress:
-				print 'Parsing module %s...' % nextModule
+		with self.timeReport.phase('parse'):
+			# worker processes cannot use a cache kept in memory by this compiler
+			if options.jobs > 1 and not self.keepCache:
+				self.parseParallel(options, modules, nextModules)
+
+			while nextModules:
+				nextModule = nextModules.pop()
+				if nextModule in modules:
+					continue
 
-			modules[nextModule], foundModuleReferences = self.parse(options, nextModule)
-			nextModules.update(foundModuleReferences)
+				if options.verboseprogress:
+					print >>self.out, 'Parsing module %s...' % nextModule
+
+				modules[nextModule], foundModuleReferences = self.parse(options, nextModule)
+				nextModules.update(foundModuleReferences)
 
 		if options.verboseprogress:
-			print 'Resolving identifiers...'
-			
-		self.resolveIdentifiers(modules)
+			print >>self.out, 'Resolving identifiers...'
+
+		with self.timeReport.phase('resolveIdentifiers'):
+			self.resolveIdentifiers(modules)
 
-		datafields, functions = self.merge(modules)
+		with self.timeReport.phase('merge'):
+			datafields, functions = self.merge(modules)
 
-		self.registerIdentifiers(datafields, functions)
+		with self.timeReport.phase('registerIdentifiers'):
+			self.registerIdentifiers(modules, datafields, functions)
 
-		self.verifyIdentifiers(datafields, functions)
+		with self.timeReport.phase('verifyIdentifiers'):
+			self.verifyIdentifiers(datafields, functions)
 
-		self.checkIdentifierUsage(datafields, functions)
+		with self.timeReport.phase('checkIdentifierUsage'):
+			self.checkIdentifierUsage(datafields, functions)
 
-		if options.optimize and False:
+		# the call graph may remove the constant, as its uses are folded
+		budget, budgetSource = self.stackBudget(options, datafields)
+
+		if options.optimize:
 			if options.verboseprogress:
-				print 'Optimizing source...'
+				print >>self.out, 'Optimizing source...'
 
-			self.optimizeSyntaxTree(datafields, functions)
+			with self.timeReport.phase('optimizeSyntaxTree'):
+				self.optimizeSyntaxTree(options, datafields, functions)
+
+			# after inlining, so functions only called where they were inlined are dropped too
+			with self.timeReport.phase('callGraph'):
+				self.callGraph = CallGraph(datafields, functions)
+				datafields, functions = self.callGraph.reachable(datafields, functions)
 
 		if options.verboseprogress:
-			print 'Generating assembly...'
+			print >>self.out, 'Generating assembly...'
 
-		program = asmgenerator.transform(datafields, functions)
+		with self.timeReport.phase('transform'):
+			program = asmgenerator.transform(self.context, datafields, functions, lambda function: self.generateFunction(options, modules, datafields, function))
 
 		if options.optimize:
 			if options.verboseprogress:
-				print 'Optimizing assembly...'
+				print >>self.out, 'Optimizing assembly...'
 
-			asmgenerator.count(program)
+			asmgenerator.count(self.context, program)
 			self.optimizeAsm(options, program)
 
 		if not options.verboseinfo or not options.verboseprogress or not options.optimize:
 			self.printAsmStatistics(program)
 
-		instructions, codeWords, memoryWords = asmgenerator.count(program)
+		instructions, codeWords, memoryWords = asmgenerator.count(self.context, program)
+
+		if options.stackReport or budget is not None:
+			with self.timeReport.phase('stackAnalysis'):
+				self.stackAnalysis = StackAnalysis(program, budget, budgetSource)
 
-		print 'Free space available: %d words' % (0x10000 - codeWords - memoryWords)
+			for warning in self.stackAnalysis.warnings():
+				print >>self.out, warning
+
+		print >>self.out, 'Free space available: %d words' % (0x10000 - codeWords - memoryWords)
 
 		if options.verboseinfo:
 			if memoryWords > 0:
-				print 'Memory used by data fields: 0x%X-0x%X' % (codeWords, codeWords + memoryWords - 1)
+				print >>self.out, 'Memory used by data fields: 0x%X-0x%X' % (codeWords, codeWords + memoryWords - 1)
 			else:
-				print 'No memory used by data fields'
+				print >>self.out, 'No memory used by data fields'
+
+			if self.cache:
+				print >>self.out, 'Cache: %d hits, %d misses' % (self.cacheCounter.hits, self.cacheCounter.misses)
 
-		asm = asmgenerator.programToAsm(program, options)
+		if self.cache:
+			self.cache.evict()
 
-		return asm
+		return program
 		
 
+	def createCache(self, options):
+		if not options.cacheDirectory:
+			return None
+
+		return ModuleCache(options.cacheDirectory, options.cacheSize * 1024 * 1024)
+
+	def parseParallel(self, options, modules, nextModules):
+		'''
+		Parses modules in a pool of options.jobs worker processes. Each round parses
+		all modules found in the previous round, until no new modules are found.
+		'''
+
+		pool = multiprocessing.Pool(options.jobs)
+
+		try:
+			while nextModules:
+				batch = sorted(nextModules - set(modules))
+				nextModules.clear()
+
+				if options.verboseprogress:
+					for modulename in batch:
+						print >>self.out, 'Parsing module %s...' % modulename
+
+				results = pool.map(parseModule, [(options, modulename) for modulename in batch])
+
+				for modulename, (module, foundModuleReferences, hits, misses) in zip(batch, results):
+					modules[modulename] = module
+					nextModules.update(foundModuleReferences)
+
+					self.cacheCounter.hits += hits
+					self.cacheCounter.misses += misses
+		finally:
+			pool.terminate()
+			pool.join()
+
 	def parse(self, options, modulename):
-		'''Parses the input and returns a syntax tree.'''
+		'''Parses the input and returns a syntax tree with resolved identifiers.'''
 
 		filename = modulename + '.dc'
 
+		input = None
 		inputFile = None
-		if os.path.isfile(filename):
+
+		if self.sources is not None:
+			input = self.sources.get(filename)
+		elif os.path.isfile(filename):
 			inputFile = open(filename)
-		else:
+
+		if input is None and not inputFile:
 			for modulePath in options.moduleSearchPath:
 				path = '%s%s%s' % (modulePath, os.sep, filename)
 				if os.path.isfile(path):
 					inputFile = open(path)
 					break
 
-		if not inputFile:
-			raise CompilerError(None, None, "Module '%s' not found in search path" % modulename)
+		if input is None:
+			if not inputFile:
+				raise CompilerError(None, None, "Module '%s' not found in search path" % modulename)
+
+			input = inputFile.read()
+			inputFile.close()
+
+		sourceHash = hashlib.sha1(input).hexdigest()
+		key = ('module', modulename, sourceHash)
+
+		if self.cache:
+			module = self.cache.load(key, self.cacheCounter)
+			if module is not None:
+				return module, module.references
 
-		input = inputFile.read()
-		inputFile.close()
+		module, references = sharedParser(options).parse(filename, modulename, input)
+		module.sourceHash = sourceHash
+		module.references = references
+		module.resolveIdentifiers()
 
-		return DCParser(options).parse(filename, modulename, input)
+		if self.cache:
+			self.cache.store(key, module)
+
+		return module, references
+
+	def generateFunction(self, options, modules, datafields, function):
+		'''Returns the code of a function, reusing cached code when possible.'''
+
+		if not self.cache or not function.hasStatementBlock:
+			return self.transformFunction(options, function)
+
+		module = modules[function.containingModule]
+		dependencies = sorted((name, modules[name].sourceHash) for name in module.references)
+		# inlined functions may come from modules the function's module does not reference
+		inlined = sorted(set(name.rsplit('.', 1)[0] for name in function.inlinedFunctions))
+		inlinedModules = [(name, modules[name].sourceHash) for name in inlined]
+		key = ('function', function.name, options.optimize, options.inlineLimit, module.sourceHash, dependencies, inlinedModules)
+
+		functionCode = self.cache.load(key, self.cacheCounter)
+		if functionCode is not None:
+			code = asmgenerator.restoreFunctionCode(self.context, functionCode, datafields)
+			if code is not None:
+				return code
+
+			self.cache.discard(key, self.cacheCounter)
+
+		functionCode = asmgenerator.recordFunctionCode(self.context, lambda: self.transformFunction(options, function))
+		self.cache.store(key, functionCode)
+
+		return functionCode.code
+
+	def transformFunction(self, options, function):
+		'''Generates the code of a function, and optimizes it on its own if optimizing.'''
+
+		code = list(function.transformToAsm(self.context))
+
+		if options.optimize and function.hasStatementBlock:
+			optimizer = AsmOptimizer(self.context, code, options, fragment=True, statistics=self.functionStatistics)
+
+			while optimizer.doPass():
+				pass
+
+		return code
 
 	def printAsmStatistics(self, program):
-		instructions, codeWords, memoryWords = asmgenerator.count(program)
-		print "Program size: %s words (%s code words, %s instructions)" % (memoryWords + codeWords, codeWords, instructions)
+		instructions, codeWords, memoryWords = asmgenerator.count(self.context, program)
+		print >>self.out, "Program size: %s words (%s code words, %s instructions)" % (memoryWords + codeWords, codeWords, instructions)
 
 	def checkIdentifierUsage(self, datafields, functions):
 		for datafield in datafields.values():
@@ -111,15 +285,15 @@ class DCCompiler(object):
 				continue
 
 			if not datafield.assigned and not datafield.read:
-				print "Warning: data field '%s' is never used" % datafield.name
+				print >>self.out, "Warning: data field '%s' is never used" % datafield.name
 			elif not datafield.assigned:
-				print "Warning: data field '%s' is never assigned" % datafield.name
+				print >>self.out, "Warning: data field '%s' is never assigned" % datafield.name
 			elif not datafield.read:
-				print "Warning: data field '%s' is never read" % datafield.name
+				print >>self.out, "Warning: data field '%s' is never read" % datafield.name
 
 		for function in functions.values():
 			if not function.called:
-				print "Warning: function '%s' is never called" % function.name
+				print >>self.out, "Warning: function '%s' is never called" % function.name
 
 		# TODO: local variables
 
@@ -128,7 +302,8 @@ class DCCompiler(object):
 		modulesDict = {}
 
 		for module in modules.values():
-			module.resolveIdentifiers()
+			if not module.resolved:
+				module.resolveIdentifiers()
 
 	def merge(self, modules):
 		'''Merges the modules and returns the combined data fields and functions.'''
@@ -136,7 +311,9 @@ class DCCompiler(object):
 		datafields = {}
 		functions = {}
 
-		for module in modules.values():
+		# merge in a fixed order, so the result does not depend on the order the modules were parsed in
+		for name in sorted(modules):
+			module = modules[name]
 			for datafield in module.datafields:
 				if datafield.name in datafields:
 					self.duplicateError(datafields[datafield.name], datafield)
@@ -178,32 +355,78 @@ class DCCompiler(object):
 		if 'main.main' not in functions:
 			raise CompilerError(None, None, "No 'main' module with 'main' function found")
 
-	def registerIdentifiers(self, datafields, functions):
-		'''Provides the identifier list to the functions.'''
+	def registerIdentifiers(self, modules, datafields, functions):
+		'''Provides each function with a scope chained to the scopes of its module and the program.'''
 
-		identifiers = {}
-		identifiers.update(datafields)
-		identifiers.update(functions)
+		scope = globalScope(datafields, functions)
 
-		if len(identifiers) != len(datafields) + len(functions):
-			raise Exception('Internal error: %d != %d + %d' % (len(identifiers), len(datafields), len(functions)))
+		for module in modules.values():
+			scopeOfModule = moduleScope(module, scope)
 
-		for function in functions.values():
-			function.registerIdentifiers(identifiers)
+			for function in module.functions:
+				function.registerIdentifiers(scopeOfModule)
 
-	def optimizeSyntaxTree(self, datafields, functions):
+	def stackBudget(self, options, datafields):
+		'''Returns the words reserved for the stack and where the number comes from, or None if unknown.'''
+
+		if options.stackSize is not None:
+			return options.stackSize, '--stack-size'
+
+		if 'mem.STACK_SIZE' in datafields and datafields['mem.STACK_SIZE'].constant:
+			return datafields['mem.STACK_SIZE'].value, 'mem.STACK_SIZE'
+
+		return None, None
+
+	def optimizeSyntaxTree(self, options, datafields, functions):
 		for function in functions.values():
 			function.optimize()
 
+		if options.inlineLimit > 0:
+			self.inliner = Inliner(functions, options.inlineLimit)
+
+			# inlined returns and arguments may be simplified further
+			for name in self.inliner.inlineAll():
+				functions[name].optimize()
+
+		# after inlining, so the loops of inlined functions are optimized where they are inlined
+		for function in functions.values():
+			if LoopOptimizer(function).optimize():
+				function.optimize()
+
 	def optimizeAsm(self, options, program):
-		optimizer = AsmOptimizer(program, options)
+		optimizer = AsmOptimizer(self.context, program, options, statistics=self.programStatistics)
 
 		if options.verboseinfo and options.verboseprogress:
 			self.printAsmStatistics(program)
 
-		while optimizer.doPass():
+		passes = 0
+
+		while True:
+			passes += 1
+
+			with self.timeReport.phase('optimizer pass %d' % passes):
+				modified = optimizer.doPass()
+
+			if not modified:
+				break
+
 			if options.verboseinfo and options.verboseprogress:
 				self.printAsmStatistics(program)
 
 		if options.verboseprogress:
-			print 'Assembly optimized.'
+			print >>self.out, 'Assembly optimized.'
+
+def parseModule(arguments):
+	'''
+	Parses a module in a worker process. Returns the module, its module
+	references and the worker's cache hits and misses.
+	'''
+
+	options, modulename = arguments
+
+	compiler = DCCompiler()
+	compiler.cache = compiler.createCache(options)
+
+	module, foundModuleReferences = compiler.parse(options, modulename)
+
+	return module, foundModuleReferences, compiler.cacheCounter.hits, compiler.cacheCounter.misses
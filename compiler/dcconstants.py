@@ -1,15 +1,18 @@
 from asmgenerator import *
-from syntaxitems import DataField, Module, PredefinedFunction
+from syntaxitems import DataField, Module, PredefinedConstant, PredefinedFunction
 
 def Constants():
 	return {'compilerservices': CompilerServicesModule()}
 
 def CompilerServicesModule():
+	datafields = []
 	functions = []
 
+	datafields.append(PredefinedConstant('compilerservices', 0, 'int', 'freememstart', FreeMemoryStart()))
+
 	functions.append(PredefinedFunction('compilerservices', 0, 'reset', (
 			Instruction(SET, SP(), Literal(0)),
 			Instruction(SET, PC(), Literal(0)),
-		), 0))
+		)))
 
-	return Module('compilerservices', 0, 'compilerservices', [], functions)
+	return Module('compilerservices', 0, 'compilerservices', datafields, functions)
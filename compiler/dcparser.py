@@ -1,4 +1,5 @@
 import os
+import threading
 
 import ply.yacc as yacc
 
@@ -6,15 +7,39 @@ from compilererror import CompilerError
 from dctokenizer import DCTokenizer
 from syntaxitems import *
 
+sharedParserInstance = None
+sharedParserLock = threading.Lock()
+
+def sharedParser(options):
+	'''
+	Returns the parser shared by all modules compiled in this process.
+	Building the lexer and loading the parse table is only done once.
+	'''
+
+	global sharedParserInstance
+
+	with sharedParserLock:
+		if sharedParserInstance is None:
+			sharedParserInstance = DCParser(options)
+
+	return sharedParserInstance
+
 class DCParser(object):
 
 	def __init__(self, options):
 		self.tokenizer = DCTokenizer()
 		self.tokens = self.tokenizer.tokens
-		self.parser = yacc.yacc(module=self, debug=options.debugParser, tabmodule='compiler.dcparsetab', outputdir=os.path.dirname(os.path.realpath(__file__)))
+
+		# The prebuilt table in compiler/dcparsetab.py is loaded when its signature matches
+		# the grammar. Only try to regenerate it when the package directory is writable.
+		outputdir = os.path.dirname(os.path.realpath(__file__))
+		self.parser = yacc.yacc(module=self, debug=options.debugParser, tabmodule='compiler.dcparsetab', outputdir=outputdir, write_tables=os.access(outputdir, os.W_OK))
 
 		self.foundModuleReferences = set()
 
+		# the parser keeps the state of the module being parsed, so threads take turns
+		self.lock = threading.Lock()
+
 	precedence = (
 		('left', 'OR'),
 		('left', 'XOR'),
@@ -415,13 +440,19 @@ class DCParser(object):
 # --
 
 	def p_error(self, p):
+		if p is None:
+			raise CompilerError(self.filename, None, 'Unexpected end of file')
+
 		raise CompilerError(self.filename, p.lineno, 'Unexpected %s \'%s\'' % (p.type.lower(), p.value))
 
 
 	def parse(self, filename, modulename, input):
-		self.filename = filename
-		self.modulename = modulename
-		self.tokenizer.filename = filename
-
-		parsetree = self.parser.parse(input, lexer=self.tokenizer.lexer, tracking=True)
-		return parsetree, self.foundModuleReferences
+		with self.lock:
+			self.filename = filename
+			self.modulename = modulename
+			self.tokenizer.filename = filename
+			self.tokenizer.lexer.lineno = 1
+			self.foundModuleReferences = set()
+
+			parsetree = self.parser.parse(input, lexer=self.tokenizer.lexer, tracking=True)
+			return parsetree, self.foundModuleReferences
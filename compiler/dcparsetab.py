@@ -0,0 +1,113 @@
+
+# dcparsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'leftORleftXORleftAMPERSANDleftBOOLEANORleftBOOLEANANDleftEQUALSNOTEQUALSleftPLUSMINUSleftASTERISKSLASHrightNOTBOOLEANNOTleftDEREFOFFSETADDR AMPERSAND ANDASSIGN ASSIGN ASTERISK ASTERISKASSIGN BINARY BITOPERATOR BOOLEANAND BOOLEANNOT BOOLEANOR BREAK COMMA CONST CONTINUE DATATYPE DECIMAL DECREMENT DEREFOFFSET DOT ELSE EQUALS FALSE GREATEREQUALS GREATERTHAN HEXADECIMAL IDENTIFIER IF INCREMENT LEFTBRACE LEFTPAREN LESSEQUALS LESSTHAN LOOP MINUS MINUSASSIGN NOT NOTEQUALS OR ORASSIGN PLUS PLUSASSIGN REPEAT RETURN RIGHTBRACE RIGHTPAREN SEMICOLON SHIFTLEFT SHIFTRIGHT SLASH SLASHASSIGN TRUE WHILE XORmodule : datafieldsorfunctionsdatafieldsorfunctions : datafield datafieldsorfunctionsdatafieldsorfunctions : function datafieldsorfunctionsdatafieldsorfunctions :datafield : DATATYPE unqualifiedidentifier ASSIGN integer SEMICOLONdatafield : DATATYPE unqualifiedidentifier SEMICOLONdatafield : ADDR DATATYPE unqualifiedidentifier ASSIGN integer SEMICOLONdatafield : CONST DATATYPE unqualifiedidentifier ASSIGN integer SEMICOLONfunction : DATATYPE unqualifiedidentifier LEFTPAREN functionargs RIGHTPAREN LEFTBRACE functionlocals statementblock RIGHTBRACEfunctionargs : DATATYPE unqualifiedidentifier COMMA functionargsfunctionargs : DATATYPE unqualifiedidentifierfunctionargs :functionlocals : DATATYPE unqualifiedidentifier SEMICOLON functionlocalsfunctionlocals :integer : DECIMAL\n\t\t           | HEXADECIMAL\n\t\t\t\t   | BINARYqualifiedidentifier : IDENTIFIER DOT IDENTIFIERunqualifiedidentifier : IDENTIFIERidentifier : unqualifiedidentifier\n\t\t              | qualifiedidentifierstatementblock : statementblockcontentsstatementblockcontents : statement statementblockcontentsstatementblockcontents :statement : expression SEMICOLONstatement : ifif : IF LEFTPAREN booleanexpression RIGHTPAREN LEFTBRACE statementblock RIGHTBRACEif : IF LEFTPAREN booleanexpression RIGHTPAREN LEFTBRACE statementblock RIGHTBRACE ELSE LEFTBRACE statementblock RIGHTBRACEif : IF LEFTPAREN booleanexpression RIGHTPAREN LEFTBRACE statementblock RIGHTBRACE ELSE ifstatement : LOOP LEFTBRACE statementblock RIGHTBRACEstatement : BREAK SEMICOLONstatement : CONTINUE SEMICOLONstatement : REPEAT LEFTPAREN expression RIGHTPAREN LEFTBRACE statementblock RIGHTBRACEstatement : WHILE LEFTPAREN booleanexpression RIGHTPAREN LEFTBRACE statementblock RIGHTBRACEexpression : identifierexpression : integerexpression : LEFTPAREN expression RIGHTPARENexpression : AMPERSAND identifierbooleanexpression : TRUE\n\t\t                     | FALSEbooleanexpression : expression BITOPERATOR integerbooleanexpression : expression EQUALS expressionbooleanexpression : expression NOTEQUALS expressionbooleanexpression : expression GREATERTHAN expressionbooleanexpression : expression GREATEREQUALS expressionbooleanexpression : expression LESSTHAN expressionbooleanexpression : expression LESSEQUALS expressionbooleanexpression : BOOLEANNOT booleanexpressionbooleanexpression : booleanexpression BOOLEANAND booleanexpressionbooleanexpression : booleanexpression BOOLEANOR booleanexpressionbooleanexpression : booleanexpression EQUALS booleanexpressionbooleanexpression : booleanexpression NOTEQUALS booleanexpressionbooleanexpression : LEFTPAREN booleanexpression RIGHTPARENexpression : expression PLUS expressionexpression : expression MINUS expressionexpression : expression ASTERISK expressionexpression : expression SLASH expressionexpression : expression AMPERSAND expressionexpression : expression OR expressionexpression : expression XOR expressionexpression : expression SHIFTLEFT expressionexpression : expression SHIFTRIGHT expressionexpression : NOT expressionexpression : ASTERISK expressionexpression : expression DEREFOFFSET expressionstatement : identifier ASSIGN expression SEMICOLONstatement : identifier BITOPERATOR integer ASSIGN booleanexpression SEMICOLONstatement : identifier PLUSASSIGN expression SEMICOLONstatement : identifier MINUSASSIGN expression SEMICOLONstatement : identifier ASTERISKASSIGN expression SEMICOLONstatement : identifier SLASHASSIGN expression SEMICOLONstatement : identifier ORASSIGN expression SEMICOLONstatement : identifier ANDASSIGN expression SEMICOLONstatement : identifier INCREMENT SEMICOLONstatement : identifier DECREMENT SEMICOLONstatement : ASTERISK expression ASSIGN expression SEMICOLONstatement : expression DEREFOFFSET expression ASSIGN expression SEMICOLONexpression : identifier LEFTPAREN callargs RIGHTPARENcallargs : expression COMMA callargscallargs : expressioncallargs :statement : RETURN expression SEMICOLONstatement : RETURN SEMICOLON'
+    
+_lr_action_items = {'NOTEQUALS':([23,24,26,44,51,54,55,64,71,72,102,105,106,108,110,113,114,115,128,129,130,131,132,133,134,135,137,139,145,146,147,163,170,171,172,174,175,176,177,178,179,180,181,182,187,],[-17,-15,-16,-20,-36,-19,-21,-35,-63,-38,-64,-39,140,-40,148,-37,140,-18,-60,-56,-61,-62,-54,-57,-58,-55,-59,-65,140,148,-48,-78,-52,140,-51,140,-53,-43,-45,-47,-42,-46,-41,-44,140,]),'CONST':([0,1,7,16,31,32,33,74,],[2,2,2,-6,-5,-8,-7,-9,]),'BOOLEANAND':([23,24,26,44,51,54,55,64,71,72,102,105,106,108,113,114,115,128,129,130,131,132,133,134,135,137,139,145,147,163,170,171,172,174,175,176,177,178,179,180,181,182,187,],[-17,-15,-16,-20,-36,-19,-21,-35,-63,-38,-64,-39,144,-40,-37,144,-18,-60,-56,-61,-62,-54,-57,-58,-55,-59,-65,144,-48,-78,-52,144,-51,-49,-53,-43,-45,-47,-42,-46,-41,-44,144,]),'ELSE':([196,],[197,]),'LESSTHAN':([23,24,26,44,51,54,55,64,71,72,102,110,113,115,128,129,130,131,132,133,134,135,137,139,146,163,],[-17,-15,-16,-20,-36,-19,-21,-35,-63,-38,-64,152,-37,-18,-60,-56,-61,-62,-54,-57,-58,-55,-59,-65,152,-78,]),'RIGHTPAREN':([12,17,22,23,24,26,29,34,36,44,51,54,55,64,70,71,72,83,102,105,106,108,111,113,114,115,121,122,128,129,130,131,132,133,134,135,137,139,145,146,147,163,164,170,171,172,174,175,176,177,178,179,180,181,182,186,],[-19,-12,30,-17,-15,-16,-11,-12,-10,-20,-36,-19,-21,-35,113,-63,-38,-81,-64,-39,143,-40,155,-37,157,-18,163,-80,-60,-56,-61,-62,-54,-57,-58,-55,-59,-65,175,113,-48,-78,-81,-52,-50,-51,-49,-53,-43,-45,-47,-42,-46,-41,-44,-79,]),'IF':([35,38,43,45,61,62,76,77,90,100,101,103,124,126,158,159,160,161,162,166,167,169,173,183,184,185,192,193,194,195,196,197,198,199,201,],[-14,52,-26,52,-14,-83,-31,-32,-25,52,-13,-82,-74,-75,-68,-71,-72,-70,-73,-69,-66,-30,52,52,-76,52,-67,-77,-34,-33,-27,52,52,-29,-28,]),'RETURN':([35,38,43,45,61,62,76,77,90,100,101,103,124,126,158,159,160,161,162,166,167,169,173,183,184,185,192,193,194,195,196,198,199,201,],[-14,40,-26,40,-14,-83,-31,-32,-25,40,-13,-82,-74,-75,-68,-71,-72,-70,-73,-69,-66,-30,40,40,-76,40,-67,-77,-34,-33,-27,40,-29,-28,]),'HEXADECIMAL':([18,19,20,35,38,40,43,45,47,48,49,61,62,63,66,68,73,76,77,78,79,80,81,82,83,84,86,88,89,90,91,92,93,94,95,96,97,98,99,100,101,103,104,107,109,112,124,126,140,141,142,144,148,149,150,151,152,153,154,158,159,160,161,162,164,165,166,167,168,169,173,183,184,185,192,193,194,195,196,198,199,201,],[26,26,26,-14,26,26,-26,26,26,26,26,-14,-83,26,26,26,26,-31,-32,26,26,26,26,26,26,26,26,26,26,-25,26,26,26,26,26,26,26,26,26,26,-13,-82,26,26,26,26,-74,-75,26,26,26,26,26,26,26,26,26,26,26,-68,-71,-72,-70,-73,26,26,-69,-66,26,-30,26,26,-76,26,-67,-77,-34,-33,-27,26,-29,-28,]),'TRUE':([66,73,107,109,140,141,142,144,165,],[105,105,105,105,105,105,105,105,105,]),'MINUS':([23,24,26,44,51,54,55,58,59,64,65,69,70,71,72,102,110,111,113,115,116,117,118,119,120,122,125,127,128,129,130,131,132,133,134,135,136,137,139,146,156,163,176,177,178,179,180,182,188,],[-17,-15,-16,-20,-36,-19,-21,-35,97,-35,97,-64,97,-63,-38,-64,97,97,-37,-18,97,97,97,97,97,97,97,97,97,-56,97,97,-54,-57,97,-55,-65,97,-65,97,97,-78,97,97,97,97,97,97,97,]),'DOT':([54,],[75,]),'PLUSASSIGN':([44,54,55,58,115,],[-20,-19,-21,78,-18,]),'BOOLEANOR':([23,24,26,44,51,54,55,64,71,72,102,105,106,108,113,114,115,128,129,130,131,132,133,134,135,137,139,145,147,163,170,171,172,174,175,176,177,178,179,180,181,182,187,],[-17,-15,-16,-20,-36,-19,-21,-35,-63,-38,-64,-39,141,-40,-37,141,-18,-60,-56,-61,-62,-54,-57,-58,-55,-59,-65,141,-48,-78,-52,-50,-51,-49,-53,-43,-45,-47,-42,-46,-41,-44,141,]),'ORASSIGN':([44,54,55,58,115,],[-20,-19,-21,80,-18,]),'SEMICOLON':([11,12,23,24,25,26,27,28,39,40,44,51,54,55,56,57,58,59,64,65,69,71,72,85,87,102,105,108,113,115,116,117,118,119,120,125,127,128,129,130,131,132,133,134,135,136,137,139,147,156,163,170,171,172,174,175,176,177,178,179,180,181,182,187,188,],[16,-19,-17,-15,31,-16,32,33,61,62,-20,-36,-19,-21,76,77,-35,90,-35,103,-64,-63,-38,124,126,-64,-39,-40,-37,-18,158,159,160,161,162,166,167,-60,-56,-61,-62,-54,-57,-58,-55,-65,-59,-65,-48,184,-78,-52,-50,-51,-49,-53,-43,-45,-47,-42,-46,-41,-44,192,193,]),'DATATYPE':([0,1,2,3,7,16,17,31,32,33,34,35,61,74,],[4,4,9,10,4,-6,21,-5,-8,-7,21,37,37,-9,]),'ANDASSIGN':([44,54,55,58,115,],[-20,-19,-21,82,-18,]),'PLUS':([23,24,26,44,51,54,55,58,59,64,65,69,70,71,72,102,110,111,113,115,116,117,118,119,120,122,125,127,128,129,130,131,132,133,134,135,136,137,139,146,156,163,176,177,178,179,180,182,188,],[-17,-15,-16,-20,-36,-19,-21,-35,94,-35,94,-64,94,-63,-38,-64,94,94,-37,-18,94,94,94,94,94,94,94,94,94,-56,94,94,-54,-57,94,-55,-65,94,-65,94,94,-78,94,94,94,94,94,94,94,]),'INCREMENT':([44,54,55,58,115,],[-20,-19,-21,85,-18,]),'COMMA':([12,23,24,26,29,44,51,54,55,64,71,72,102,113,115,122,128,129,130,131,132,133,134,135,137,139,163,],[-19,-17,-15,-16,34,-20,-36,-19,-21,-35,-63,-38,-64,-37,-18,164,-60,-56,-61,-62,-54,-57,-58,-55,-59,-65,-78,]),'IDENTIFIER':([4,9,10,21,35,37,38,40,43,45,47,48,49,50,61,62,63,66,68,73,75,76,77,78,79,80,81,82,83,86,88,89,90,91,92,93,94,95,96,97,98,99,100,101,103,104,107,109,112,124,126,140,141,142,144,148,149,150,151,152,154,158,159,160,161,162,164,165,166,167,168,169,173,183,184,185,192,193,194,195,196,198,199,201,],[12,12,12,12,-14,12,54,54,-26,54,54,54,54,54,-14,-83,54,54,54,54,115,-31,-32,54,54,54,54,54,54,54,54,54,-25,54,54,54,54,54,54,54,54,54,54,-13,-82,54,54,54,54,-74,-75,54,54,54,54,54,54,54,54,54,54,-68,-71,-72,-70,-73,54,54,-69,-66,54,-30,54,54,-76,54,-67,-77,-34,-33,-27,54,-29,-28,]),'ASSIGN':([11,12,14,15,23,24,26,44,51,54,55,58,64,69,71,72,102,113,115,123,128,129,130,131,132,133,134,135,136,137,139,163,],[18,-19,19,20,-17,-15,-16,-20,-36,-19,-21,88,-35,112,-63,-38,-64,-37,-18,165,-60,-56,-61,-62,-54,-57,-58,-55,168,-59,-65,-78,]),'DEREFOFFSET':([23,24,26,44,51,54,55,58,59,64,65,69,70,71,72,102,110,111,113,115,116,117,118,119,120,122,125,127,128,129,130,131,132,133,134,135,136,137,139,146,156,163,176,177,178,179,180,182,188,],[-17,-15,-16,-20,-36,-19,-21,-35,98,-35,104,104,104,104,-38,104,104,104,-37,-18,104,104,104,104,104,104,104,104,104,104,104,104,104,104,104,104,-65,104,-65,104,104,-78,104,104,104,104,104,104,104,]),'$end':([0,1,5,6,7,8,13,16,31,32,33,74,],[-4,-4,-1,0,-4,-3,-2,-6,-5,-8,-7,-9,]),'ASTERISKASSIGN':([44,54,55,58,115,],[-20,-19,-21,81,-18,]),'REPEAT':([35,38,43,45,61,62,76,77,90,100,101,103,124,126,158,159,160,161,162,166,167,169,173,183,184,185,192,193,194,195,196,198,199,201,],[-14,46,-26,46,-14,-83,-31,-32,-25,46,-13,-82,-74,-75,-68,-71,-72,-70,-73,-69,-66,-30,46,46,-76,46,-67,-77,-34,-33,-27,46,-29,-28,]),'XOR':([23,24,26,44,51,54,55,58,59,64,65,69,70,71,72,102,110,111,113,115,116,117,118,119,120,122,125,127,128,129,130,131,132,133,134,135,136,137,139,146,156,163,176,177,178,179,180,182,188,],[-17,-15,-16,-20,-36,-19,-21,-35,89,-35,89,-64,89,-63,-38,-64,89,89,-37,-18,89,89,89,89,89,89,89,89,-60,-56,89,89,-54,-57,-58,-55,-65,89,-65,89,89,-78,89,89,89,89,89,89,89,]),'ASTERISK':([23,24,26,35,38,40,43,44,45,47,48,49,51,54,55,58,59,61,62,63,64,65,66,68,69,70,71,72,73,76,77,78,79,80,81,82,83,86,88,89,90,91,92,93,94,95,96,97,98,99,100,101,102,103,104,107,109,110,111,112,113,115,116,117,118,119,120,122,124,125,126,127,128,129,130,131,132,133,134,135,136,137,139,140,141,142,144,146,148,149,150,151,152,154,156,158,159,160,161,162,163,164,165,166,167,168,169,173,176,177,178,179,180,182,183,184,185,188,192,193,194,195,196,198,199,201,],[-17,-15,-16,-14,47,63,-26,-20,47,63,63,63,-36,-19,-21,-35,91,-14,-83,63,-35,91,63,63,-64,91,-63,-38,63,-31,-32,63,63,63,63,63,63,63,63,63,-25,63,63,63,63,63,63,63,63,63,47,-13,-64,-82,63,63,63,91,91,63,-37,-18,91,91,91,91,91,91,-74,91,-75,91,91,-56,91,91,91,-57,91,91,-65,91,-65,63,63,63,63,91,63,63,63,63,63,63,91,-68,-71,-72,-70,-73,-78,63,63,-69,-66,63,-30,47,91,91,91,91,91,91,47,-76,47,91,-67,-77,-34,-33,-27,47,-29,-28,]),'DECIMAL':([18,19,20,35,38,40,43,45,47,48,49,61,62,63,66,68,73,76,77,78,79,80,81,82,83,84,86,88,89,90,91,92,93,94,95,96,97,98,99,100,101,103,104,107,109,112,124,126,140,141,142,144,148,149,150,151,152,153,154,158,159,160,161,162,164,165,166,167,168,169,173,183,184,185,192,193,194,195,196,198,199,201,],[24,24,24,-14,24,24,-26,24,24,24,24,-14,-83,24,24,24,24,-31,-32,24,24,24,24,24,24,24,24,24,24,-25,24,24,24,24,24,24,24,24,24,24,-13,-82,24,24,24,24,-74,-75,24,24,24,24,24,24,24,24,24,24,24,-68,-71,-72,-70,-73,24,24,-69,-66,24,-30,24,24,-76,24,-67,-77,-34,-33,-27,24,-29,-28,]),'LEFTPAREN':([11,12,35,38,40,42,43,44,45,46,47,48,49,52,54,55,58,61,62,63,64,66,68,73,76,77,78,79,80,81,82,83,86,88,89,90,91,92,93,94,95,96,97,98,99,100,101,103,104,107,109,112,115,124,126,140,141,142,144,148,149,150,151,152,154,158,159,160,161,162,164,165,166,167,168,169,173,183,184,185,192,193,194,195,196,198,199,201,],[17,-19,-14,48,48,66,-26,-20,48,68,48,48,48,73,-19,-21,83,-14,-83,48,83,107,48,107,-31,-32,48,48,48,48,48,48,48,48,48,-25,48,48,48,48,48,48,48,48,48,48,-13,-82,48,107,107,48,-18,-74,-75,107,107,107,107,48,48,48,48,48,48,-68,-71,-72,-70,-73,48,107,-69,-66,48,-30,48,48,-76,48,-67,-77,-34,-33,-27,48,-29,-28,]),'EQUALS':([23,24,26,44,51,54,55,64,71,72,102,105,106,108,110,113,114,115,128,129,130,131,132,133,134,135,137,139,145,146,147,163,170,171,172,174,175,176,177,178,179,180,181,182,187,],[-17,-15,-16,-20,-36,-19,-21,-35,-63,-38,-64,-39,142,-40,151,-37,142,-18,-60,-56,-61,-62,-54,-57,-58,-55,-59,-65,142,151,-48,-78,-52,142,-51,142,-53,-43,-45,-47,-42,-46,-41,-44,142,]),'SHIFTLEFT':([23,24,26,44,51,54,55,58,59,64,65,69,70,71,72,102,110,111,113,115,116,117,118,119,120,122,125,127,128,129,130,131,132,133,134,135,136,137,139,146,156,163,176,177,178,179,180,182,188,],[-17,-15,-16,-20,-36,-19,-21,-35,92,-35,92,-64,92,-63,-38,-64,92,92,-37,-18,92,92,92,92,92,92,92,92,-60,-56,92,92,-54,-57,-58,-55,-65,-59,-65,92,92,-78,92,92,92,92,92,92,92,]),'RIGHTBRACE':([35,38,41,43,45,53,61,62,67,76,77,90,100,101,103,124,126,138,158,159,160,161,162,166,167,169,173,183,184,185,189,190,191,192,193,194,195,196,198,199,200,201,],[-14,-24,-22,-26,-24,74,-14,-83,-23,-31,-32,-25,-24,-13,-82,-74,-75,169,-68,-71,-72,-70,-73,-69,-66,-30,-24,-24,-76,-24,194,195,196,-67,-77,-34,-33,-27,-24,-29,201,-28,]),'SHIFTRIGHT':([23,24,26,44,51,54,55,58,59,64,65,69,70,71,72,102,110,111,113,115,116,117,118,119,120,122,125,127,128,129,130,131,132,133,134,135,136,137,139,146,156,163,176,177,178,179,180,182,188,],[-17,-15,-16,-20,-36,-19,-21,-35,93,-35,93,-64,93,-63,-38,-64,93,93,-37,-18,93,93,93,93,93,93,93,93,-60,-56,93,93,-54,-57,-58,-55,-65,-59,-65,93,93,-78,93,93,93,93,93,93,93,]),'MINUSASSIGN':([44,54,55,58,115,],[-20,-19,-21,86,-18,]),'GREATERTHAN':([23,24,26,44,51,54,55,64,71,72,102,110,113,115,128,129,130,131,132,133,134,135,137,139,146,163,],[-17,-15,-16,-20,-36,-19,-21,-35,-63,-38,-64,154,-37,-18,-60,-56,-61,-62,-54,-57,-58,-55,-59,-65,154,-78,]),'SLASH':([23,24,26,44,51,54,55,58,59,64,65,69,70,71,72,102,110,111,113,115,116,117,118,119,120,122,125,127,128,129,130,131,132,133,134,135,136,137,139,146,156,163,176,177,178,179,180,182,188,],[-17,-15,-16,-20,-36,-19,-21,-35,95,-35,95,-64,95,-63,-38,-64,95,95,-37,-18,95,95,95,95,95,95,95,95,95,-56,95,95,95,-57,95,95,-65,95,-65,95,95,-78,95,95,95,95,95,95,95,]),'FALSE':([66,73,107,109,140,141,142,144,165,],[108,108,108,108,108,108,108,108,108,]),'SLASHASSIGN':([44,54,55,58,115,],[-20,-19,-21,79,-18,]),'LEFTBRACE':([30,60,143,155,157,197,],[35,100,173,183,185,198,]),'BINARY':([18,19,20,35,38,40,43,45,47,48,49,61,62,63,66,68,73,76,77,78,79,80,81,82,83,84,86,88,89,90,91,92,93,94,95,96,97,98,99,100,101,103,104,107,109,112,124,126,140,141,142,144,148,149,150,151,152,153,154,158,159,160,161,162,164,165,166,167,168,169,173,183,184,185,192,193,194,195,196,198,199,201,],[23,23,23,-14,23,23,-26,23,23,23,23,-14,-83,23,23,23,23,-31,-32,23,23,23,23,23,23,23,23,23,23,-25,23,23,23,23,23,23,23,23,23,23,-13,-82,23,23,23,23,-74,-75,23,23,23,23,23,23,23,23,23,23,23,-68,-71,-72,-70,-73,23,23,-69,-66,23,-30,23,23,-76,23,-67,-77,-34,-33,-27,23,-29,-28,]),'AMPERSAND':([23,24,26,35,38,40,43,44,45,47,48,49,51,54,55,58,59,61,62,63,64,65,66,68,69,70,71,72,73,76,77,78,79,80,81,82,83,86,88,89,90,91,92,93,94,95,96,97,98,99,100,101,102,103,104,107,109,110,111,112,113,115,116,117,118,119,120,122,124,125,126,127,128,129,130,131,132,133,134,135,136,137,139,140,141,142,144,146,148,149,150,151,152,154,156,158,159,160,161,162,163,164,165,166,167,168,169,173,176,177,178,179,180,182,183,184,185,188,192,193,194,195,196,198,199,201,],[-17,-15,-16,-14,50,50,-26,-20,50,50,50,50,-36,-19,-21,-35,96,-14,-83,50,-35,96,50,50,-64,96,-63,-38,50,-31,-32,50,50,50,50,50,50,50,50,50,-25,50,50,50,50,50,50,50,50,50,50,-13,-64,-82,50,50,50,96,96,50,-37,-18,96,96,96,96,96,96,-74,96,-75,96,96,-56,96,96,-54,-57,-58,-55,-65,96,-65,50,50,50,50,96,50,50,50,50,50,50,96,-68,-71,-72,-70,-73,-78,50,50,-69,-66,50,-30,50,96,96,96,96,96,96,50,-76,50,96,-67,-77,-34,-33,-27,50,-29,-28,]),'ADDR':([0,1,7,16,31,32,33,74,],[3,3,3,-6,-5,-8,-7,-9,]),'LESSEQUALS':([23,24,26,44,51,54,55,64,71,72,102,110,113,115,128,129,130,131,132,133,134,135,137,139,146,163,],[-17,-15,-16,-20,-36,-19,-21,-35,-63,-38,-64,150,-37,-18,-60,-56,-61,-62,-54,-57,-58,-55,-59,-65,150,-78,]),'WHILE':([35,38,43,45,61,62,76,77,90,100,101,103,124,126,158,159,160,161,162,166,167,169,173,183,184,185,192,193,194,195,196,198,199,201,],[-14,42,-26,42,-14,-83,-31,-32,-25,42,-13,-82,-74,-75,-68,-71,-72,-70,-73,-69,-66,-30,42,42,-76,42,-67,-77,-34,-33,-27,42,-29,-28,]),'BREAK':([35,38,43,45,61,62,76,77,90,100,101,103,124,126,158,159,160,161,162,166,167,169,173,183,184,185,192,193,194,195,196,198,199,201,],[-14,56,-26,56,-14,-83,-31,-32,-25,56,-13,-82,-74,-75,-68,-71,-72,-70,-73,-69,-66,-30,56,56,-76,56,-67,-77,-34,-33,-27,56,-29,-28,]),'BITOPERATOR':([23,24,26,44,51,54,55,58,64,71,72,102,110,113,115,128,129,130,131,132,133,134,135,137,139,146,163,],[-17,-15,-16,-20,-36,-19,-21,84,-35,-63,-38,-64,153,-37,-18,-60,-56,-61,-62,-54,-57,-58,-55,-59,-65,153,-78,]),'CONTINUE':([35,38,43,45,61,62,76,77,90,100,101,103,124,126,158,159,160,161,162,166,167,169,173,183,184,185,192,193,194,195,196,198,199,201,],[-14,57,-26,57,-14,-83,-31,-32,-25,57,-13,-82,-74,-75,-68,-71,-72,-70,-73,-69,-66,-30,57,57,-76,57,-67,-77,-34,-33,-27,57,-29,-28,]),'BOOLEANNOT':([66,73,107,109,140,141,142,144,165,],[109,109,109,109,109,109,109,109,109,]),'NOT':([35,38,40,43,45,47,48,49,61,62,63,66,68,73,76,77,78,79,80,81,82,83,86,88,89,90,91,92,93,94,95,96,97,98,99,100,101,103,104,107,109,112,124,126,140,141,142,144,148,149,150,151,152,154,158,159,160,161,162,164,165,166,167,168,169,173,183,184,185,192,193,194,195,196,198,199,201,],[-14,49,49,-26,49,49,49,49,-14,-83,49,49,49,49,-31,-32,49,49,49,49,49,49,49,49,49,-25,49,49,49,49,49,49,49,49,49,49,-13,-82,49,49,49,49,-74,-75,49,49,49,49,49,49,49,49,49,49,-68,-71,-72,-70,-73,49,49,-69,-66,49,-30,49,49,-76,49,-67,-77,-34,-33,-27,49,-29,-28,]),'GREATEREQUALS':([23,24,26,44,51,54,55,64,71,72,102,110,113,115,128,129,130,131,132,133,134,135,137,139,146,163,],[-17,-15,-16,-20,-36,-19,-21,-35,-63,-38,-64,149,-37,-18,-60,-56,-61,-62,-54,-57,-58,-55,-59,-65,149,-78,]),'DECREMENT':([44,54,55,58,115,],[-20,-19,-21,87,-18,]),'OR':([23,24,26,44,51,54,55,58,59,64,65,69,70,71,72,102,110,111,113,115,116,117,118,119,120,122,125,127,128,129,130,131,132,133,134,135,136,137,139,146,156,163,176,177,178,179,180,182,188,],[-17,-15,-16,-20,-36,-19,-21,-35,99,-35,99,-64,99,-63,-38,-64,99,99,-37,-18,99,99,99,99,99,99,99,99,-60,-56,99,99,-54,-57,-58,-55,-65,-59,-65,99,99,-78,99,99,99,99,99,99,99,]),'LOOP':([35,38,43,45,61,62,76,77,90,100,101,103,124,126,158,159,160,161,162,166,167,169,173,183,184,185,192,193,194,195,196,198,199,201,],[-14,60,-26,60,-14,-83,-31,-32,-25,60,-13,-82,-74,-75,-68,-71,-72,-70,-73,-69,-66,-30,60,60,-76,60,-67,-77,-34,-33,-27,60,-29,-28,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'function':([0,1,7,],[1,1,1,]),'unqualifiedidentifier':([4,9,10,21,37,38,40,45,47,48,49,50,63,66,68,73,78,79,80,81,82,83,86,88,89,91,92,93,94,95,96,97,98,99,100,104,107,109,112,140,141,142,144,148,149,150,151,152,154,164,165,168,173,183,185,198,],[11,14,15,29,39,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,]),'identifier':([38,40,45,47,48,49,50,63,66,68,73,78,79,80,81,82,83,86,88,89,91,92,93,94,95,96,97,98,99,100,104,107,109,112,140,141,142,144,148,149,150,151,152,154,164,165,168,173,183,185,198,],[58,64,58,64,64,64,72,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,58,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,58,58,58,58,]),'statementblockcontents':([38,45,100,173,183,185,198,],[41,67,41,41,41,41,41,]),'datafieldsorfunctions':([0,1,7,],[5,8,13,]),'booleanexpression':([66,73,107,109,140,141,142,144,165,],[106,114,145,147,170,171,172,174,187,]),'qualifiedidentifier':([38,40,45,47,48,49,50,63,66,68,73,78,79,80,81,82,83,86,88,89,91,92,93,94,95,96,97,98,99,100,104,107,109,112,140,141,142,144,148,149,150,151,152,154,164,165,168,173,183,185,198,],[55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,]),'statementblock':([38,100,173,183,185,198,],[53,138,189,190,191,200,]),'module':([0,],[6,]),'datafield':([0,1,7,],[7,7,7,]),'statement':([38,45,100,173,183,185,198,],[45,45,45,45,45,45,45,]),'callargs':([83,164,],[121,186,]),'integer':([18,19,20,38,40,45,47,48,49,63,66,68,73,78,79,80,81,82,83,84,86,88,89,91,92,93,94,95,96,97,98,99,100,104,107,109,112,140,141,142,144,148,149,150,151,152,153,154,164,165,168,173,183,185,198,],[25,27,28,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,123,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,181,51,51,51,51,51,51,51,51,]),'functionargs':([17,34,],[22,36,]),'expression':([38,40,45,47,48,49,63,66,68,73,78,79,80,81,82,83,86,88,89,91,92,93,94,95,96,97,98,99,100,104,107,109,112,140,141,142,144,148,149,150,151,152,154,164,165,168,173,183,185,198,],[59,65,59,69,70,71,102,110,111,110,116,117,118,119,120,122,125,127,128,129,130,131,132,133,134,135,136,137,59,139,146,110,156,110,110,110,110,176,177,178,179,180,182,122,110,188,59,59,59,59,]),'functionlocals':([35,61,],[38,101,]),'if':([38,45,100,173,183,185,197,198,],[43,43,43,43,43,43,199,43,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> module","S'",1,None,None,None),
+  ('module -> datafieldsorfunctions','module',1,'p_module','dcparser.py',53),
+  ('datafieldsorfunctions -> datafield datafieldsorfunctions','datafieldsorfunctions',2,'p_datafieldlist','dcparser.py',57),
+  ('datafieldsorfunctions -> function datafieldsorfunctions','datafieldsorfunctions',2,'p_functionlist','dcparser.py',63),
+  ('datafieldsorfunctions -> <empty>','datafieldsorfunctions',0,'p_nomodulecontents','dcparser.py',69),
+  ('datafield -> DATATYPE unqualifiedidentifier ASSIGN integer SEMICOLON','datafield',5,'p_datafieldwithdefault','dcparser.py',76),
+  ('datafield -> DATATYPE unqualifiedidentifier SEMICOLON','datafield',3,'p_datafield','dcparser.py',82),
+  ('datafield -> ADDR DATATYPE unqualifiedidentifier ASSIGN integer SEMICOLON','datafield',6,'p_addr','dcparser.py',87),
+  ('datafield -> CONST DATATYPE unqualifiedidentifier ASSIGN integer SEMICOLON','datafield',6,'p_const','dcparser.py',94),
+  ('function -> DATATYPE unqualifiedidentifier LEFTPAREN functionargs RIGHTPAREN LEFTBRACE functionlocals statementblock RIGHTBRACE','function',9,'p_function','dcparser.py',98),
+  ('functionargs -> DATATYPE unqualifiedidentifier COMMA functionargs','functionargs',4,'p_functionargs','dcparser.py',107),
+  ('functionargs -> DATATYPE unqualifiedidentifier','functionargs',2,'p_functionargsone','dcparser.py',112),
+  ('functionargs -> <empty>','functionargs',0,'p_nofunctionargs','dcparser.py',117),
+  ('functionlocals -> DATATYPE unqualifiedidentifier SEMICOLON functionlocals','functionlocals',4,'p_functionlocals','dcparser.py',121),
+  ('functionlocals -> <empty>','functionlocals',0,'p_nofunctionlocals','dcparser.py',126),
+  ('integer -> DECIMAL','integer',1,'p_integer','dcparser.py',132),
+  ('integer -> HEXADECIMAL','integer',1,'p_integer','dcparser.py',133),
+  ('integer -> BINARY','integer',1,'p_integer','dcparser.py',134),
+  ('qualifiedidentifier -> IDENTIFIER DOT IDENTIFIER','qualifiedidentifier',3,'p_qualifiedidentifier','dcparser.py',140),
+  ('unqualifiedidentifier -> IDENTIFIER','unqualifiedidentifier',1,'p_unqualifiedidentifier','dcparser.py',145),
+  ('identifier -> unqualifiedidentifier','identifier',1,'p_anyidentifier','dcparser.py',149),
+  ('identifier -> qualifiedidentifier','identifier',1,'p_anyidentifier','dcparser.py',150),
+  ('statementblock -> statementblockcontents','statementblock',1,'p_statementblockfinal','dcparser.py',156),
+  ('statementblockcontents -> statement statementblockcontents','statementblockcontents',2,'p_statementblock','dcparser.py',160),
+  ('statementblockcontents -> <empty>','statementblockcontents',0,'p_emptystatementblock','dcparser.py',164),
+  ('statement -> expression SEMICOLON','statement',2,'p_expressionstatement','dcparser.py',168),
+  ('statement -> if','statement',1,'p_ifstatement','dcparser.py',174),
+  ('if -> IF LEFTPAREN booleanexpression RIGHTPAREN LEFTBRACE statementblock RIGHTBRACE','if',7,'p_if','dcparser.py',178),
+  ('if -> IF LEFTPAREN booleanexpression RIGHTPAREN LEFTBRACE statementblock RIGHTBRACE ELSE LEFTBRACE statementblock RIGHTBRACE','if',11,'p_ifelse','dcparser.py',182),
+  ('if -> IF LEFTPAREN booleanexpression RIGHTPAREN LEFTBRACE statementblock RIGHTBRACE ELSE if','if',9,'p_ifelseif','dcparser.py',186),
+  ('statement -> LOOP LEFTBRACE statementblock RIGHTBRACE','statement',4,'p_loop','dcparser.py',190),
+  ('statement -> BREAK SEMICOLON','statement',2,'p_break','dcparser.py',194),
+  ('statement -> CONTINUE SEMICOLON','statement',2,'p_continue','dcparser.py',198),
+  ('statement -> REPEAT LEFTPAREN expression RIGHTPAREN LEFTBRACE statementblock RIGHTBRACE','statement',7,'p_repeat','dcparser.py',202),
+  ('statement -> WHILE LEFTPAREN booleanexpression RIGHTPAREN LEFTBRACE statementblock RIGHTBRACE','statement',7,'p_while','dcparser.py',206),
+  ('expression -> identifier','expression',1,'p_identifier','dcparser.py',212),
+  ('expression -> integer','expression',1,'p_constant','dcparser.py',216),
+  ('expression -> LEFTPAREN expression RIGHTPAREN','expression',3,'p_parentheses','dcparser.py',220),
+  ('expression -> AMPERSAND identifier','expression',2,'p_addressof','dcparser.py',224),
+  ('booleanexpression -> TRUE','booleanexpression',1,'p_booleanconstant','dcparser.py',230),
+  ('booleanexpression -> FALSE','booleanexpression',1,'p_booleanconstant','dcparser.py',231),
+  ('booleanexpression -> expression BITOPERATOR integer','booleanexpression',3,'p_getbit','dcparser.py',235),
+  ('booleanexpression -> expression EQUALS expression','booleanexpression',3,'p_equals','dcparser.py',239),
+  ('booleanexpression -> expression NOTEQUALS expression','booleanexpression',3,'p_notequals','dcparser.py',243),
+  ('booleanexpression -> expression GREATERTHAN expression','booleanexpression',3,'p_greaterthan','dcparser.py',247),
+  ('booleanexpression -> expression GREATEREQUALS expression','booleanexpression',3,'p_greaterequals','dcparser.py',251),
+  ('booleanexpression -> expression LESSTHAN expression','booleanexpression',3,'p_lessthan','dcparser.py',255),
+  ('booleanexpression -> expression LESSEQUALS expression','booleanexpression',3,'p_lessequals','dcparser.py',259),
+  ('booleanexpression -> BOOLEANNOT booleanexpression','booleanexpression',2,'p_booleannot','dcparser.py',263),
+  ('booleanexpression -> booleanexpression BOOLEANAND booleanexpression','booleanexpression',3,'p_booleanand','dcparser.py',267),
+  ('booleanexpression -> booleanexpression BOOLEANOR booleanexpression','booleanexpression',3,'p_booleanor','dcparser.py',271),
+  ('booleanexpression -> booleanexpression EQUALS booleanexpression','booleanexpression',3,'p_booleanequals','dcparser.py',275),
+  ('booleanexpression -> booleanexpression NOTEQUALS booleanexpression','booleanexpression',3,'p_booleannotequals','dcparser.py',279),
+  ('booleanexpression -> LEFTPAREN booleanexpression RIGHTPAREN','booleanexpression',3,'p_booleanparentheses','dcparser.py',283),
+  ('expression -> expression PLUS expression','expression',3,'p_binaryoperatorplus','dcparser.py',289),
+  ('expression -> expression MINUS expression','expression',3,'p_binaryoperatorminus','dcparser.py',293),
+  ('expression -> expression ASTERISK expression','expression',3,'p_binaryoperatortimes','dcparser.py',297),
+  ('expression -> expression SLASH expression','expression',3,'p_binaryoperatordivision','dcparser.py',301),
+  ('expression -> expression AMPERSAND expression','expression',3,'p_binaryoperatorand','dcparser.py',305),
+  ('expression -> expression OR expression','expression',3,'p_binaryoperatoror','dcparser.py',309),
+  ('expression -> expression XOR expression','expression',3,'p_binaryoperatorxor','dcparser.py',313),
+  ('expression -> expression SHIFTLEFT expression','expression',3,'p_binaryoperatorshiftleft','dcparser.py',317),
+  ('expression -> expression SHIFTRIGHT expression','expression',3,'p_binaryoperatorshiftright','dcparser.py',321),
+  ('expression -> NOT expression','expression',2,'p_unaryoperatornot','dcparser.py',325),
+  ('expression -> ASTERISK expression','expression',2,'p_dereference','dcparser.py',329),
+  ('expression -> expression DEREFOFFSET expression','expression',3,'p_dereferenceoffset','dcparser.py',333),
+  ('statement -> identifier ASSIGN expression SEMICOLON','statement',4,'p_assignment','dcparser.py',340),
+  ('statement -> identifier BITOPERATOR integer ASSIGN booleanexpression SEMICOLON','statement',6,'p_setbit','dcparser.py',344),
+  ('statement -> identifier PLUSASSIGN expression SEMICOLON','statement',4,'p_addassign','dcparser.py',348),
+  ('statement -> identifier MINUSASSIGN expression SEMICOLON','statement',4,'p_subtractassign','dcparser.py',355),
+  ('statement -> identifier ASTERISKASSIGN expression SEMICOLON','statement',4,'p_multiplyassign','dcparser.py',362),
+  ('statement -> identifier SLASHASSIGN expression SEMICOLON','statement',4,'p_divideassign','dcparser.py',369),
+  ('statement -> identifier ORASSIGN expression SEMICOLON','statement',4,'p_orassign','dcparser.py',376),
+  ('statement -> identifier ANDASSIGN expression SEMICOLON','statement',4,'p_plusassign','dcparser.py',383),
+  ('statement -> identifier INCREMENT SEMICOLON','statement',3,'p_increment','dcparser.py',390),
+  ('statement -> identifier DECREMENT SEMICOLON','statement',3,'p_decrement','dcparser.py',394),
+  ('statement -> ASTERISK expression ASSIGN expression SEMICOLON','statement',5,'p_derefassignment','dcparser.py',400),
+  ('statement -> expression DEREFOFFSET expression ASSIGN expression SEMICOLON','statement',6,'p_derefoffsetassignment','dcparser.py',404),
+  ('expression -> identifier LEFTPAREN callargs RIGHTPAREN','expression',4,'p_call','dcparser.py',411),
+  ('callargs -> expression COMMA callargs','callargs',3,'p_callargs','dcparser.py',415),
+  ('callargs -> expression','callargs',1,'p_callargsone','dcparser.py',419),
+  ('callargs -> <empty>','callargs',0,'p_nocallargs','dcparser.py',423),
+  ('statement -> RETURN expression SEMICOLON','statement',3,'p_return','dcparser.py',427),
+  ('statement -> RETURN SEMICOLON','statement',2,'p_returnnothing','dcparser.py',431),
+]
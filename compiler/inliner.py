@@ -0,0 +1,218 @@
+import copy
+
+from asmgenerator import CompilationContext
+from syntaxitems import Assignment, Call, Decrement, Discard, Identifier, Increment, InlinedBody, LeaveInlinedBody, Repeat, Return, ReturnValue, SetBit, StatementBlock
+
+def children(item):
+	'''Returns the syntax items directly contained in item.'''
+
+	if isinstance(item, StatementBlock):
+		return item.statements
+	if isinstance(item, Call):
+		return item.arglist
+
+	return [getattr(item, name) for name in item.argumentNames if name not in item.passiveArguments]
+
+def syntaxItems(item):
+	'''Returns item and all syntax items contained in it.'''
+
+	items = [item]
+
+	for child in children(item):
+		items += syntaxItems(child)
+
+	return items
+
+def assignedVariables(item):
+	'''Returns the names of the variables and data fields assigned to in item.'''
+
+	return set(statement.target for statement in syntaxItems(item) if isinstance(statement, (Assignment, Decrement, Increment, SetBit)))
+
+def renameVariables(item, names):
+	'''Renames the variables in item according to names, which maps old names to new ones.'''
+
+	for statement in syntaxItems(item):
+		if isinstance(statement, Identifier):
+			statement.name = names.get(statement.name, statement.name)
+		elif isinstance(statement, (Assignment, Decrement, Increment, SetBit)):
+			statement.target = names.get(statement.target, statement.target)
+
+class Inliner(object):
+	'''
+	Inlines calls to small functions on the syntax tree.
+
+	A call is inlined when it is a statement of its own, the value of an
+	assignment or the returned value, and the code of the function's body is
+	at most limit words. The arguments and local variables of the function
+	become local variables of the caller. An argument that is a local
+	variable of the caller is used as it is when the function does not assign
+	to it. Returns become an assignment of the returned value, followed by a
+	jump to the end of the inlined body instead of the function's ret_ label;
+	when the call is returned, they stay returns of the caller.
+
+	Functions are inlined into the functions they call first, so calls inlined
+	from them are inlined too. Recursive calls are never inlined.
+	'''
+
+	def __init__(self, functions, limit):
+		self.functions = functions
+		self.limit = limit
+
+		# (caller, function) -> number of inlined calls
+		self.inlined = {}
+
+		# function -> words of code of its body
+		self.sizes = {}
+
+		self.done = set()
+		self.active = set()
+
+	def inlineAll(self):
+		'''Inlines calls in every function. Returns the names of the functions that changed.'''
+
+		for name in sorted(self.functions):
+			self.inlineCalls(self.functions[name])
+
+		return sorted(set(caller for caller, function in self.inlined))
+
+	def inlineCalls(self, function):
+		if function.name in self.done or not function.hasStatementBlock:
+			return
+
+		self.active.add(function.name)
+
+		blocks = [item for item in syntaxItems(function.statementblock) if isinstance(item, StatementBlock)]
+
+		for block in blocks:
+			block.statements = [self.inlineStatement(function, statement) for statement in block.statements]
+
+		self.active.remove(function.name)
+		self.done.add(function.name)
+
+	def inlineStatement(self, caller, statement):
+		'''Returns the statement, or an InlinedBody replacing it if its call is inlined.'''
+
+		if isinstance(statement, Discard):
+			call = statement.expression
+		elif isinstance(statement, (Assignment, ReturnValue)):
+			call = statement.value
+		else:
+			return statement
+
+		if not isinstance(call, Call):
+			return statement
+
+		function = self.functions[call.function]
+
+		if not self.canInline(function):
+			return statement
+
+		# the value of void functions cannot be used; the error is reported for the call
+		if function.datatype == 'void' and not isinstance(statement, Discard):
+			return statement
+
+		return self.inline(caller, function, call, statement)
+
+	def canInline(self, function):
+		if not function.hasStatementBlock or function.name in self.active:
+			return False
+
+		self.inlineCalls(function)
+
+		# a return in a repeat loop would leave the repeat counter on the stack
+		for loop in syntaxItems(function.statementblock):
+			if isinstance(loop, Repeat) and any(isinstance(item, (Return, ReturnValue)) for item in syntaxItems(loop.body)):
+				return False
+
+		return self.size(function) <= self.limit
+
+	def size(self, function):
+		'''Returns the words of code of the body of function, with its variables on the stack.'''
+
+		if function.name not in self.sizes:
+			code = function.statementblock.transformToAsm(CompilationContext(), function, None)
+			self.sizes[function.name] = sum(instruction.size() for instruction in code)
+
+		return self.sizes[function.name]
+
+	def inline(self, caller, function, call, statement):
+		number = sum(self.inlined.get((caller.name, name), 0) for name in self.functions)
+
+		body = copy.deepcopy(function.statementblock)
+		inlined = InlinedBody(call.filename, call.line, function.name, body)
+
+		names = {}
+		arguments = []
+		assigned = assignedVariables(body)
+
+		# the arguments are pushed in order, so the last one is the first argument of the function
+		for arg, value in zip(reversed(function.args), call.arglist):
+			if isinstance(value, Identifier) and '.' not in value.name and arg.name not in assigned:
+				names[arg.name] = value.name
+				continue
+
+			names[arg.name] = self.defineLocal(caller, arg, number)
+			arguments.append(Assignment(call.filename, call.line, names[arg.name], value))
+
+		for local in function.locals:
+			names[local.name] = self.defineLocal(caller, local, number)
+
+		renameVariables(body, names)
+
+		if not isinstance(statement, ReturnValue):
+			self.replaceReturns(body, statement, inlined)
+
+		body.statements = arguments + body.statements
+
+		self.inlined[caller.name, function.name] = self.inlined.get((caller.name, function.name), 0) + 1
+		caller.inlinedFunctions = set(caller.inlinedFunctions) | set([function.name]) | set(function.inlinedFunctions)
+
+		return inlined
+
+	def defineLocal(self, caller, variable, number):
+		# $ cannot appear in names in the source, so the name is unique
+		name = '%s$%d' % (variable.name, number)
+		caller.defineLocal(name, variable.datatype)
+
+		return name
+
+	def replaceReturns(self, body, statement, inlined):
+		'''Replaces the returns in body by an assignment to the target of statement and a jump to the end of inlined.'''
+
+		for block in syntaxItems(body):
+			if not isinstance(block, StatementBlock):
+				continue
+
+			statements = []
+
+			for item in block.statements:
+				if isinstance(item, ReturnValue):
+					if isinstance(statement, Assignment):
+						statements.append(Assignment(item.filename, item.line, statement.target, item.value))
+					else:
+						# optimizing removes the value if it calls no function
+						statements.append(Discard(item.filename, item.line, item.value))
+				elif not isinstance(item, Return):
+					statements.append(item)
+					continue
+
+				statements.append(LeaveInlinedBody(item.filename, item.line, inlined))
+
+			block.statements = statements
+
+	def write(self, out):
+		if not self.inlined:
+			print >>out, 'Inlined calls: none (limit %d words)' % self.limit
+			return
+
+		print >>out, 'Inlined calls (limit %d words)' % self.limit
+		print >>out, '  %-30s %-30s %6s %6s' % ('Caller', 'Function', 'Calls', 'Words')
+
+		for caller, function in sorted(self.inlined):
+			print >>out, '    %-28s %-30s %6d %6d' % (caller, function, self.inlined[caller, function], self.sizes[function])
+
+	def toJson(self):
+		return {
+			'limit': self.limit,
+			'calls': [{'caller': caller, 'function': function, 'calls': calls, 'words': self.sizes[function]} for (caller, function), calls in sorted(self.inlined.iteritems())],
+		}
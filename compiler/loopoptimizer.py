@@ -0,0 +1,395 @@
+import copy
+
+from inliner import assignedVariables, children, syntaxItems
+from syntaxitems import Addition, Assignment, Call, Constant, Decrement, DerefAssignment, Dereference, Equals, Identifier, Increment, Loop, NotEquals, Repeat, SetBit, StatementBlock, Subtraction, While
+from syntaxitems.booleanexpression import BooleanExpressionBase
+from syntaxitems.expression import constantOffset
+
+loopTypes = (Loop, Repeat, While)
+
+def loopItems(loop):
+	'''Returns the syntax items evaluated every time around loop: the condition of a while loop and the body.'''
+
+	if isinstance(loop, While):
+		return syntaxItems(loop.condition) + syntaxItems(loop.body)
+
+	return syntaxItems(loop.body)
+
+def expressionKey(expression):
+	'''Returns a value that is the same for expressions computing the same value the same way.'''
+
+	return (type(expression),) + tuple(getattr(expression, name) if name in expression.passiveArguments else expressionKey(getattr(expression, name)) for name in expression.argumentNames)
+
+def replaceExpression(expression, replace):
+	'''Returns what replace returns for expression, or expression with the expressions in it replaced if that is None.'''
+
+	if isinstance(expression, StatementBlock):
+		replaceExpressions(expression, replace)
+		return expression
+
+	replacement = replace(expression)
+
+	if replacement is None:
+		replaceExpressions(expression, replace)
+		return expression
+
+	return replacement
+
+def replaceExpressions(item, replace):
+	'''Replaces the expressions in item by what replace returns for them; for None, the expressions in them are replaced.'''
+
+	if isinstance(item, StatementBlock):
+		for statement in item.statements:
+			replaceExpressions(statement, replace)
+	elif isinstance(item, Call):
+		item.arglist = [replaceExpression(arg, replace) for arg in item.arglist]
+	else:
+		for name in item.argumentNames:
+			if name not in item.passiveArguments:
+				setattr(item, name, replaceExpression(getattr(item, name), replace))
+
+def replaceInLoop(loop, replace):
+	if isinstance(loop, While):
+		loop.condition = replaceExpression(loop.condition, replace)
+
+	replaceExpressions(loop.body, replace)
+
+def replaceStatements(loop, replacements):
+	'''Replaces the statements in loop that replacements maps to lists of statements.'''
+
+	for block in loopItems(loop):
+		if isinstance(block, StatementBlock):
+			statements = []
+
+			for statement in block.statements:
+				statements += replacements.get(statement, [statement])
+
+			block.statements = statements
+
+class LoopOptimizer(object):
+	'''
+	Optimizes the loops of a function on the syntax tree. The while, loop and
+	repeat statements are the only loops of the language, so each is a
+	natural loop entered at its start.
+
+	Induction variables, the local variables only changed by adding or
+	subtracting a value that stays the same in the loop, are strength
+	reduced: an address such as address + i, with address the same in the
+	loop, becomes a pointer set to address + i before the loop and changed
+	with i, when that saves more than changing the pointer costs. When the
+	variable is then only used by the condition of a while loop, tested for
+	(in)equality, and not after the loop, the condition tests the pointer
+	instead and the variable is no longer changed; a constant assigned to it
+	just before the loop is used for the pointer instead.
+
+	Expressions that stay the same in the loop are then computed once before
+	the loop into a local variable, unless they are operands already. A data
+	field stays the same when the loop does not assign to it, call functions
+	or assign through pointers; a word read through a pointer when the loop
+	assigns to no data field either.
+
+	The local variables added are named $loop followed by a number, which
+	cannot be the name of another variable.
+	'''
+
+	def __init__(self, function):
+		self.function = function
+
+		# names of the variables and data fields assigned to in the loop
+		self.assigned = set()
+
+		# whether the loop calls functions or assigns through pointers
+		self.memoryChanged = False
+
+		# whether the loop assigns to data fields
+		self.fieldsAssigned = False
+
+	def optimize(self):
+		'''Optimizes the loops of the function. Returns whether it changed.'''
+
+		if not self.function.hasStatementBlock:
+			return False
+
+		items = syntaxItems(self.function.statementblock)
+		localCount = len(self.function.locals)
+
+		nested = set()
+
+		for loop in items:
+			if isinstance(loop, loopTypes):
+				nested.update(item for item in loopItems(loop) if isinstance(item, loopTypes))
+
+		# outer loops first, so what stays the same in them is moved out of them altogether
+		for block in [item for item in items if isinstance(item, StatementBlock)]:
+			statements = []
+
+			for statement in block.statements:
+				if isinstance(statement, loopTypes):
+					statements += self.reduceInductionVariables(statement, statement not in nested, statements)
+					statements += self.hoistInvariants(statement)
+
+				statements.append(statement)
+
+			block.statements = statements
+
+		return len(self.function.locals) > localCount
+
+	def defineLocal(self):
+		name = '$loop%d' % len(self.function.locals)
+		self.function.defineLocal(name, 'int')
+
+		return name
+
+	def analyze(self, loop):
+		items = loopItems(loop)
+
+		self.assigned = set(item.target for item in items if isinstance(item, (Assignment, Decrement, Increment, SetBit)))
+		self.memoryChanged = any(isinstance(item, (Call, DerefAssignment)) for item in items)
+		self.fieldsAssigned = any('.' in name for name in self.assigned)
+
+	def isInvariant(self, expression):
+		'''Returns whether expression has the same value every time around the loop last analyzed.'''
+
+		if isinstance(expression, Identifier):
+			if '.' in expression.name and self.memoryChanged:
+				return False
+
+			return expression.name not in self.assigned
+
+		if isinstance(expression, Dereference) and (self.memoryChanged or self.fieldsAssigned):
+			return False
+		if isinstance(expression, Call):
+			return False
+
+		return all(self.isInvariant(child) for child in children(expression))
+
+	def isConstant(self, expression):
+		'''Returns whether expression is computed from constants only, such as constants only known once the program is complete.'''
+
+		if isinstance(expression, (Dereference, Call)):
+			return False
+		if isinstance(expression, Identifier):
+			return self.function.identifiers[expression.name].constant
+
+		return all(self.isConstant(child) for child in children(expression))
+
+	def isStep(self, statement):
+		'''Returns whether statement adds to or subtracts from its target a value that stays the same in the loop.'''
+
+		value = statement.value
+
+		if not isinstance(value, (Addition, Subtraction)):
+			return False
+
+		return isinstance(value.left, Identifier) and value.left.name == statement.target and self.isInvariant(value.right)
+
+	def inductionVariables(self, loop):
+		'''Returns name -> the statements changing it, for the induction variables of loop.'''
+
+		updates = {}
+		others = set()
+
+		for item in loopItems(loop):
+			if isinstance(item, (Increment, Decrement)) or isinstance(item, Assignment) and self.isStep(item):
+				updates.setdefault(item.target, []).append(item)
+			elif isinstance(item, (Assignment, SetBit)):
+				others.add(item.target)
+
+		return dict((name, statements) for name, statements in updates.iteritems() if name not in others and '.' not in name)
+
+	def reduceInductionVariables(self, loop, outermost, preceding):
+		'''
+		Replaces invariant + i in loop by pointers for the induction variables
+		i. preceding are the statements before loop in its block. Returns the
+		statements to put before loop.
+		'''
+
+		self.analyze(loop)
+
+		variables = self.inductionVariables(loop)
+		items = loopItems(loop)
+
+		# (variable, key of the base) -> (base, additions)
+		pointers = {}
+		order = []
+
+		# i + step in i = i + step is the step itself
+		steps = set(statement.value for statements in variables.values() for statement in statements if isinstance(statement, Assignment))
+
+		for item in items:
+			if not isinstance(item, Addition) or item in steps:
+				continue
+
+			for variable, base in ((item.left, item.right), (item.right, item.left)):
+				if isinstance(variable, Identifier) and variable.name in variables and self.isInvariant(base):
+					key = variable.name, expressionKey(base)
+
+					if key not in pointers:
+						pointers[key] = base, []
+						order.append(key)
+
+					pointers[key][1].append(item)
+					break
+
+		# the additions used as addresses, which become [register] operands
+		addresses = set(constantOffset(item.expr)[0] for item in items if isinstance(item, Dereference))
+		addresses.update(constantOffset(item.target)[0] for item in items if isinstance(item, DerefAssignment))
+
+		replacements = {}
+		updates = {}
+		statements = []
+
+		for name in sorted(set(name for name, key in order)):
+			keys = [key for key in order if key[0] == name]
+			tested = outermost and self.testedVariable(loop, name, variables[name], [addition for key in keys for addition in pointers[key][1]])
+
+			if not tested:
+				# a pointer changed every time the variable is must save more than that
+				keys = [key for key in keys if len(pointers[key][1]) > len(variables[name]) or len(pointers[key][1]) == len(variables[name]) and any(addition in addresses for addition in pointers[key][1])]
+
+			if not keys:
+				continue
+
+			start = Identifier(loop.filename, loop.line, name)
+
+			for statement in variables[name]:
+				updates[statement] = [] if tested else [statement]
+
+			if tested:
+				# nothing reads the variable any more, so its value can be used directly
+				start = self.removeConstantAssignment(preceding, name) or start
+
+			for key in keys:
+				base, additions = pointers[key]
+				pointer = self.defineLocal()
+
+				if tested and key is keys[0]:
+					self.replaceTest(loop, tested, pointer, base)
+
+				statements.append(Assignment(loop.filename, loop.line, pointer, Addition(loop.filename, loop.line, copy.deepcopy(base), copy.deepcopy(start))))
+
+				for addition in additions:
+					replacements[addition] = Identifier(addition.filename, addition.line, pointer)
+
+				for statement in variables[name]:
+					updates[statement].append(self.pointerStep(statement, pointer))
+
+		replaceInLoop(loop, lambda expression: replacements.get(expression))
+		replaceStatements(loop, updates)
+
+		return statements
+
+	def removeConstantAssignment(self, statements, name):
+		'''
+		Removes the last assignment to name from statements if it assigns a
+		constant and returns the constant, or returns None.
+		'''
+
+		for statement in reversed(statements):
+			if name in assignedVariables(statement):
+				if isinstance(statement, Assignment) and statement.target == name and isinstance(statement.value, Constant):
+					statements.remove(statement)
+					return statement.value
+
+				return None
+
+		return None
+
+	def pointerStep(self, statement, pointer):
+		'''Returns the statement changing pointer like statement changes its induction variable.'''
+
+		if isinstance(statement, Increment):
+			return Increment(statement.filename, statement.line, pointer)
+		if isinstance(statement, Decrement):
+			return Decrement(statement.filename, statement.line, pointer)
+
+		value = statement.value
+		step = type(value)(value.filename, value.line, Identifier(value.filename, value.line, pointer), copy.deepcopy(value.right))
+
+		return Assignment(statement.filename, statement.line, pointer, step)
+
+	def testedVariable(self, loop, name, updates, additions):
+		'''
+		Returns the read of name in the condition of loop, if loop is a while
+		loop testing name for (in)equality with an invariant, and name is not
+		read otherwise but by updates and additions. Returns None otherwise.
+		'''
+
+		if not isinstance(loop, While) or not isinstance(loop.condition, (Equals, NotEquals)):
+			return None
+
+		condition = loop.condition
+
+		if isinstance(condition.left, Identifier) and condition.left.name == name:
+			variable, limit = condition.left, condition.right
+		elif isinstance(condition.right, Identifier) and condition.right.name == name:
+			variable, limit = condition.right, condition.left
+		else:
+			return None
+
+		if not self.isInvariant(limit):
+			return None
+
+		ignored = set(item for statement in updates + additions for item in syntaxItems(statement))
+		reads = [item for item in syntaxItems(self.function.statementblock) if isinstance(item, Identifier) and item.name == name and item not in ignored]
+
+		if reads != [variable]:
+			return None
+
+		return variable
+
+	def replaceTest(self, loop, variable, pointer, base):
+		'''Replaces variable in the condition of loop by pointer, which is base + variable.'''
+
+		condition = loop.condition
+		pointer = Identifier(variable.filename, variable.line, pointer)
+
+		# addition is one to one, so base + i == base + limit exactly when i == limit
+		if variable is condition.left:
+			condition.left, condition.right = pointer, Addition(condition.filename, condition.line, copy.deepcopy(base), condition.right)
+		else:
+			condition.left, condition.right = Addition(condition.filename, condition.line, copy.deepcopy(base), condition.left), pointer
+
+	def worthHoisting(self, expression):
+		'''Returns whether computing expression before the loop saves code in it.'''
+
+		if expression.operandExpression or self.isConstant(expression):
+			return False
+
+		# [address] and [offset + register] are operands, and adding a constant to an operand is one instruction
+		if isinstance(expression, Dereference):
+			expression = expression.expr
+
+		base, offset = constantOffset(expression)
+
+		return not base.operandExpression
+
+	def hoistInvariants(self, loop):
+		'''Moves the expressions that stay the same in loop before it. Returns the statements to put before loop.'''
+
+		self.analyze(loop)
+
+		statements = []
+
+		# key of the expression -> local variable with its value
+		hoisted = {}
+
+		def replace(expression):
+			# conditions are jumps, not values
+			if isinstance(expression, BooleanExpressionBase) or not self.isInvariant(expression):
+				return None
+
+			if not self.worthHoisting(expression):
+				return expression
+
+			key = expressionKey(expression)
+
+			if key not in hoisted:
+				hoisted[key] = self.defineLocal()
+				statements.append(Assignment(expression.filename, expression.line, hoisted[key], expression))
+
+			return Identifier(expression.filename, expression.line, hoisted[key])
+
+		replaceInLoop(loop, replace)
+
+		return statements
@@ -0,0 +1,169 @@
+import cPickle as pickle
+import hashlib
+import os
+import tempfile
+import threading
+
+version = None
+
+def compilerVersion():
+	'''Returns a hash of the compiler source code, used to invalidate cached entries.'''
+	global version
+
+	if version is None:
+		sha = hashlib.sha1()
+		root = os.path.dirname(os.path.realpath(__file__))
+
+		for directory in (root, os.path.join(root, 'syntaxitems')):
+			for filename in sorted(os.listdir(directory)):
+				if filename.endswith('.py') and filename != 'dcparsetab.py':
+					with open(os.path.join(directory, filename), 'rb') as sourceFile:
+						sha.update(filename)
+						sha.update(sourceFile.read())
+
+		version = sha.hexdigest()
+
+	return version
+
+class CacheCounter(object):
+	'''Counts the cache hits and misses of a single compilation.'''
+
+	def __init__(self):
+		self.hits = 0
+		self.misses = 0
+
+class ModuleCache(object):
+	'''
+	A cache for parsed modules and generated function code.
+
+	Entries are keyed by a hash of their key parts and the compiler version.
+	They are stored in directory, or in memory if directory is None. When the
+	cache grows beyond maxSize bytes, the least recently used entries are
+	removed by evict. Hits and misses are counted in the CacheCounter given
+	to load, so compilations sharing the cache each count their own.
+	'''
+
+	def __init__(self, directory, maxSize):
+		self.directory = directory
+		self.maxSize = maxSize
+
+		# name -> [last use, pickled value], for in-memory caches
+		self.entries = {}
+		self.uses = 0
+		self.lock = threading.Lock()
+
+		if directory is not None and not os.path.isdir(directory):
+			os.makedirs(directory)
+
+	def name(self, key):
+		sha = hashlib.sha1(compilerVersion())
+		sha.update(repr(key))
+
+		return sha.hexdigest() + '.cache'
+
+	def path(self, key):
+		return os.path.join(self.directory, self.name(key))
+
+	def load(self, key, counter):
+		'''Returns the cached value for key, or None if it is not cached.'''
+
+		if self.directory is None:
+			return self.loadFromMemory(key, counter)
+
+		path = self.path(key)
+
+		try:
+			with open(path, 'rb') as entry:
+				value = pickle.load(entry)
+		except (IOError, EOFError, pickle.UnpicklingError):
+			counter.misses += 1
+			return None
+
+		# mark as recently used
+		os.utime(path, None)
+
+		counter.hits += 1
+		return value
+
+	def loadFromMemory(self, key, counter):
+		with self.lock:
+			entry = self.entries.get(self.name(key))
+
+			if entry is None:
+				counter.misses += 1
+				return None
+
+			self.uses += 1
+			entry[0] = self.uses
+
+		counter.hits += 1
+		return pickle.loads(entry[1])
+
+	def store(self, key, value):
+		if self.directory is None:
+			value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+			with self.lock:
+				self.uses += 1
+				self.entries[self.name(key)] = [self.uses, value]
+			return
+
+		fd, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+
+		with os.fdopen(fd, 'wb') as entry:
+			pickle.dump(value, entry, pickle.HIGHEST_PROTOCOL)
+
+		os.rename(temporary, self.path(key))
+
+	def discard(self, key, counter):
+		'''Removes an entry that was loaded but turned out to be unusable.'''
+
+		if self.directory is None:
+			with self.lock:
+				self.entries.pop(self.name(key), None)
+		else:
+			os.remove(self.path(key))
+
+		counter.hits -= 1
+		counter.misses += 1
+
+	def evict(self):
+		'''Removes the least recently used entries until the cache fits in maxSize bytes.'''
+
+		if self.directory is None:
+			self.evictFromMemory()
+			return
+
+		entries = []
+		size = 0
+
+		for filename in os.listdir(self.directory):
+			if not filename.endswith('.cache'):
+				continue
+
+			path = os.path.join(self.directory, filename)
+			status = os.stat(path)
+
+			entries.append((status.st_mtime, status.st_size, path))
+			size += status.st_size
+
+		entries.sort()
+
+		for mtime, entrySize, path in entries:
+			if size <= self.maxSize:
+				break
+
+			os.remove(path)
+			size -= entrySize
+
+	def evictFromMemory(self):
+		with self.lock:
+			entries = sorted((lastUse, len(value), name) for name, (lastUse, value) in self.entries.iteritems())
+			size = sum(entrySize for lastUse, entrySize, name in entries)
+
+			for lastUse, entrySize, name in entries:
+				if size <= self.maxSize:
+					break
+
+				del self.entries[name]
+				size -= entrySize
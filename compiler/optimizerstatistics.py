@@ -0,0 +1,101 @@
+import json
+
+class OptimizerStatistics(object):
+	'''
+	Counts how often each optimizer rule is tried, how often it changes the
+	program, and how many code words it saves, per pass and in total.
+
+	One instance collects the statistics of all optimizer runs of a kind, for
+	example all per-function runs. Pass n of each run is counted as pass n.
+	'''
+
+	def __init__(self, name):
+		self.name = name
+
+		# pass number - 1 -> rule name -> [attempts, hits, word delta]
+		self.passes = []
+		# number of passes each run needed to reach the fixpoint
+		self.runs = []
+
+		self.words = 0
+
+	def startRun(self):
+		self.runs.append(0)
+
+	def startPass(self, words):
+		self.runs[-1] += 1
+
+		if len(self.passes) < self.runs[-1]:
+			self.passes.append({})
+
+		self.words = words
+
+	def counted(self, rule, codeWords):
+		'''
+		Returns a function that applies rule to the whole program and counts
+		the result. codeWords is called to get the size of the program after
+		the rule changed it.
+		'''
+
+		name = rule.__name__
+
+		def apply():
+			modified = rule()
+			self.record(name, modified, codeWords() - self.words if modified else 0)
+			return modified
+
+		return apply
+
+	def record(self, name, modified, words):
+		'''Counts an attempt of the rule name, which changed the size of the program by words if it was modified.'''
+
+		counts = self.passes[self.runs[-1] - 1].setdefault(name, [0, 0, 0])
+		counts[0] += 1
+
+		if modified:
+			counts[1] += 1
+			counts[2] += words
+
+			self.words += words
+
+	def totals(self):
+		totals = {}
+
+		for rules in self.passes:
+			for name, counts in rules.iteritems():
+				total = totals.setdefault(name, [0, 0, 0])
+				for i in range(3):
+					total[i] += counts[i]
+
+		return totals
+
+	def write(self, out):
+		if not self.runs:
+			return
+
+		print >>out, 'Optimizer statistics for %s: %d runs, %d passes, at most %d passes to reach the fixpoint' % (self.name, len(self.runs), sum(self.runs), max(self.runs))
+
+		sections = [('Pass %d' % (number + 1), rules) for number, rules in enumerate(self.passes)]
+		sections.append(('Total', self.totals()))
+
+		for title, rules in sections:
+			print >>out, '  %-30s %10s %8s %8s' % (title, 'Attempts', 'Hits', 'Words')
+
+			for name in sorted(rules):
+				attempts, hits, words = rules[name]
+				print >>out, '    %-28s %10d %8d %+8d' % (name, attempts, hits, words)
+
+	def toJson(self):
+		def rulesToJson(rules):
+			return dict((name, {'attempts': attempts, 'hits': hits, 'words': words}) for name, (attempts, hits, words) in rules.iteritems())
+
+		return {
+			'runs': len(self.runs),
+			'passesToFixpoint': self.runs,
+			'passes': [rulesToJson(rules) for rules in self.passes],
+			'total': rulesToJson(self.totals()),
+		}
+
+def writeStatisticsJson(statistics, out):
+	json.dump(dict((item.name, item.toJson()) for item in statistics), out, indent=2)
+	out.write('\n')
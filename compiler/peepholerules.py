@@ -0,0 +1,194 @@
+from asmgenerator import *
+
+class Operand(object):
+	'''Matches operands that are an instance of one of the given classes.'''
+
+	def __init__(self, *classes):
+		self.classes = classes
+
+	def matches(self, operand):
+		return isinstance(operand, self.classes)
+
+class Not(Operand):
+	'''Matches operands that are not an instance of any of the given classes.'''
+
+	def matches(self, operand):
+		return not isinstance(operand, self.classes)
+
+class Pattern(object):
+	'''
+	Matches a single instruction. opcodes is a sequence of opcodes, or None to
+	match any opcode. a and b are Operand matchers for the operands, or None to
+	match any operand.
+	'''
+
+	def __init__(self, opcodes=None, a=None, b=None):
+		self.opcodes = opcodes
+		self.a = a
+		self.b = b
+
+	def matches(self, instruction):
+		if self.opcodes is not None and instruction.opcode not in self.opcodes:
+			return False
+		if self.a is not None and not self.a.matches(instruction.a):
+			return False
+		if self.b is not None and not self.b.matches(instruction.b):
+			return False
+
+		return True
+
+class Rule(object):
+	'''
+	A peephole rule. patterns match the instructions from the current position
+	on, and where, if given, is called with the matched instructions to check
+	any further constraints. When the rule matches, rewrite is called with the
+	InstructionBuffer positioned at the first matched instruction and the
+	matched instructions.
+	'''
+
+	def __init__(self, name, patterns, rewrite, where=None):
+		self.name = name
+		self.patterns = patterns
+		self.rewrite = rewrite
+		self.where = where
+
+	def match(self, buffer):
+		'''Returns the matched instructions, or None if the rule does not match.'''
+
+		if not buffer.canGet(len(self.patterns) - 1):
+			return None
+
+		instructions = []
+
+		for offset, pattern in enumerate(self.patterns):
+			instruction = buffer.get(offset)
+			if not pattern.matches(instruction):
+				return None
+
+			instructions.append(instruction)
+
+		if self.where is not None and not self.where(*instructions):
+			return None
+
+		return instructions
+
+class RuleIndex(object):
+	'''
+	The rules by the opcode of the first instruction they match, so only rules
+	that can match are tried. The rules keep their order in each list.
+	'''
+
+	def __init__(self, rules):
+		self.rules = rules
+		self.any = []
+		self.byOpcode = {}
+
+		for order, rule in enumerate(rules):
+			opcodes = rule.patterns[0].opcodes
+
+			if opcodes is None:
+				self.any.append((order, rule))
+			else:
+				for opcode in opcodes:
+					self.byOpcode.setdefault(opcode, []).append((order, rule))
+
+		# rules matching any opcode are tried in their place between the others
+		for opcode in self.byOpcode:
+			self.byOpcode[opcode] = sorted(self.byOpcode[opcode] + self.any)
+
+	def candidates(self, opcode):
+		'''Returns (order, rule) for every rule that may match an instruction with opcode.'''
+
+		return self.byOpcode.get(opcode, self.any)
+
+# rewrites
+
+def movePushLocation(buffer, push, other):
+	buffer.remove(0, 0)
+	buffer.insert(1, [push])
+
+def removePushPop(buffer, source, target):
+	buffer.remove(0, 1)
+
+	if source.b.asm() != target.a.asm():
+		buffer.insert(0, [Instruction(target.opcode, target.a, source.b)])
+
+def removePushDiscard(buffer, push, discard):
+	discard.b.value -= 1
+	buffer.remove(0, 0)
+
+def replaceDiscardPush(buffer, discard, push):
+	buffer.remove(0, 0)
+	push.a = Peek()
+
+def combinePeekPop(buffer, peek, pop):
+	pop.opcode = peek.opcode
+	buffer.remove(0, 0)
+
+def removeFirst(buffer, *instructions):
+	buffer.remove(0, 0)
+
+def replaceTailCall(buffer, call, ret):
+	call.opcode = SET
+	call.b = call.a
+	call.a = PC()
+
+def readsOverflow(instruction):
+	return isinstance(instruction.a, O) or isinstance(instruction.b, O)
+
+# rules
+
+StackOperands = (Push, Peek, Pop)
+OverflowOpcodes = (ADD, SUB, SHL, SHR, MUL, DIV)
+
+rules = [
+	# move constant pushes down, towards the instruction that uses them
+	Rule('PushLocation', [
+		Pattern((SET,), a=Operand(Push), b=Operand(Literal, MemoryAddress)),
+		Pattern(a=Not(Push, Peek, Pop, PC, SP), b=Not(Pop, Peek, Push, PC, SP)),
+	], movePushLocation, where=lambda push, other: other.opcode not in (JSR, Label)),
+
+	# SET PUSH, x; OP y, POP -> OP y, x
+	Rule('PushPop', [
+		Pattern((SET,), a=Operand(Push), b=Not(*StackOperands)),
+		Pattern(b=Operand(Pop)),
+	], removePushPop),
+
+	# SET PUSH, x; ADD SP, n -> ADD SP, n - 1
+	Rule('PushDiscard', [
+		Pattern((SET, MOD, AND, BOR, XOR), a=Operand(Push), b=Not(Push, Pop)),
+		Pattern((ADD,), a=Operand(SP), b=Operand(Literal)),
+	], removePushDiscard, where=lambda push, discard: discard.b.value >= 1),
+
+	# ADD SP, 1; SET PUSH, x -> SET PEEK, x
+	Rule('DiscardPush', [
+		Pattern((ADD,), a=Operand(SP), b=Operand(Literal)),
+		Pattern((SET,), a=Operand(Push)),
+	], replaceDiscardPush, where=lambda discard, push: discard.b.value == 1),
+
+	# OP PEEK, x; SET x, POP -> OP x, POP; only when the operands can be swapped
+	Rule('PeekPop', [
+		Pattern((ADD, MUL, AND, BOR, XOR), a=Operand(Peek)),
+		Pattern((SET,), a=Not(Peek, Push), b=Operand(Pop)),
+	], combinePeekPop, where=lambda peek, pop: peek.b.asm() == pop.a.asm()),
+
+	# SET PC, label; :label -> :label
+	Rule('SetPC', [
+		Pattern((SET,), a=Operand(PC), b=Operand(LabelReference)),
+		Pattern((Label,)),
+	], removeFirst, where=lambda jump, label: jump.b.name == label.a.name),
+
+	# JSR f; SET PC, POP -> SET PC, f
+	Rule('TailCall', [
+		Pattern((JSR,)),
+		Pattern((SET,), a=Operand(PC), b=Operand(Pop)),
+	], replaceTailCall),
+
+	# ADD x, 0 and MUL x, 1 do nothing, but still clear O for a comparison that reads it
+	Rule('Noop', [
+		Pattern((ADD, SUB, SHL, SHR, BOR, XOR, MUL, DIV), b=Operand(Literal)),
+		Pattern(),
+	], removeFirst, where=lambda instruction, next: instruction.b.value == (1 if instruction.opcode in (MUL, DIV) else 0) and not (instruction.opcode in OverflowOpcodes and readsOverflow(next))),
+]
+
+ruleIndex = RuleIndex(rules)
@@ -0,0 +1,255 @@
+from asmgenerator import *
+from controlflowgraph import ControlFlowGraph
+
+def functionName(label):
+	'''Returns the name of the function with the func_ label; other code is named by its label.'''
+
+	if label.startswith('func_'):
+		return label[len('func_'):].replace('__dot__', '.')
+
+	return label
+
+def stackEffect(instruction):
+	'''
+	Returns the number of words the instruction pushes, negative if it pops,
+	or None if it sets SP to another value.
+	'''
+
+	if isinstance(instruction.a, SP):
+		if instruction.opcode in (ADD, SUB) and isinstance(instruction.b, Literal):
+			words = instruction.b.value
+
+			if words >= 0x8000:
+				words -= 0x10000
+
+			if instruction.opcode == SUB:
+				return words
+
+			return -words
+
+		return None
+
+	effect = 0
+
+	if isinstance(instruction.a, Push):
+		effect += 1
+	elif isinstance(instruction.a, Pop):
+		effect -= 1
+
+	if isinstance(instruction.b, Pop):
+		effect -= 1
+
+	return effect
+
+def formatDepth(depth):
+	if depth is None:
+		return 'unbounded'
+
+	return '%d' % depth
+
+class StackAnalysis(object):
+	'''
+	Finds the worst-case stack depth of every function from the assembly of
+	the program, in words: what the function pushes and reserves for its
+	locals, and the return address and depth of each function it calls. The
+	depth of the program includes the call of main.main by the start code.
+	Code that sets SP itself, such as compilerservices.reset, discards the
+	stack and is not followed further.
+
+	The depth of each function is computed once. Recursive functions have no
+	bound; their depth is None, as is the depth of the functions calling
+	them and of functions that call addresses only known when the program
+	runs. The recursive cycles are kept in cycles.
+
+	budget is the number of words reserved for the stack, or None if unknown;
+	budgetSource names where it comes from.
+	'''
+
+	def __init__(self, program, budget=None, budgetSource=None):
+		self.graph = ControlFlowGraph(program)
+		self.budget = budget
+		self.budgetSource = budgetSource
+
+		# Subroutine -> depth, or None if unbounded
+		self.subroutineDepths = {}
+
+		# lists of the names of the functions calling each other in a cycle
+		self.cycles = []
+
+		subroutines = self.graph.subroutines()
+
+		for subroutine in subroutines:
+			self.analyze(subroutine)
+
+		# function name -> depth, or None if unbounded
+		self.depths = dict((functionName(subroutine.name), self.subroutineDepths[subroutine]) for subroutine in subroutines[1:])
+
+		if subroutines:
+			self.programDepth = self.subroutineDepths[subroutines[0]]
+		else:
+			self.programDepth = 0
+
+	def analyze(self, root):
+		'''
+		Finds the depth of root and the functions it calls, callees first. This
+		does not recurse, as call chains may be longer than Python allows.
+		'''
+
+		if root in self.subroutineDepths:
+			return
+
+		# the Subroutines being analyzed, callers first, with the callees left to analyze
+		active = [root]
+		pending = [iter(self.callees(root))]
+
+		while active:
+			for callee in pending[-1]:
+				if callee in self.subroutineDepths:
+					continue
+
+				if callee in active:
+					cycle = active[active.index(callee):] + [callee]
+					self.cycles.append([functionName(item.name) for item in cycle])
+					continue
+
+				active.append(callee)
+				pending.append(iter(self.callees(callee)))
+				break
+			else:
+				subroutine = active.pop()
+				pending.pop()
+
+				self.subroutineDepths[subroutine] = self.walk(subroutine)
+
+	def blocks(self, subroutine):
+		'''Returns the blocks reached from the entry of subroutine without calling or jumping to another function.'''
+
+		blocks = [subroutine.entry]
+		seen = set(blocks)
+
+		for block in blocks:
+			for successor in block.successors:
+				if successor not in seen and not self.isTailCall(subroutine, successor):
+					seen.add(successor)
+					blocks.append(successor)
+
+		return blocks
+
+	def callees(self, subroutine):
+		'''Returns the Subroutines that subroutine calls or jumps to.'''
+
+		callees = []
+
+		for block in self.blocks(subroutine):
+			callees += [callee.subroutine for callee in block.calls]
+			callees += [successor.subroutine for successor in block.successors if self.isTailCall(subroutine, successor)]
+
+		# each once, so a cycle is only reported once
+		return sorted(set(callees), key=callees.index)
+
+	def isTailCall(self, subroutine, successor):
+		'''Returns whether subroutine continues with successor by jumping to the start of another function.'''
+
+		return successor is not subroutine.entry and successor.subroutine is not None and successor.subroutine.entry is successor
+
+	def depth(self, subroutine):
+		# not known yet for the functions of a recursive cycle
+		return self.subroutineDepths.get(subroutine)
+
+	def walk(self, subroutine):
+		'''Returns the deepest the stack gets in subroutine, following its blocks from the entry.'''
+
+		# block -> depth when it is entered
+		entryDepths = {subroutine.entry: 0}
+		todo = [subroutine.entry]
+		peak = 0
+
+		while todo:
+			block = todo.pop()
+			depth = entryDepths[block]
+			discarded = False
+
+			for instruction in block.instructions:
+				if instruction.opcode == JSR:
+					if not isinstance(instruction.a, LabelReference):
+						return None
+
+					calleeDepth = self.depth(self.graph.target(instruction.a).subroutine)
+
+					if calleeDepth is None:
+						return None
+
+					peak = max(peak, depth + 1 + calleeDepth)
+					continue
+
+				effect = stackEffect(instruction)
+
+				if effect is None:
+					discarded = True
+					break
+
+				depth += effect
+				peak = max(peak, depth)
+
+			if discarded:
+				continue
+
+			if block.unpredictable:
+				return None
+
+			for successor in block.successors:
+				if self.isTailCall(subroutine, successor):
+					# the other function returns for this one
+					calleeDepth = self.depth(successor.subroutine)
+
+					if calleeDepth is None:
+						return None
+
+					peak = max(peak, depth + calleeDepth)
+				elif successor not in entryDepths:
+					entryDepths[successor] = depth
+					todo.append(successor)
+				elif depth > entryDepths[successor]:
+					# the stack grows every time around a loop
+					return None
+
+		return peak
+
+	def warnings(self):
+		'''Returns warnings for the program when its stack may not fit in the budget.'''
+
+		if self.budget is None:
+			return []
+
+		warnings = ['Warning: recursive functions may overflow the stack: %s' % ' -> '.join(cycle) for cycle in self.cycles]
+
+		if self.programDepth is None:
+			if not self.cycles:
+				warnings.append('Warning: the stack usage of the program cannot be determined')
+		elif self.programDepth > self.budget:
+			warnings.append('Warning: the stack may need %d words, more than the %d words of %s' % (self.programDepth, self.budget, self.budgetSource))
+
+		return warnings
+
+	def write(self, out):
+		print >>out, 'Stack usage (words)'
+
+		for name in sorted(self.depths):
+			print >>out, '    %-40s %s' % (name, formatDepth(self.depths[name]))
+
+		print >>out, '  %-42s %s' % ('Program', formatDepth(self.programDepth))
+
+		if self.budget is not None:
+			print >>out, '  %-42s %d (%s)' % ('Budget', self.budget, self.budgetSource)
+
+		for cycle in self.cycles:
+			print >>out, '  Recursive: %s' % ' -> '.join(cycle)
+
+	def toJson(self):
+		return {
+			'functions': self.depths,
+			'program': self.programDepth,
+			'budget': self.budget,
+			'budgetSource': self.budgetSource,
+			'cycles': self.cycles,
+		}
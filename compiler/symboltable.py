@@ -0,0 +1,69 @@
+class Scope(object):
+	'''
+	A table of symbols. Names that are not defined in a scope are looked up in
+	its parent scope, so a function scope only holds the function's arguments
+	and local variables, and shares the scopes of its module and the program.
+	'''
+
+	def __init__(self, parent=None):
+		self.parent = parent
+		self.symbols = {}
+
+	def define(self, name, symbol):
+		if name in self.symbols:
+			raise Exception("Internal error: '%s' defined twice in the same scope" % name)
+
+		self.symbols[name] = symbol
+
+	def lookup(self, name):
+		'''Returns the symbol for name in this scope or an enclosing scope, or None if it is not defined.'''
+
+		scope = self
+
+		while scope is not None:
+			symbol = scope.symbols.get(name)
+			if symbol is not None:
+				return symbol
+
+			scope = scope.parent
+
+		return None
+
+	def isLocal(self, name):
+		'''Returns whether name is defined in this scope itself.'''
+
+		return name in self.symbols
+
+	def __contains__(self, name):
+		return self.lookup(name) is not None
+
+	def __getitem__(self, name):
+		symbol = self.lookup(name)
+
+		if symbol is None:
+			raise KeyError(name)
+
+		return symbol
+
+def globalScope(datafields, functions):
+	'''Returns the scope of the program, holding all data fields and functions by their full name.'''
+
+	scope = Scope()
+
+	for name, datafield in datafields.iteritems():
+		scope.define(name, datafield)
+
+	for name, function in functions.iteritems():
+		scope.define(name, function)
+
+	return scope
+
+def moduleScope(module, parent):
+	'''Returns the scope of a module, holding its data fields by their unqualified name.'''
+
+	scope = Scope(parent)
+
+	for datafield in module.datafields:
+		scope.define(datafield.name[len(module.name) + 1:], datafield)
+
+	return scope
@@ -1,8 +1,8 @@
 from abstractsyntaxitem import AbstractSyntaxItem
 from booleanexpression import BooleanConstant, Equals, GetBit, GreaterEquals, GreaterThan, LessEquals, LessThan, NotEquals
 from booleanlogic import BooleanAnd, BooleanEquals, BooleanNotEquals, BooleanNot, BooleanOr
-from controlflow import Break, Continue, If, Loop, Repeat, While
-from datafield import ConstantDataField, DataField, LocalVariable
+from controlflow import Break, Continue, If, InlinedBody, LeaveInlinedBody, Loop, Repeat, While
+from datafield import ConstantDataField, DataField, LocalVariable, PredefinedConstant
 from expression import Addition, AddressOf, And, Call, Constant, Dereference, Division, Identifier, Multiplication, Not, Or, ShiftLeft, ShiftRight, Subtraction, Xor
 from function import Function, MainFunction, PredefinedFunction
 from module import Module
@@ -1,9 +1,122 @@
 from compiler import *
 from codeitembase import CodeItemBase
+from expression import Constant
+
+# IF instructions with an inverse; DCPU-16 1.1 has none for IFG and IFB
+invertedTests = {IFE: IFN, IFN: IFE}
+
+def jumpOnTest(context, test, passes, label):
+	'''
+	Returns the Asm instances that jump to label when the IF instruction test
+	passes, if passes is True, or when it fails otherwise.
+	'''
+
+	if passes:
+		return [test, Instruction(SET, PC(), label)]
+
+	if test.opcode in invertedTests:
+		return [Instruction(invertedTests[test.opcode], test.a, test.b), Instruction(SET, PC(), label)]
+
+	passedLabel = nextlabel(context, 'test_passed')
+
+	return [
+		test,
+		Instruction(SET, PC(), passedLabel),
+		Instruction(SET, PC(), label),
+		Instruction(Label, passedLabel),
+	]
 
 class BooleanExpressionBase(CodeItemBase):
+	'''
+	Boolean expressions evaluate to 0 or 1. Control flow statements use
+	transformToJump, which subclasses override when they can jump on an IF
+	instruction directly instead of computing the value first.
+	'''
 
 	constantExpression = False
+	operandExpression = False
+
+	def transformToAsm(self, context, containingFunction, containingLoop):
+		registers = containingFunction.evaluationRegisters(self)
+
+		for instruction in self.transformToRegister(context, containingFunction, containingLoop, registers):
+			yield instruction
+
+		yield Instruction(SET, Push(), registers[0])
+
+	def transformToJump(self, context, containingFunction, containingLoop, label, value):
+		'''
+		Returns the Asm instances that jump to label if the expression has the
+		given value, 0 or 1, and otherwise continue after them.
+		'''
+
+		instructions, operand = self.transformValue(context, containingFunction, containingLoop, self)
+
+		return instructions + [Instruction(IFE, operand, Literal(value)), Instruction(SET, PC(), label)]
+
+class Comparison(BooleanExpressionBase):
+	'''
+	Compares two values. compare leaves 1 in the left register if the
+	comparison holds and 0 otherwise. Comparisons that change the right
+	operand set changesRight, so it is always a register. SUB sets O to
+	0xffff when the result is negative, which gives the ordering without
+	jumping.
+
+	When jumping, the IF instruction test is used instead, with the operands
+	swapped if swapOperands is set; the comparison is testResult when the
+	test passes. evaluate gives the same result for constant operands.
+
+	The results are those of the stack code this replaced, where < and >=
+	give each other's result.
+	'''
+
+	argumentNames = ('left', 'right')
+
+	changesRight = False
+	swapOperands = False
+	testResult = 1
+
+	def transformToRegister(self, context, containingFunction, containingLoop, registers):
+		instructions, operand = self.transformOperands(context, containingFunction, containingLoop, self.left, self.right, registers, not self.changesRight)
+
+		for instruction in instructions:
+			yield instruction
+
+		yield Instruction(Comment, self.operator)
+
+		for instruction in self.compare(registers[0], operand):
+			yield instruction
+
+	def transformToJump(self, context, containingFunction, containingLoop, label, value):
+		if self.left.operandExpression and self.right.operandExpression:
+			# IF instructions change neither operand, so neither needs a register
+			instructions = []
+			left = self.left.operand(context, containingFunction)
+			right = self.right.operand(context, containingFunction)
+		else:
+			registers = containingFunction.evaluationRegisters(self)
+			instructions, right = self.transformOperands(context, containingFunction, containingLoop, self.left, self.right, registers)
+			left = registers[0]
+
+		instructions.append(Instruction(Comment, self.operator))
+
+		if self.swapOperands:
+			test = Instruction(self.test, right, left)
+		else:
+			test = Instruction(self.test, left, right)
+
+		return instructions + jumpOnTest(context, test, value == self.testResult, label)
+
+	def optimize(self, containingFunction):
+		BooleanExpressionBase.optimize(self, containingFunction)
+
+		if isinstance(self.left, (Constant, BooleanConstant)) and isinstance(self.right, (Constant, BooleanConstant)):
+			return BooleanConstant(self.filename, self.line, self.evaluate(self.left.value % 0x10000, self.right.value % 0x10000))
+
+		return self
+
+	def registerUsage(self):
+		return self.operandRegisterUsage(self.left, self.right, not self.changesRight)
 
 class BooleanConstant(BooleanExpressionBase):
 
@@ -11,16 +124,26 @@ class BooleanConstant(BooleanExpressionBase):
 	passiveArguments = ('value',)
 
 	constantExpression = True
+	operandExpression = True
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		yield Instruction(Comment, 'BooleanConstant')
-
+	def operand(self, context, containingFunction):
 		if self.value:
-			yield Instruction(SET, Push(), Literal(1))
+			return Literal(1)
 		else:
-			yield Instruction(SET, Push(), Literal(0))
+			return Literal(0)
+
+	def transformToRegister(self, context, containingFunction, containingLoop, registers):
+		yield Instruction(Comment, 'BooleanConstant')
+
+		yield Instruction(SET, registers[0], self.operand(context, containingFunction))
 
-	def stackUsage(self, functions):
+	def transformToJump(self, context, containingFunction, containingLoop, label, value):
+		if bool(self.value) == bool(value):
+			return [Instruction(SET, PC(), label)]
+
+		return []
+
+	def registerUsage(self):
 		return 1
 
 class GetBit(BooleanExpressionBase):
@@ -34,183 +157,126 @@ class GetBit(BooleanExpressionBase):
 		if self.bit > 15 or self.bit < 0:
 			self.error("Bit '%d' out of range" % self.bit)
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.expression.transformToAsm(containingFunction, containingLoop):
+	def transformToRegister(self, context, containingFunction, containingLoop, registers):
+		for instruction in self.expression.transformToRegister(context, containingFunction, containingLoop, registers):
 			yield instruction
 
 		yield Instruction(Comment, 'getbit')
-		# TODO?
 
-		bitSetLabel = nextlabel('getbit_set')
-		endLabel = nextlabel('getbit_end')
+		yield Instruction(AND, registers[0], Literal(1 << self.bit))
 
-		yield Instruction(IFB, Pop(), Literal(1 << self.bit))
-		yield Instruction(SET, PC(), bitSetLabel)
-		yield Instruction(SET, Push(), Literal(0))
-		yield Instruction(SET, PC(), endLabel)
-		yield Instruction(Label, bitSetLabel)
-		yield Instruction(SET, Push(), Literal(1))
-		yield Instruction(Label, endLabel)
+		if self.bit > 0:
+			yield Instruction(SHR, registers[0], Literal(self.bit))
 
-	def stackUsage(self, functions):
-		return self.expression.stackUsage(functions)
+	def transformToJump(self, context, containingFunction, containingLoop, label, value):
+		instructions, operand = self.transformValue(context, containingFunction, containingLoop, self.expression)
 
-class Equals(BooleanExpressionBase):
+		instructions.append(Instruction(Comment, 'getbit'))
 
-	argumentNames = ('left', 'right')
+		return instructions + jumpOnTest(context, Instruction(IFB, operand, Literal(1 << self.bit)), value == 1, label)
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
-			yield instruction
+	def optimize(self, containingFunction):
+		BooleanExpressionBase.optimize(self, containingFunction)
 
-		yield Instruction(Comment, '==')
+		if isinstance(self.expression, Constant):
+			return BooleanConstant(self.filename, self.line, self.expression.value & (1 << self.bit) != 0)
 
-		notequallabel = nextlabel('eq_notequal')
-		endlabel = nextlabel('eq_end')
+		return self
 
-		yield Instruction(IFN, Pop(), Pop())
-		yield Instruction(SET, PC(), notequallabel)
-		yield Instruction(SET, Push(), Literal(1))
-		yield Instruction(SET, PC(), endlabel)
-		yield Instruction(Label, notequallabel)
-		yield Instruction(SET, Push(), Literal(0))
-		yield Instruction(Label, endlabel)
+	def registerUsage(self):
+		return self.expression.registerUsage()
 
-	def stackUsage(self, functions):
-		return max(self.left.stackUsage(functions), self.right.stackUsage(functions) + 1)
+class Equals(Comparison):
 
-class NotEquals(BooleanExpressionBase):
+	operator = '=='
+	test = staticmethod(IFE)
 
-	argumentNames = ('left', 'right')
+	@staticmethod
+	def evaluate(left, right):
+		return left == right
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
-			yield instruction
+	def compare(self, left, right):
+		# left - 1 is negative when left is 0
+		yield Instruction(XOR, left, right)
+		yield Instruction(SUB, left, Literal(1))
+		yield Instruction(SET, left, O())
+		yield Instruction(AND, left, Literal(1))
 
-		yield Instruction(Comment, '!=')
+class NotEquals(Comparison):
 
-		equallabel = nextlabel('neq_equal')
-		endlabel = nextlabel('neq_end')
+	operator = '!='
+	test = staticmethod(IFN)
 
-		yield Instruction(IFE, Pop(), Pop())
-		yield Instruction(SET, PC(), equallabel)
-		yield Instruction(SET, Push(), Literal(1))
-		yield Instruction(SET, PC(), endlabel)
-		yield Instruction(Label, equallabel)
-		yield Instruction(SET, Push(), Literal(0))
-		yield Instruction(Label, endlabel)
+	@staticmethod
+	def evaluate(left, right):
+		return left != right
 
-	def stackUsage(self, functions):
-		return max(self.left.stackUsage(functions), self.right.stackUsage(functions) + 1)
+	def compare(self, left, right):
+		yield Instruction(XOR, left, right)
+		yield Instruction(IFN, left, Literal(0))
+		yield Instruction(SET, left, Literal(1))
 
-class GreaterEquals(BooleanExpressionBase):
+class GreaterEquals(Comparison):
 
-	argumentNames = ('left', 'right')
+	operator = '>='
+	test = staticmethod(IFG)
+	swapOperands = True
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
-			yield instruction
+	@staticmethod
+	def evaluate(left, right):
+		return left < right
 
-		yield Instruction(Comment, '>=')
+	def compare(self, left, right):
+		yield Instruction(SUB, left, right)
+		yield Instruction(SET, left, O())
+		yield Instruction(AND, left, Literal(1))
 
-		greaterEqualsLabel = nextlabel('geq_true')
-		endLabel = nextlabel('end')
+class GreaterThan(Comparison):
 
-		yield Instruction(SET, TempStorage, Pop()) # right
-		yield Instruction(IFG, TempStorage, Pop())
-		yield Instruction(SET, PC(), greaterEqualsLabel)
-		yield Instruction(SET, Push(), Literal(0))
-		yield Instruction(SET, PC(), endLabel)
-		yield Instruction(Label, greaterEqualsLabel)
-		yield Instruction(SET, Push(), Literal(1))
-		yield Instruction(Label, endLabel)
+	operator = '>'
 
-	def stackUsage(self, functions):
-		return max(self.left.stackUsage(functions), self.right.stackUsage(functions) + 1)
+	changesRight = True
+	test = staticmethod(IFG)
 
-class GreaterThan(BooleanExpressionBase):
+	@staticmethod
+	def evaluate(left, right):
+		return left > right
 
-	argumentNames = ('left', 'right')
+	def compare(self, left, right):
+		yield Instruction(SUB, right, left)
+		yield Instruction(SET, left, O())
+		yield Instruction(AND, left, Literal(1))
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-
-		yield Instruction(Comment, '>')
-
-		greaterLabel = nextlabel('gt_true')
-		endlabel = nextlabel('gt_end')
-
-		yield Instruction(SET, TempStorage, Pop()) # right
-		yield Instruction(IFG, Pop(), TempStorage)
-		yield Instruction(SET, PC(), greaterLabel)
-		yield Instruction(SET, Push(), Literal(0))
-		yield Instruction(SET, PC(), endlabel)
-		yield Instruction(Label, greaterLabel)
-		yield Instruction(SET, Push(), Literal(1))
-		yield Instruction(Label, endlabel)
-
-	def stackUsage(self, functions):
-		return max(self.left.stackUsage(functions), self.right.stackUsage(functions) + 1)
+class LessEquals(Comparison):
 
-class LessEquals(BooleanExpressionBase):
+	operator = '<='
 
-	argumentNames = ('left', 'right')
-
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
-			yield instruction
+	changesRight = True
+	test = staticmethod(IFG)
+	testResult = 0
 
-		yield Instruction(Comment, '<=')
+	@staticmethod
+	def evaluate(left, right):
+		return left <= right
 
-		greaterLabel = nextlabel('gt_true')
-		endlabel = nextlabel('gt_end')
-
-		yield Instruction(SET, TempStorage, Pop()) # right
-		yield Instruction(IFG, Pop(), TempStorage)
-		yield Instruction(SET, PC(), greaterLabel)
-		yield Instruction(SET, Push(), Literal(1))
-		yield Instruction(SET, PC(), endlabel)
-		yield Instruction(Label, greaterLabel)
-		yield Instruction(SET, Push(), Literal(0))
-		yield Instruction(Label, endlabel)
-
-	def stackUsage(self, functions):
-		return max(self.left.stackUsage(functions), self.right.stackUsage(functions) + 1)
-
-class LessThan(BooleanExpressionBase):
-
-	argumentNames = ('left', 'right')
-
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
-			yield instruction
+	def compare(self, left, right):
+		yield Instruction(SUB, right, left)
+		yield Instruction(SET, left, O())
+		yield Instruction(ADD, left, Literal(1))
 
-		yield Instruction(Comment, '<')
+class LessThan(Comparison):
 
-		greaterEqualsLabel = nextlabel('geq_true')
-		endLabel = nextlabel('end')
+	operator = '<'
+	test = staticmethod(IFG)
+	swapOperands = True
+	testResult = 0
 
-		yield Instruction(SET, TempStorage, Pop()) # right
-		yield Instruction(IFG, TempStorage, Pop())
-		yield Instruction(SET, PC(), greaterEqualsLabel)
-		yield Instruction(SET, Push(), Literal(1))
-		yield Instruction(SET, PC(), endLabel)
-		yield Instruction(Label, greaterEqualsLabel)
-		yield Instruction(SET, Push(), Literal(0))
-		yield Instruction(Label, endLabel)
+	@staticmethod
+	def evaluate(left, right):
+		return left >= right
 
-	def stackUsage(self, functions):
-		return max(self.left.stackUsage(functions), self.right.stackUsage(functions) + 1)
+	def compare(self, left, right):
+		# O + 1 is 0 when left - right is negative, and 1 otherwise
+		yield Instruction(SUB, left, right)
+		yield Instruction(SET, left, O())
+		yield Instruction(ADD, left, Literal(1))
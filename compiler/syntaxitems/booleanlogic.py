@@ -1,105 +1,116 @@
 from compiler import *
-from booleanexpression import BooleanExpressionBase
+from booleanexpression import BooleanConstant, BooleanExpressionBase, Comparison
 
 class BooleanAnd(BooleanExpressionBase):
 
 	argumentNames = ('left', 'right')
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
+	def transformToRegister(self, context, containingFunction, containingLoop, registers):
+		instructions, operand = self.transformOperands(context, containingFunction, containingLoop, self.left, self.right, registers)
+
+		for instruction in instructions:
 			yield instruction
 
 		yield Instruction(Comment, 'boolean &&')
 
-		yield Instruction(SET, TempStorage, Pop())
-		yield Instruction(AND, Peek(), TempStorage)
-
-	def stackUsage(self, functions):
-		return max(self.left.stackUsage(functions), self.right.stackUsage(functions) + 1)
-
-class BooleanEquals(BooleanExpressionBase):
-
-	argumentNames = ('left', 'right')
+		yield Instruction(AND, registers[0], operand)
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
-			yield instruction
+	def optimize(self, containingFunction):
+		BooleanExpressionBase.optimize(self, containingFunction)
 
-		yield Instruction(Comment, 'boolean ==')
+		# both sides are always evaluated, so only sides without calls are left out
+		for constant, other in ((self.left, self.right), (self.right, self.left)):
+			if isinstance(constant, BooleanConstant):
+				if constant.value:
+					return other
+				if not other.containsCall():
+					return constant
 
-		notequallabel = nextlabel('eq_notequal')
-		endlabel = nextlabel('eq_end')
+		return self
 
-		yield Instruction(IFN, Pop(), Pop())
-		yield Instruction(SET, PC(), notequallabel)
-		yield Instruction(SET, Push(), Literal(1))
-		yield Instruction(SET, PC(), endlabel)
-		yield Instruction(Label, notequallabel)
-		yield Instruction(SET, Push(), Literal(0))
-		yield Instruction(Label, endlabel)
+	def registerUsage(self):
+		return self.operandRegisterUsage(self.left, self.right)
 
-	def stackUsage(self, functions):
-		return max(self.left.stackUsage(functions), self.right.stackUsage(functions) + 1)
+class BooleanEquals(Comparison):
 
-class BooleanNotEquals(BooleanExpressionBase):
+	operator = 'boolean =='
+	test = staticmethod(IFE)
 
-	argumentNames = ('left', 'right')
+	@staticmethod
+	def evaluate(left, right):
+		return left == right
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
-			yield instruction
+	def compare(self, left, right):
+		# booleans are 0 or 1, so left ^ right ^ 1 is 1 when they are equal
+		yield Instruction(XOR, left, right)
+		yield Instruction(XOR, left, Literal(1))
 
-		yield Instruction(Comment, 'boolean !=')
+class BooleanNotEquals(Comparison):
 
-		equallabel = nextlabel('neq_equal')
-		endlabel = nextlabel('neq_end')
+	operator = 'boolean !='
+	test = staticmethod(IFN)
 
-		yield Instruction(IFE, Pop(), Pop())
-		yield Instruction(SET, PC(), equallabel)
-		yield Instruction(SET, Push(), Literal(1))
-		yield Instruction(SET, PC(), endlabel)
-		yield Instruction(Label, equallabel)
-		yield Instruction(SET, Push(), Literal(0))
-		yield Instruction(Label, endlabel)
+	@staticmethod
+	def evaluate(left, right):
+		return left != right
 
-	def stackUsage(self, functions):
-		return max(self.left.stackUsage(functions), self.right.stackUsage(functions) + 1)
+	def compare(self, left, right):
+		yield Instruction(XOR, left, right)
 
 class BooleanNot(BooleanExpressionBase):
 
 	argumentNames = ('value',)
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.value.transformToAsm(containingFunction, containingLoop):
+	def transformToRegister(self, context, containingFunction, containingLoop, registers):
+		for instruction in self.value.transformToRegister(context, containingFunction, containingLoop, registers):
 			yield instruction
 
 		yield Instruction(Comment, 'boolean !')
 
-		yield Instruction(XOR, Peek(), Literal(1))
+		yield Instruction(XOR, registers[0], Literal(1))
+
+	def transformToJump(self, context, containingFunction, containingLoop, label, value):
+		return self.value.transformToJump(context, containingFunction, containingLoop, label, 1 - value)
+
+	def optimize(self, containingFunction):
+		BooleanExpressionBase.optimize(self, containingFunction)
+
+		if isinstance(self.value, BooleanConstant):
+			return BooleanConstant(self.filename, self.line, not self.value.value)
+		if isinstance(self.value, BooleanNot):
+			return self.value.value
+
+		return self
 
-	def stackUsage(self, functions):
-		return self.value.stackUsage(functions)
+	def registerUsage(self):
+		return self.value.registerUsage()
 
 class BooleanOr(BooleanExpressionBase):
 
 	argumentNames = ('left', 'right')
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
+	def transformToRegister(self, context, containingFunction, containingLoop, registers):
+		instructions, operand = self.transformOperands(context, containingFunction, containingLoop, self.left, self.right, registers)
+
+		for instruction in instructions:
 			yield instruction
 
 		yield Instruction(Comment, 'boolean |')
 
-		yield Instruction(SET, TempStorage, Pop())
-		yield Instruction(BOR, Peek(), TempStorage)
+		yield Instruction(BOR, registers[0], operand)
+
+	def optimize(self, containingFunction):
+		BooleanExpressionBase.optimize(self, containingFunction)
+
+		# both sides are always evaluated, so only sides without calls are left out
+		for constant, other in ((self.left, self.right), (self.right, self.left)):
+			if isinstance(constant, BooleanConstant):
+				if not constant.value:
+					return other
+				if not other.containsCall():
+					return constant
+
+		return self
 
-	def stackUsage(self, functions):
-		return max(self.left.stackUsage(functions), self.right.stackUsage(functions) + 1)
+	def registerUsage(self):
+		return self.operandRegisterUsage(self.left, self.right)
@@ -1,3 +1,4 @@
+from compiler import *
 from abstractsyntaxitem import AbstractSyntaxItem
 
 class CodeItemBase(AbstractSyntaxItem):
@@ -13,6 +14,9 @@ class CodeItemBase(AbstractSyntaxItem):
 	    A set of names of arguments which are not syntax items.
 		resolveIdentifiers and verifyIdentifiers will be called on all arguments,
 		except those specified by passiveArguments.
+	* leavesBlock
+	    True for statements that always jump away, so the statements after
+		them never run.
 
 	Subclasses may override the following functions:
 	* resolveIdentifiers
@@ -24,14 +28,37 @@ class CodeItemBase(AbstractSyntaxItem):
 	* optimize
 	    Replace the contained syntax tree with a more efficient version.
 		Return a new object if self needs to be replaced with another object,
-		otherwise return self.
+		otherwise return self. Statements may be replaced by a StatementBlock,
+		whose statements then take their place.
 
 	Subclasses must implement the following functions:
 	* transformToAsm
 		Returns a sequence of Asm instances that perform the syntax item's action.
+		Labels and data field addresses are allocated in the given CompilationContext.
+
+	Expressions must also implement the following functions:
+	* registerUsage
+	    Returns the number of registers needed to evaluate the expression
+		without using the stack (its Sethi-Ullman number).
+	* transformToRegister
+	    Returns a sequence of Asm instances that leave the value of the
+		expression in the first of the given registers. The other registers may
+		be changed; when they are not enough, values are kept on the stack.
+
+	Expressions whose value is a single operand, such as constants and
+	variables, set operandExpression and implement the following function:
+	* operand
+	    Returns the operand with the value of the expression.
+
+	Expressions may override the following function:
+	* transformToOperand
+	    Returns the Asm instances that evaluate the expression, and the
+		cheapest operand that has its value afterwards, such as [1 + X]
+		instead of a register loaded from it.
 	'''
 
 	passiveArguments = ()
+	leavesBlock = False
 
 	def __init__(self, filename, line, *args):
 		AbstractSyntaxItem.__init__(self, filename, line)
@@ -63,9 +90,108 @@ class CodeItemBase(AbstractSyntaxItem):
 			if argument not in self.passiveArguments:
 				getattr(self, argument).verifyIdentifiers(datafields, functions, containingFunction)
 
-	def optimize(self):
+	def containsCall(self):
+		'''Returns whether a function is called while running the syntax item.'''
+
+		return any(getattr(self, argument).containsCall() for argument in self.argumentNames if argument not in self.passiveArguments)
+
+	def readsVariable(self, name):
+		'''Returns whether running the syntax item may read the given variable or data field.'''
+
+		return any(getattr(self, argument).readsVariable(name) for argument in self.argumentNames if argument not in self.passiveArguments)
+
+	def isDirectOperand(self, left, right):
+		'''
+		Returns whether the value of right can be used as an operand as it is,
+		without a register, once left has been evaluated. Variables are read
+		after left has been evaluated, as they would be in a register.
+		'''
+
+		return right.operandExpression
+
+	def keepsOrder(self, left, right):
+		'''
+		Returns whether left must be evaluated before right, as written: a
+		function called by either side could change what the other one reads.
+		'''
+
+		return left.containsCall() or right.containsCall()
+
+	def operandRegisterUsage(self, left, right, direct=True):
+		'''Returns the number of registers transformOperands needs to evaluate left and right.'''
+
+		if direct and self.isDirectOperand(left, right):
+			return left.registerUsage()
+
+		if left.registerUsage() == right.registerUsage() or left.registerUsage() < right.registerUsage() and self.keepsOrder(left, right):
+			return right.registerUsage() + 1
+
+		return max(left.registerUsage(), right.registerUsage())
+
+	def transformOperands(self, context, containingFunction, containingLoop, left, right, registers, direct=True):
+		'''
+		Returns the Asm instances that leave the value of left in registers[0],
+		and the operand that has the value of right afterwards: the cheapest
+		operand of right if direct is True, otherwise registers[1].
+
+		The operand needing more registers is evaluated first, so the other one
+		can use the rest, unless either operand calls a function; if neither
+		fits in the registers that are left over, the value of left is kept on
+		the stack while right is evaluated.
+		'''
+
+		if direct and self.isDirectOperand(left, right):
+			instructions = list(left.transformToRegister(context, containingFunction, containingLoop, registers))
+			return instructions, right.operand(context, containingFunction)
+
+		first, second, rest = registers[0], registers[1], registers[2:]
+
+		def transformRight(registers):
+			if direct:
+				return right.transformToOperand(context, containingFunction, containingLoop, registers)
+
+			return list(right.transformToRegister(context, containingFunction, containingLoop, registers)), registers[0]
+
+		keepsOrder = self.keepsOrder(left, right)
+
+		if (left.registerUsage() >= right.registerUsage() or keepsOrder) and right.registerUsage() < len(registers):
+			instructions = list(left.transformToRegister(context, containingFunction, containingLoop, registers))
+			rightInstructions, operand = transformRight([second] + rest)
+			instructions += rightInstructions
+		elif left.registerUsage() < right.registerUsage() and left.registerUsage() < len(registers) and not keepsOrder:
+			instructions, operand = transformRight([second, first] + rest)
+			instructions += left.transformToRegister(context, containingFunction, containingLoop, [first] + rest)
+		else:
+			instructions = list(left.transformToRegister(context, containingFunction, containingLoop, registers))
+			instructions.append(Instruction(SET, Push(), first))
+			rightInstructions, operand = transformRight([second, first] + rest)
+			instructions += rightInstructions
+			instructions.append(Instruction(SET, first, Pop()))
+
+		return instructions, operand
+
+	def transformToOperand(self, context, containingFunction, containingLoop, registers):
+		if self.operandExpression:
+			return [], self.operand(context, containingFunction)
+
+		return list(self.transformToRegister(context, containingFunction, containingLoop, registers)), registers[0]
+
+	def transformValue(self, context, containingFunction, containingLoop, expression):
+		'''
+		Returns the Asm instances that evaluate expression, and the operand that
+		has its value afterwards.
+		'''
+
+		if expression.operandExpression:
+			return [], expression.operand(context, containingFunction)
+
+		registers = containingFunction.evaluationRegisters(expression)
+
+		return expression.transformToOperand(context, containingFunction, containingLoop, registers)
+
+	def optimize(self, containingFunction):
 		for argument in self.argumentNames:
 			if argument not in self.passiveArguments:
-				setattr(self, argument, getattr(self, argument).optimize())
+				setattr(self, argument, getattr(self, argument).optimize(containingFunction))
 
 		return self
@@ -1,11 +1,16 @@
 from compiler import *
 from codeitembase import CodeItemBase
+from booleanexpression import BooleanConstant
+from expression import Constant
+from statementblock import StatementBlock
 
 class Break(CodeItemBase):
 
 	argumentNames = ()
 
-	def transformToAsm(self, containingFunction, containingLoop):
+	leavesBlock = True
+
+	def transformToAsm(self, context, containingFunction, containingLoop):
 		if containingLoop is None:
 			self.error('break outside loop')
 
@@ -13,14 +18,13 @@ class Break(CodeItemBase):
 
 		yield Instruction(SET, PC(), containingLoop.endlabel)
 
-	def stackUsage(self, functions):
-		return 0
-
 class Continue(CodeItemBase):
 
 	argumentNames = ()
 
-	def transformToAsm(self, containingFunction, containingLoop):
+	leavesBlock = True
+
+	def transformToAsm(self, context, containingFunction, containingLoop):
 		if containingLoop is None:
 			self.error('continue outside loop')
 
@@ -28,69 +32,114 @@ class Continue(CodeItemBase):
 
 		yield Instruction(SET, PC(), containingLoop.startlabel)
 
-	def stackUsage(self, functions):
-		return 0
-
 class If(CodeItemBase):
 
 	argumentNames = ('predicate', 'then', 'else_')
 	passiveArguments = ('operator',)
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.predicate.transformToAsm(containingFunction, containingLoop):
+	def transformToAsm(self, context, containingFunction, containingLoop):
+		elselabel = nextlabel(context, 'if_else')
+		endlabel = nextlabel(context, 'if_end')
+
+		for instruction in self.predicate.transformToJump(context, containingFunction, containingLoop, elselabel, 1):
 			yield instruction
 
 		yield Instruction(Comment, 'if')
 
-		elselabel = nextlabel('if_else')
-		endlabel = nextlabel('if_end')
-
-		yield Instruction(IFE, Pop(), Literal(1))
-		yield Instruction(SET, PC(), elselabel)
-
-		for instruction in self.then.transformToAsm(containingFunction, containingLoop):
+		for instruction in self.then.transformToAsm(context, containingFunction, containingLoop):
 			yield instruction
 
 		yield Instruction(SET, PC(), endlabel)
 		yield Instruction(Label, elselabel)
 
-		for instruction in self.else_.transformToAsm(containingFunction, containingLoop):
+		for instruction in self.else_.transformToAsm(context, containingFunction, containingLoop):
 			yield instruction
 		
 		yield Instruction(Label, endlabel)
 
-	def stackUsage(self, functions):
-		return max(self.predicate.stackUsage(functions), self.then.stackUsage(functions), self.else_.stackUsage(functions))
+	def optimize(self, containingFunction):
+		CodeItemBase.optimize(self, containingFunction)
+
+		if isinstance(self.predicate, BooleanConstant):
+			# transformToAsm jumps to the else branch when the predicate holds
+			if self.predicate.value:
+				return self.else_
+			return self.then
+
+		if not self.then.statements and not self.else_.statements and not self.predicate.containsCall():
+			return StatementBlock(self.filename, self.line, [])
+
+		return self
+
+class InlinedBody(CodeItemBase):
+	'''
+	The body of a function inlined into a call by the inliner. The returns of
+	the function are replaced by LeaveInlinedBody, which jumps to the end of
+	the body instead of the end of the function.
+	'''
+
+	argumentNames = ('function', 'body')
+	passiveArguments = ('function',)
+
+	def transformToAsm(self, context, containingFunction, containingLoop):
+		self.endlabel = nextlabel(context, 'inlined_end')
+
+		yield Instruction(Comment, 'inlined ' + self.function)
+
+		# break and continue in the body do not belong to loops around the call
+		for instruction in self.body.transformToAsm(context, containingFunction, None):
+			yield instruction
+
+		yield Instruction(Label, self.endlabel)
+
+	def optimize(self, containingFunction):
+		CodeItemBase.optimize(self, containingFunction)
+
+		# leaving at the end of the body does not need a jump
+		statements = self.body.statements
+		if statements and isinstance(statements[-1], LeaveInlinedBody) and statements[-1].body is self:
+			del statements[-1]
+
+		return self
+
+class LeaveInlinedBody(CodeItemBase):
+
+	argumentNames = ('body',)
+	passiveArguments = ('body',)
+
+	leavesBlock = True
+
+	def transformToAsm(self, context, containingFunction, containingLoop):
+		yield Instruction(Comment, 'return')
+
+		yield Instruction(SET, PC(), self.body.endlabel)
 
 class Loop(CodeItemBase):
 
 	argumentNames = ('body',)
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		self.startlabel = nextlabel('loop_start')
-		self.endlabel = nextlabel('loop_end')
+	def transformToAsm(self, context, containingFunction, containingLoop):
+		self.startlabel = nextlabel(context, 'loop_start')
+		self.endlabel = nextlabel(context, 'loop_end')
 
 		yield Instruction(Comment, 'loop')
 
 		yield Instruction(Label, self.startlabel)
 
-		for instruction in self.body.transformToAsm(containingFunction, self):
+		for instruction in self.body.transformToAsm(context, containingFunction, self):
 			yield instruction
 
 		yield Instruction(SET, PC(), self.startlabel)
 		yield Instruction(Label, self.endlabel)
 
-	def stackUsage(self, functions):
-		return self.body.stackUsage(functions)
-
 class Repeat(CodeItemBase):
 
 	argumentNames = ('repeatcount', 'body')
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		self.startlabel = nextlabel('repeat_start')
-		self.endlabel = nextlabel('repeat_end')
-		self.djnzrepeatlabel = nextlabel('repeat_djnzrepeat')
+	def transformToAsm(self, context, containingFunction, containingLoop):
+		self.startlabel = nextlabel(context, 'repeat_start')
+		self.endlabel = nextlabel(context, 'repeat_end')
+		self.djnzrepeatlabel = nextlabel(context, 'repeat_djnzrepeat')
 
 		yield Instruction(Comment, 'repeat')
 
@@ -98,10 +147,12 @@ class Repeat(CodeItemBase):
 		yield Instruction(SET, Push(), RepeatCounter)
 
 		# get the new repeat counter
-		for instruction in self.repeatcount.transformToAsm(containingFunction, containingLoop):
+		instructions, repeatcount = self.transformValue(context, containingFunction, containingLoop, self.repeatcount)
+
+		for instruction in instructions:
 			yield instruction
 
-		yield Instruction(SET, RepeatCounter, Pop())
+		yield Instruction(SET, RepeatCounter, repeatcount)
 
 		# loop
 		yield Instruction(Label, self.startlabel)
@@ -110,7 +161,7 @@ class Repeat(CodeItemBase):
 		yield Instruction(IFE, RepeatCounter, Literal(0))
 		yield Instruction(SET, PC(), self.endlabel)
 
-		for instruction in self.body.transformToAsm(containingFunction, self):
+		for instruction in self.body.transformToAsm(context, containingFunction, self):
 			yield instruction
 
 		yield Instruction(SUB, RepeatCounter, Literal(1))
@@ -119,32 +170,41 @@ class Repeat(CodeItemBase):
 		yield Instruction(Label, self.endlabel)
 		yield Instruction(SET, RepeatCounter, Pop())
 
-	def stackUsage(self, functions):
-		return max(self.repeatcount.stackUsage(functions), self.body.stackUsage(functions)) + 1
+	def optimize(self, containingFunction):
+		CodeItemBase.optimize(self, containingFunction)
+
+		if isinstance(self.repeatcount, Constant) and self.repeatcount.value % 0x10000 == 0:
+			return StatementBlock(self.filename, self.line, [])
+
+		return self
 
 class While(CodeItemBase):
 
 	argumentNames = ('condition', 'body')
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		self.startlabel = nextlabel('while_start')
-		self.endlabel = nextlabel('while_end')
+	def transformToAsm(self, context, containingFunction, containingLoop):
+		self.startlabel = nextlabel(context, 'while_start')
+		self.endlabel = nextlabel(context, 'while_end')
 
 		yield Instruction(Comment, 'while')
 
 		yield Instruction(Label, self.startlabel)
 
-		for instruction in self.condition.transformToAsm(containingFunction, self):
+		for instruction in self.condition.transformToJump(context, containingFunction, self, self.endlabel, 0):
 			yield instruction
 
-		yield Instruction(IFE, Pop(), Literal(0))
-		yield Instruction(SET, PC(), self.endlabel)
-
-		for instruction in self.body.transformToAsm(containingFunction, self):
+		for instruction in self.body.transformToAsm(context, containingFunction, self):
 			yield instruction
 
 		yield Instruction(SET, PC(), self.startlabel)
 		yield Instruction(Label, self.endlabel)
 
-	def stackUsage(self, functions):
-		return max(self.condition.stackUsage(functions), self.body.stackUsage(functions))
+	def optimize(self, containingFunction):
+		CodeItemBase.optimize(self, containingFunction)
+
+		if isinstance(self.condition, BooleanConstant):
+			if self.condition.value:
+				return Loop(self.filename, self.line, self.body)
+			return StatementBlock(self.filename, self.line, [])
+
+		return self
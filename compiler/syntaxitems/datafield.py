@@ -36,6 +36,19 @@ class ConstantDataField(DataField):
 
 	address = None
 
+class PredefinedConstant(ConstantDataField):
+	'''
+	A constant provided by the compiler, whose value is an assembly operand, as
+	it may only be known once the whole program has been generated.
+	'''
+
+	predefined = True
+
+	def __init__(self, filename, line, datatype, name, operand):
+		ConstantDataField.__init__(self, filename, line, datatype, name, None)
+
+		self.operand = operand
+
 class LocalVariable(DataField):
 
 	address = None
@@ -1,73 +1,167 @@
+import copy
+
 from compiler import *
 from codeitembase import CodeItemBase
+import datafield
 
 class ExpressionBase(CodeItemBase):
 
 	constantExpression = False
+	operandExpression = False
 
-class Addition(ExpressionBase):
-	
-	argumentNames = ('left', 'right')
+	def transformToAsm(self, context, containingFunction, containingLoop):
+		registers = containingFunction.evaluationRegisters(self)
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
+		for instruction in self.transformToRegister(context, containingFunction, containingLoop, registers):
 			yield instruction
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
+
+		yield Instruction(SET, Push(), registers[0])
+
+def offsetExpression(filename, line, expression, offset):
+	'''Returns an expression for expression + offset, subtracting large offsets.'''
+
+	offset %= 0x10000
+
+	if offset == 0:
+		return expression
+	if offset >= 0x8000:
+		return Subtraction(filename, line, expression, Constant(filename, line, 0x10000 - offset))
+
+	return Addition(filename, line, expression, Constant(filename, line, offset))
+
+def pointerOperand(register, offset):
+	'''Returns the operand for the word at the address in register plus offset.'''
+
+	if offset % 0x10000 == 0:
+		return RegisterPointer(register)
+
+	return RegisterPointerOffset(register, offset)
+
+def constantOffset(expression):
+	'''Returns (base, offset) such that expression is base + offset.'''
+
+	if isinstance(expression, (Addition, Subtraction)) and isinstance(expression.right, Constant):
+		return expression.left, expression.sign * expression.right.value
+
+	return expression, 0
+
+class BinaryOperation(ExpressionBase):
+	'''
+	An arithmetic operation with a single DCPU-16 instruction, such as ADD.
+
+	evaluate gives the result for constant operands, as the instruction
+	would. A right operand equal to identity leaves the left one unchanged,
+	and one equal to absorbing makes the result absorbing. Constant operands
+	of commutative operations are moved to the right, where they can be used
+	directly.
+	'''
+
+	argumentNames = ('left', 'right')
+
+	commutative = False
+	identity = None
+	absorbing = None
+
+	def optimize(self, containingFunction):
+		ExpressionBase.optimize(self, containingFunction)
+
+		if isinstance(self.left, Constant) and isinstance(self.right, Constant):
+			return Constant(self.filename, self.line, self.evaluate(self.left.value % 0x10000, self.right.value % 0x10000) % 0x10000)
+
+		if self.commutative and isinstance(self.left, Constant):
+			self.left, self.right = self.right, self.left
+
+		if isinstance(self.right, Constant):
+			value = self.right.value % 0x10000
+
+			if value == self.identity:
+				return self.left
+			if value == self.absorbing and not self.left.containsCall():
+				return Constant(self.filename, self.line, self.absorbing)
+
+		return self
+
+	def transformToRegister(self, context, containingFunction, containingLoop, registers):
+		instructions, operand = self.transformOperands(context, containingFunction, containingLoop, self.left, self.right, registers)
+
+		for instruction in instructions:
 			yield instruction
 
-		yield Instruction(Comment, '+')
+		yield Instruction(Comment, self.operator)
+
+		yield Instruction(self.opcode, registers[0], operand)
+
+	def registerUsage(self):
+		return self.operandRegisterUsage(self.left, self.right)
+
+class Addition(BinaryOperation):
+
+	operator = '+'
+	opcode = staticmethod(ADD)
 
-		yield Instruction(SET, TempStorage, Pop())
-		yield Instruction(ADD, Peek(), TempStorage)
+	commutative = True
+	identity = 0
+	sign = 1
 
-	def stackUsage(self, functions):
-		return max(self.right.stackUsage(functions), self.left.stackUsage(functions) + 1)
+	@staticmethod
+	def evaluate(left, right):
+		return left + right
+
+	def optimize(self, containingFunction):
+		expression = BinaryOperation.optimize(self, containingFunction)
+
+		if expression is not self or not isinstance(self.right, Constant):
+			return expression
+
+		# (x + a) + b -> x + (a + b)
+		base, offset = constantOffset(self.left)
+		return offsetExpression(self.filename, self.line, base, offset + self.right.value)
 
 class AddressOf(ExpressionBase):
 	argumentNames = ('field',)
 	passiveArguments = ('field',)
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		yield Instruction(Comment, '&')
+	constantExpression = True
+	operandExpression = True
 
+	def operand(self, context, containingFunction):
 		field = containingFunction.identifiers[self.field]
-		yield Instruction(SET, Push(), Literal(dataFieldAddress(field)))
+		return MemoryAddress(dataFieldAddress(context, field))
+
+	def transformToRegister(self, context, containingFunction, containingLoop, registers):
+		yield Instruction(Comment, '&')
+
+		yield Instruction(SET, registers[0], self.operand(context, containingFunction))
+
+	def registerUsage(self):
+		return 1
 
 	def verifyIdentifiers(self, datafields, functions, containingFunction):
 		ExpressionBase.verifyIdentifiers(self, datafields, functions, containingFunction)
 
-		if self.field in containingFunction.identifiers:
+		if containingFunction.identifiers.isLocal(self.field):
 			self.error("Cannot get address of variable '%s'; only possible for data fields" % self.field)
 
-		qualName = '%s.%s' % (self.containingModule, self.field)
-		if qualName in datafields:
-			self.field = qualName
-		else:
+		field = containingFunction.identifiers.lookup(self.field)
+		if not isinstance(field, datafield.DataField):
 			self.error("Data field '%s' not found" % self.field)
 
-		containingFunction.identifiers[self.field].read = True
-		containingFunction.identifiers[self.field].assigned = True
-	
-	def stackUsage(self, functions):
-		return 1
-
-class And(ExpressionBase):
-
-	argumentNames = ('left', 'right')
+		self.field = field.name
+		field.read = True
+		field.assigned = True
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
-			yield instruction
+class And(BinaryOperation):
 
-		yield Instruction(Comment, '&')
+	operator = '&'
+	opcode = staticmethod(AND)
 
-		yield Instruction(SET, TempStorage, Pop())
-		yield Instruction(AND, Peek(), TempStorage)
+	commutative = True
+	identity = 0xffff
+	absorbing = 0
 
-	def stackUsage(self, functions):
-		return max(self.right.stackUsage(functions), self.left.stackUsage(functions) + 1)
+	@staticmethod
+	def evaluate(left, right):
+		return left & right
 
 class Call(ExpressionBase):
 
@@ -86,43 +180,58 @@ class Call(ExpressionBase):
 	def verifyIdentifiers(self, datafields, functions, containingFunction):
 		ExpressionBase.verifyIdentifiers(self, datafields, functions, containingFunction)
 
-		if self.function not in functions:
+		function = functions.get(self.function)
+		if function is None:
 			self.error("Function '%s' not found" % self.function)
 
-		for function in functions.values():
-			if function.name != self.function:
-				continue
-			if len(function.args) != len(self.arglist):
-				self.error("Function '%s' called with %d arguments (expected %d)" % (self.function, len(self.arglist), len(function.args)))
+		if len(function.args) != len(self.arglist):
+			self.error("Function '%s' called with %d arguments (expected %d)" % (self.function, len(self.arglist), len(function.args)))
 
-			function.called = True
+		function.called = True
 
 		for arg in self.arglist:
 			arg.verifyIdentifiers(datafields, functions, containingFunction)
 			
-	def transformToAsm(self, containingFunction, containingLoop):
+	def transformToRegister(self, context, containingFunction, containingLoop, registers):
 		if (self.arglist):
 			yield Instruction(Comment, 'write arguments')
 
 		for arg in self.arglist:
-			for asm in arg.transformToAsm(containingFunction, containingLoop):
+			instructions, operand = arg.transformToOperand(context, containingFunction, containingLoop, registers)
+
+			for asm in instructions:
 				yield asm
 
+			yield Instruction(SET, Push(), operand)
+
 		yield Instruction(Comment, 'call')
 
 		yield Instruction(JSR, LabelReference('func_' + self.function))
-		# TODO: don't push for void functions.
-		yield Instruction(SET, Push(), A)
 
-		yield Instruction(ADD, SP(), Literal(len(self.arglist)))
+		if self.arglist:
+			yield Instruction(ADD, SP(), Literal(len(self.arglist)))
+
+		# the return value is in A; registers other than A are kept by the function
+		if registers[0] is not A:
+			yield Instruction(SET, registers[0], A)
+
+	def registerUsage(self):
+		return max([1] + [arg.registerUsage() for arg in self.arglist])
+
+	def containsCall(self):
+		return True
+
+	def readsVariable(self, name):
+		# the function may read any data field
+		return '.' in name or any(arg.readsVariable(name) for arg in self.arglist)
 
-	def stackUsage(self, functions):
-		maxStack = 0
+	def optimize(self, containingFunction):
+		self.arglist = [arg.optimize(containingFunction) for arg in self.arglist]
 
-		for i in xrange(len(self.arglist)):
-			maxStack = max(maxStack, self.arglist[i].stackUsage(functions) + i)
+		return self
 
-		return max(maxStack, functions[self.function].stackUsage(functions) + 2)
+	def argumentsContainCall(self):
+		return any(arg.containsCall() for arg in self.arglist)
 
 class Constant(ExpressionBase):
 
@@ -130,13 +239,17 @@ class Constant(ExpressionBase):
 	passiveArguments = ('value',)
 
 	constantExpression = True
+	operandExpression = True
 
-	def transformToAsm(self, containingFunction, containingLoop):
+	def operand(self, context, containingFunction):
+		return Literal(self.value)
+
+	def transformToRegister(self, context, containingFunction, containingLoop, registers):
 		yield Instruction(Comment, 'constant')
 
-		yield Instruction(SET, Push(), Literal(self.value))
+		yield Instruction(SET, registers[0], self.operand(context, containingFunction))
 
-	def stackUsage(self, functions):
+	def registerUsage(self):
 		return 1
 
 class Identifier(ExpressionBase):
@@ -147,186 +260,209 @@ class Identifier(ExpressionBase):
 	def verifyIdentifiers(self, datafields, functions, containingFunction):
 		ExpressionBase.verifyIdentifiers(self, datafields, functions, containingFunction)
 
-		if self.name not in containingFunction.identifiers:
-			qualName = '%s.%s' % (self.containingModule, self.name)
-			if qualName in datafields:
-				self.name = qualName
-			else:
-				self.error("Data field '%s' not found" % self.name)
+		symbol = containingFunction.identifiers.lookup(self.name)
+		if symbol is None:
+			self.error("Data field '%s' not found" % self.name)
 
-		containingFunction.identifiers[self.name].read = True
+		self.name = symbol.name
+		symbol.read = True
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		yield Instruction(Comment, 'identifier')
+	operandExpression = True
+
+	def optimize(self, containingFunction):
+		symbol = containingFunction.identifiers[self.name]
 
-		if containingFunction.identifiers[self.name].constant:
+		# constants known only once the program is complete stay identifiers
+		if symbol.constant and not symbol.predefined:
+			return Constant(self.filename, self.line, symbol.value)
+
+		return self
+
+	def operand(self, context, containingFunction):
+		if isinstance(containingFunction.identifiers[self.name], datafield.PredefinedConstant):
+			# identifier is a constant only known once the program is complete
+			return copy.deepcopy(containingFunction.identifiers[self.name].operand)
+		elif containingFunction.identifiers[self.name].constant:
 			# identifier is a constant data field
-			yield Instruction(SET, Push(), Literal(containingFunction.identifiers[self.name].value))
+			return Literal(containingFunction.identifiers[self.name].value)
 		elif '.' in self.name:
 			# identifier is a data field
 
 			field = containingFunction.identifiers[self.name]
 
-			yield Instruction(SET, Push(), DataField(field))
+			return DataField(context, field)
 		else:
 			# identifier is a local variable
-			yield Instruction(SET, Push(), containingFunction.getLocationForVariable(self.name))
+			return containingFunction.getLocationForVariable(self.name)
+
+	def readsVariable(self, name):
+		return self.name == name
 
-	def stackUsage(self, functions):
+	def transformToRegister(self, context, containingFunction, containingLoop, registers):
+		yield Instruction(Comment, 'identifier')
+
+		yield Instruction(SET, registers[0], self.operand(context, containingFunction))
+
+	def registerUsage(self):
 		return 1
 
 class Dereference(ExpressionBase):
+	'''
+	Reads the word at an address. The word is used as an operand where it can
+	be: [address] for constant addresses, and [offset + register] for the
+	address of a register, such as a variable kept in one, plus a constant.
+	'''
+
 	argumentNames = ('expr',)
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.expr.transformToAsm(containingFunction, containingLoop):
-			yield instruction
+	def transformToOperand(self, context, containingFunction, containingLoop, registers):
+		base, offset = constantOffset(self.expr)
 
-		yield Instruction(Comment, 'dereference')
+		if isinstance(base, Constant):
+			return [], Pointer((base.value + offset) % 0x10000)
 
-		yield Instruction(SET, A, Pop())
-		yield Instruction(SET, Push(), RegisterPointer(A))
+		instructions, address = base.transformToOperand(context, containingFunction, containingLoop, registers)
 
-	def stackUsage(self, functions):
-		return 0
+		if not isinstance(address, Register):
+			instructions.append(Instruction(SET, registers[0], address))
+			address = registers[0]
 
-class Multiplication(ExpressionBase):
-	
-	argumentNames = ('left', 'right')
+		return instructions, pointerOperand(address, offset)
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
+	def transformToRegister(self, context, containingFunction, containingLoop, registers):
+		instructions, operand = self.transformToOperand(context, containingFunction, containingLoop, registers)
+
+		for instruction in instructions:
 			yield instruction
 
-		yield Instruction(Comment, '*')
+		yield Instruction(Comment, 'dereference')
 
-		yield Instruction(SET, TempStorage, Pop())
-		yield Instruction(MUL, Peek(), TempStorage)
+		yield Instruction(SET, registers[0], operand)
 
-	def stackUsage(self, functions):
-		return max(self.right.stackUsage(functions), self.left.stackUsage(functions) + 1)
+	def readsVariable(self, name):
+		# the address may be that of any data field
+		return '.' in name or self.expr.readsVariable(name)
 
-class Division(ExpressionBase):
-	
-	argumentNames = ('left', 'right')
+	def registerUsage(self):
+		return self.expr.registerUsage()
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
-			yield instruction
+class Multiplication(BinaryOperation):
 
-		yield Instruction(Comment, '*')
+	operator = '*'
+	opcode = staticmethod(MUL)
 
-		yield Instruction(SET, TempStorage, Pop())
-		yield Instruction(DIV, Peek(), TempStorage)
+	commutative = True
+	identity = 1
+	absorbing = 0
 
-	def stackUsage(self, functions):
-		return max(self.right.stackUsage(functions), self.left.stackUsage(functions) + 1)
+	@staticmethod
+	def evaluate(left, right):
+		return left * right
 
-class ShiftLeft(ExpressionBase):
-	
-	argumentNames = ('left', 'right')
+class Division(BinaryOperation):
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
-			yield instruction
+	operator = '/'
+	opcode = staticmethod(DIV)
 
-		yield Instruction(Comment, '*')
+	identity = 1
 
-		yield Instruction(SET, TempStorage, Pop())
-		yield Instruction(SHL, Peek(), TempStorage)
+	@staticmethod
+	def evaluate(left, right):
+		# DIV gives 0 when dividing by 0
+		if right == 0:
+			return 0
+		return left / right
 
-	def stackUsage(self, functions):
-		return max(self.right.stackUsage(functions), self.left.stackUsage(functions) + 1)
+class ShiftLeft(BinaryOperation):
 
-class ShiftRight(ExpressionBase):
-	
-	argumentNames = ('left', 'right')
+	operator = '<<'
+	opcode = staticmethod(SHL)
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
-			yield instruction
+	identity = 0
+
+	@staticmethod
+	def evaluate(left, right):
+		return left << right
 
-		yield Instruction(Comment, '*')
+class ShiftRight(BinaryOperation):
 
-		yield Instruction(SET, TempStorage, Pop())
-		yield Instruction(SHR, Peek(), TempStorage)
+	operator = '>>'
+	opcode = staticmethod(SHR)
 
-	def stackUsage(self, functions):
-		return max(self.right.stackUsage(functions), self.left.stackUsage(functions) + 1)
+	identity = 0
+
+	@staticmethod
+	def evaluate(left, right):
+		return left >> right
 
 class Not(ExpressionBase):
 
 	argumentNames = ('expression',)
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.expression.transformToAsm(containingFunction, containingLoop):
+	def transformToRegister(self, context, containingFunction, containingLoop, registers):
+		for instruction in self.expression.transformToRegister(context, containingFunction, containingLoop, registers):
 			yield instruction
 
 		yield Instruction(Comment, '!')
 
-		yield Instruction(XOR, Peek(), Literal(0xffff))
+		yield Instruction(XOR, registers[0], Literal(0xffff))
 
-	def stackUsage(self, functions):
-		return self.expression.stackUsage(functions)
+	def optimize(self, containingFunction):
+		ExpressionBase.optimize(self, containingFunction)
 
-class Or(ExpressionBase):
+		if isinstance(self.expression, Constant):
+			return Constant(self.filename, self.line, (self.expression.value ^ 0xffff) % 0x10000)
+		if isinstance(self.expression, Not):
+			return self.expression.expression
 
-	argumentNames = ('left', 'right')
+		return self
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
-			yield instruction
+	def registerUsage(self):
+		return self.expression.registerUsage()
 
-		yield Instruction(Comment, '|')
+class Or(BinaryOperation):
 
-		yield Instruction(SET, TempStorage, Pop())
-		yield Instruction(BOR, Peek(), TempStorage)
+	operator = '|'
+	opcode = staticmethod(BOR)
 
-	def stackUsage(self, functions):
-		return max(self.right.stackUsage(functions), self.left.stackUsage(functions) + 1)
+	commutative = True
+	identity = 0
+	absorbing = 0xffff
 
-class Subtraction(ExpressionBase):
-	
-	argumentNames = ('left', 'right')
+	@staticmethod
+	def evaluate(left, right):
+		return left | right
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
-			yield instruction
+class Subtraction(BinaryOperation):
 
-		yield Instruction(Comment, '-')
+	operator = '-'
+	opcode = staticmethod(SUB)
 
-		yield Instruction(SET, TempStorage, Pop())
-		yield Instruction(SUB, Peek(), TempStorage)
+	identity = 0
+	sign = -1
 
-	def stackUsage(self, functions):
-		return max(self.right.stackUsage(functions), self.left.stackUsage(functions) + 1)
+	@staticmethod
+	def evaluate(left, right):
+		return left - right
 
-class Xor(ExpressionBase):
+	def optimize(self, containingFunction):
+		expression = BinaryOperation.optimize(self, containingFunction)
 
-	argumentNames = ('left', 'right')
+		if expression is not self or not isinstance(self.right, Constant):
+			return expression
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.right.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.left.transformToAsm(containingFunction, containingLoop):
-			yield instruction
+		# (x + a) - b -> x + (a - b)
+		base, offset = constantOffset(self.left)
+		return offsetExpression(self.filename, self.line, base, offset - self.right.value)
+
+class Xor(BinaryOperation):
 
-		yield Instruction(Comment, '^')
+	operator = '^'
+	opcode = staticmethod(XOR)
 
-		yield Instruction(SET, TempStorage, Pop())
-		yield Instruction(XOR, Peek(), TempStorage)
+	commutative = True
+	identity = 0
 
-	def stackUsage(self, functions):
-		return max(self.right.stackUsage(functions), self.left.stackUsage(functions) + 1)
+	@staticmethod
+	def evaluate(left, right):
+		return left ^ right
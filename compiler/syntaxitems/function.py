@@ -1,7 +1,27 @@
+import copy
+
 from compiler import *
+from compiler.symboltable import Scope
 from codeitembase import CodeItemBase
+from controlflow import InlinedBody
+from datafield import LocalVariable
+from expression import Call
 from statement import ReturnValue
 
+# epilogues of at most this many words are copied to each return instead of jumped to
+foldedEpilogueWords = 2
+
+def endsWithReturnValue(block):
+	'''Returns whether the last statement of block returns a value, also when it is the last of an inlined call.'''
+
+	if not block.statements:
+		return False
+
+	if isinstance(block.statements[-1], InlinedBody):
+		return endsWithReturnValue(block.statements[-1].body)
+
+	return isinstance(block.statements[-1], ReturnValue)
+
 class FunctionBase(CodeItemBase):
 
 	argumentNames = ('datatype', 'name', 'args', 'locals', 'statementblock')
@@ -11,6 +31,15 @@ class FunctionBase(CodeItemBase):
 	called = False
 	hasStatementBlock = True
 
+	# name -> register of the variables kept in registers while generating code
+	variableRegisters = {}
+
+	# names of the functions whose calls were inlined into this function
+	inlinedFunctions = ()
+
+	# the local variables on the stack while generating code, or None for all of them
+	frameLocals = None
+
 	def __init__(self, filename, line, *args):
 		CodeItemBase.__init__(self, filename, line, *args)
 
@@ -44,110 +73,249 @@ class FunctionBase(CodeItemBase):
 
 		self.localdict = localdict
 
+	def defineLocal(self, name, datatype):
+		'''Adds a local variable, such as one for a variable of an inlined function.'''
+
+		local = LocalVariable(self.filename, self.line, datatype, name)
+
+		self.locals.append(local)
+		self.localdict[name] = local
+		self.identifiers.define(name, local)
+
 	def getLocationForVariable(self, name):
+		if name in self.variableRegisters:
+			return self.variableRegisters[name]
+
+		return self.getStackLocation(name)
+
+	def getStackLocation(self, name):
 		if name in self.argdict:
 			return RegisterPointerOffset(C, self.args.index(self.argdict[name]) + 2)
 
 		if name in self.localdict:
-			return RegisterPointerOffset(C, -1 - self.locals.index(self.localdict[name]))
+			frameLocals = self.locals if self.frameLocals is None else self.frameLocals
+			return RegisterPointerOffset(C, -1 - frameLocals.index(self.localdict[name]))
 		
 		raise Exception("Internal error: unable to locate variable '%s' in function '%s'" % (name, self.name))
 
+	def evaluationRegisters(self, expression):
+		'''
+		Returns the registers to evaluate the expression in. A is not kept by
+		functions, as it holds the return value, so it is only used when no
+		value is kept in it during a call. Registers holding variables are
+		not used.
+		'''
+
+		if not expression.containsCall() or isinstance(expression, Call) and not expression.argumentsContainCall():
+			registers = [A, X, Y, Z, I, J]
+		else:
+			registers = [X, Y, Z, I, J]
+
+		return [register for register in registers if register not in self.variableRegisters.values()]
+
+	def promoteVariables(self, body):
+		'''
+		Chooses the most used arguments and local variables of the function to
+		keep in the registers from X to J that body, its code with every
+		variable on the stack, does not use. A variable is only kept in a
+		register when that saves more than saving the register and reading the
+		argument costs; uses in loops count more. Returns name -> register.
+		'''
+
+		free = [register for register in (X, Y, Z, I, J) if not usesRegister(body, register)]
+
+		if not free:
+			return {}
+
+		# offset from C -> uses, weighted by the loops around them
+		uses = {}
+
+		for instruction, depth in zip(body, loopDepths(body)):
+			for operand in (instruction.a, instruction.b):
+				if isinstance(operand, RegisterPointerOffset) and operand.register is C:
+					uses[operand.offset] = uses.get(operand.offset, 0) + 8 ** min(depth, 3)
+
+		names = dict((self.getStackLocation(name).offset, name) for name in self.argdict.keys() + self.localdict.keys())
+
+		candidates = []
+
+		for offset, count in uses.iteritems():
+			# saving and restoring the register, and reading the argument
+			cost = 0
+			if self.saveVariables:
+				cost += 2
+			if names[offset] in self.argdict:
+				cost += 1
+
+			if count > cost:
+				candidates.append((count, offset))
+
+		candidates.sort(reverse=True)
+
+		return dict((names[offset], register) for register, (count, offset) in zip(free, candidates))
+
+	def optimize(self):
+		if self.hasStatementBlock:
+			CodeItemBase.optimize(self, self)
+
+		return self
+
 	def resolveIdentifiers(self, containingModule):
 		if self.hasStatementBlock:
 			CodeItemBase.resolveIdentifiers(self, containingModule)
 		
 		self.name = containingModule.name + '.' + self.name
 
-	def registerIdentifiers(self, identifiers):
-		self.identifiers = {}
-		self.identifiers.update(identifiers)
+	def registerIdentifiers(self, moduleScope):
+		self.identifiers = Scope(moduleScope)
 
 		for arg in self.args:
-			self.identifiers[arg.name] = arg
+			self.identifiers.define(arg.name, arg)
 
 		for local in self.locals:
-			self.identifiers[local.name] = local
+			self.identifiers.define(local.name, local)
 
-	def transformToAsm(self):
+	def transformToAsm(self, context):
 		yield Instruction(Comment, 'start function')
 
+		self.variableRegisters = {}
+		self.frameLocals = None
+
+		firstLabel = context.thislabel
+		body = list(self.statementblock.transformToAsm(context, self, None))
+		variableRegisters = self.promoteVariables(body)
+
+		# locals that are in registers or never used need no space on the stack
+		offsets = set(operand.offset for instruction in body for operand in (instruction.a, instruction.b) if isinstance(operand, RegisterPointerOffset) and operand.register is C)
+		self.frameLocals = [local for local in self.locals if local.name not in variableRegisters and self.getStackLocation(local.name).offset in offsets]
+
+		if variableRegisters or len(self.frameLocals) < len(self.locals):
+			# generate the code again with the variables in their registers, so
+			# it is chosen for them; the labels are numbered the same again
+			context.thislabel = firstLabel
+			self.variableRegisters = variableRegisters
+			body = list(self.statementblock.transformToAsm(context, self, None))
+
+		# without variables on the stack, C is neither set nor kept for the caller
+		usesFrame = usesRegister(body, C)
+
+		# the registers used by expressions and variables are kept for the caller
+		savedRegisters = []
 		if self.saveVariables:
+			savedRegisters = [register for register in (X, Y, Z, I, J) if usesRegister(body, register)]
+
+		if usesFrame and self.saveVariables:
 			yield Instruction(SET, Push(), C)
 
-		yield Instruction(SET, C, SP())
+		if usesFrame:
+			yield Instruction(SET, C, SP())
 
-		#if self.saveVariables:
-		#	for i in xrange(len(self.args) + len(self.locals)):
-		#		yield Instruction(SET, Push(), Registers[i + 2])
+		if self.frameLocals:
+			yield Instruction(SUB, SP(), Literal(len(self.frameLocals)))
 
-		#if (self.args):
-		#	yield Instruction(Comment, 'read arguments')
+		for register in savedRegisters:
+			yield Instruction(SET, Push(), register)
 
-		#for i in xrange(len(self.args)):
-		#	yield Instruction(SET, Registers[i + 2], Pointer(i + ArgumentOffset))
+		promotedArguments = [arg.name for arg in self.args if arg.name in self.variableRegisters]
 
-		yield Instruction(SUB, SP(), Literal(len(self.locals)))
+		if promotedArguments:
+			yield Instruction(Comment, 'read arguments')
 
-		for instruction in self.statementblock.transformToAsm(self, None):
-			yield instruction
+		if promotedArguments and not usesFrame:
+			# A is free until the body runs; the arguments are above the saved registers and the return address
+			yield Instruction(SET, A, SP())
+
+		for name in promotedArguments:
+			if usesFrame:
+				location = self.getStackLocation(name)
+			else:
+				location = RegisterPointerOffset(A, len(savedRegisters) + 1 + self.args.index(self.argdict[name]))
+
+			yield Instruction(SET, self.variableRegisters[name], location)
 
 		# Register A now contains return value
-			
+
+		epilogue = [Instruction(SET, register, Pop()) for register in reversed(savedRegisters)]
+
+		if self.frameLocals:
+			epilogue.append(Instruction(ADD, SP(), Literal(len(self.frameLocals))))
+
+		if usesFrame and self.saveVariables:
+			epilogue.append(Instruction(SET, C, Pop()))
+
+		epilogue.append(Instruction(SET, PC(), Pop()))
+
+		for instruction in self.foldReturns(body, epilogue):
+			yield instruction
+
 		yield Instruction(Label, LabelReference('ret_' + self.name))
 		yield Instruction(Comment, 'end function')
 
-		yield Instruction(ADD, SP(), Literal(len(self.locals)))
-
-		if self.saveVariables:
-			yield Instruction(SET, C, Pop())
+		for instruction in epilogue:
+			yield instruction
 
-		#if self.saveVariables:
-		#	for i in xrange(len(self.args) + len(self.locals) - 1, -1, -1):
-		#		yield Instruction(SET, Registers[i + 2], Pop())
+		self.variableRegisters = {}
+		self.frameLocals = None
 
 		if self.datatype != 'void':
-			if not self.statementblock.statements or not isinstance(self.statementblock.statements[-1], ReturnValue):
+			if not endsWithReturnValue(self.statementblock):
 				self.error("A value must be returned from functions with data type '%s'" % self.datatype)
 
-	def stackUsage(self, functions):
-		if self.saveVariables:
-			return len(self.args) + len(self.locals) + self.statementblock.stackUsage(functions)
-		return self.statementblock.stackUsage(functions)
+	def foldReturns(self, body, epilogue):
+		'''
+		Returns body with the jumps to the ret_ label replaced by the epilogue
+		itself, if it is at most foldedEpilogueWords long. Jumps that may be
+		skipped stay, as only a single instruction can be skipped.
+		'''
+
+		if sum(instruction.size() for instruction in epilogue) > foldedEpilogueWords:
+			return body
+
+		folded = []
+		skippable = False
+
+		for instruction in body:
+			if instruction.opcode in (Comment, Label):
+				folded.append(instruction)
+				continue
+
+			if not skippable and instruction.opcode == SET and isinstance(instruction.a, PC) and isinstance(instruction.b, LabelReference) and instruction.b.name == LabelReference('ret_' + self.name).name:
+				folded += copy.deepcopy(epilogue)
+			else:
+				folded.append(instruction)
+
+			skippable = instruction.opcode in (IFE, IFN, IFG, IFB)
+
+		return folded
 
 class PredefinedFunction(FunctionBase):
 
 	hasStatementBlock = False
 	called = True
 
-	def __init__(self, filename, line, name, asm, stackusage):
+	def __init__(self, filename, line, name, asm):
 		FunctionBase.__init__(self, filename, line, 'void', name, [], [], None)
 
 		self.asm = asm
-		self.stackusage = stackusage
 
 	def verifyIdentifiers(self, *args):
 		pass
 
-	def transformToAsm(self):
+	def transformToAsm(self, context):
 		yield Instruction(Label, LabelReference('func_' + self.name))
 
-		for instruction in self.asm:
+		# the optimizer changes instructions in place, so every program gets its own copy
+		for instruction in copy.deepcopy(self.asm):
 			yield instruction
-	
-	def stackUsage(self, functions):
-		return self.stackusage
 
 class Function(FunctionBase):
 
-	def transformToAsm(self):
+	def transformToAsm(self, context):
 		yield Instruction(Label, LabelReference('func_' + self.name))
 
-		for instruction in FunctionBase.transformToAsm(self):
+		for instruction in FunctionBase.transformToAsm(self, context):
 			yield instruction
 
-		yield Instruction(SET, PC(), Pop())
-
 class MainFunction(Function):
 
 	called = True
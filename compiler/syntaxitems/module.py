@@ -2,6 +2,12 @@ from abstractsyntaxitem import AbstractSyntaxItem
 
 class Module(AbstractSyntaxItem):
 
+	resolved = False
+
+	# hash of the source code and names of referenced modules; set by the compiler
+	sourceHash = ''
+	references = ()
+
 	def __init__(self, filename, line, name, datafields, functions):
 		AbstractSyntaxItem.__init__(self, filename, line)
 
@@ -16,3 +22,5 @@ class Module(AbstractSyntaxItem):
 
 		for function in self.functions:
 			function.resolveIdentifiers(self)
+
+		self.resolved = True
@@ -1,5 +1,18 @@
 from compiler import *
 from codeitembase import CodeItemBase
+from expression import BinaryOperation, Constant, Dereference, Identifier, Not, constantOffset, pointerOperand
+from statementblock import StatementBlock
+import datafield
+
+def targetOperand(context, containingFunction, target):
+	'''Returns the operand of the variable or data field named target.'''
+
+	if '.' in target:
+		# identifier is a data field
+		return DataField(context, containingFunction.identifiers[target])
+
+	# identifier is a local variable
+	return containingFunction.getLocationForVariable(target)
 
 class SetBit(CodeItemBase):
 
@@ -15,28 +28,25 @@ class SetBit(CodeItemBase):
 	def verifyIdentifiers(self, datafields, functions, containingFunction):
 		CodeItemBase.verifyIdentifiers(self, datafields, functions, containingFunction)
 
-		if self.target not in containingFunction.argdict and self.target not in containingFunction.localdict and self.target not in datafields:
-			qualName = '%s.%s' % (self.containingModule, self.target)
-			if qualName in datafields:
-				self.target = qualName
-			else:
-				self.error("Data field '%s' not found" % self.target)
+		target = containingFunction.identifiers.lookup(self.target)
+		if not isinstance(target, datafield.DataField):
+			self.error("Data field '%s' not found" % self.target)
+
+		self.target = target.name
 
-	def transformToAsm(self, containingFunction, containingLoop):
+	def transformToAsm(self, context, containingFunction, containingLoop):
 		if containingFunction.identifiers[self.target].constant:
 			self.error("Constant field '%s' cannot be assigned to" % self.target)
 
 		if not self.value.constantExpression:
-			for instruction in self.value.transformToAsm(containingFunction, containingLoop):
+			instructions, value = self.transformValue(context, containingFunction, containingLoop, self.value)
+
+			for instruction in instructions:
 				yield instruction
 
 		yield Instruction(Comment, 'setbit')
 
-		if '.' in self.target:
-			# identifier is a data field
-			target = DataField(containingFunction.identifiers[self.target])
-		else:
-			target = containingFunction.getLocationForVariable(self.target)
+		target = targetOperand(context, containingFunction, self.target)
 
 		if self.value.constantExpression:
 			if self.value.value:
@@ -44,21 +54,16 @@ class SetBit(CodeItemBase):
 			else:
 				yield Instruction(AND, target, Literal(0xffff ^ (1 << self.bit)))
 		else:
-			yield Instruction(IFE, Pop(), Literal(0))
-			yield Instruction(SET, PC(), clearBitLabel)
-
-			yield Instruction(BOR, target, Literal(1 << self.bit))
-			yield Instruction(SET, PC(), endLabel)
-
-			yield Instruction(Label, clearBitLabel)
 			yield Instruction(AND, target, Literal(0xffff ^ (1 << self.bit)))
-
-			yield Instruction(Label, endLabel)
-
-	def stackUsage(self, functions):
-		return self.value.stackUsage(functions)
+			yield Instruction(IFN, value, Literal(0))
+			yield Instruction(BOR, target, Literal(1 << self.bit))
 
 class Assignment(CodeItemBase):
+	'''
+	Sets a variable or data field to the value of an expression. The value
+	is either evaluated and then set, or computed in the target itself, as
+	in ADD [x], 5 for x = x + 5; the cheaper code is used.
+	'''
 
 	argumentNames = ('target', 'value')
 	passiveArguments = ('target',)
@@ -66,51 +71,103 @@ class Assignment(CodeItemBase):
 	def verifyIdentifiers(self, datafields, functions, containingFunction):
 		CodeItemBase.verifyIdentifiers(self, datafields, functions, containingFunction)
 
-		if self.target not in containingFunction.identifiers:
-			qualName = '%s.%s' % (self.containingModule, self.target)
-			if qualName in datafields:
-				self.target = qualName
-			else:
-				self.error("Data field '%s' not found" % self.target)
+		target = containingFunction.identifiers.lookup(self.target)
+		if target is None:
+			self.error("Data field '%s' not found" % self.target)
 
-		containingFunction.identifiers[self.target].assigned = True
+		self.target = target.name
+		target.assigned = True
 
-	def transformToAsm(self, containingFunction, containingLoop):
+	def transformToAsm(self, context, containingFunction, containingLoop):
 		if containingFunction.identifiers[self.target].constant:
 			self.error("Constant field '%s' cannot be assigned to" % self.target)
 
-		for instruction in self.value.transformToAsm(containingFunction, containingLoop):
-			yield instruction
+		# a function could read the data field before it has its value
+		canAccumulate = '.' not in self.target or not self.value.containsCall()
 
-		yield Instruction(Comment, 'assignment')
+		# variables kept in the registers the first code of the function did
+		# not use may leave too few to evaluate the value, but not to compute
+		# it in the target
+		if canAccumulate and self.value.registerUsage() > len(containingFunction.evaluationRegisters(self.value)):
+			accumulated = self.accumulate(context, containingFunction, containingLoop, self.value)
 
-		if '.' in self.target:
-			# identifier is a data field
-			dataField = containingFunction.identifiers[self.target]
+			if accumulated is not None:
+				return accumulated
 
-			yield Instruction(SET, DataField(dataField), Pop())
-		else:
-			# identifier is a local variable
-			yield Instruction(SET, containingFunction.getLocationForVariable(self.target), Pop())
+		instructions, value = self.transformValue(context, containingFunction, containingLoop, self.value)
+
+		instructions.append(Instruction(Comment, 'assignment'))
+		instructions.append(Instruction(SET, targetOperand(context, containingFunction, self.target), value))
 
-	def stackUsage(self, functions):
-		return self.value.stackUsage(functions)
+		if canAccumulate:
+			accumulated = self.accumulate(context, containingFunction, containingLoop, self.value)
+
+			if accumulated is not None and cost(accumulated) <= cost(instructions):
+				return accumulated
+
+		return instructions
+
+	def accumulate(self, context, containingFunction, containingLoop, expression):
+		'''
+		Returns the Asm instances that compute expression in the target, or
+		None if it cannot be. Once the target has been changed, the operands
+		used after it must not read it.
+		'''
+
+		if isinstance(expression, Identifier) and expression.name == self.target:
+			return []
+
+		if expression.operandExpression:
+			return [Instruction(SET, targetOperand(context, containingFunction, self.target), expression.operand(context, containingFunction))]
+
+		if isinstance(expression, Not):
+			instructions = self.accumulate(context, containingFunction, containingLoop, expression.expression)
+
+			if instructions is None:
+				return None
+
+			return instructions + [Instruction(Comment, '!'), Instruction(XOR, targetOperand(context, containingFunction, self.target), Literal(0xffff))]
+
+		if not isinstance(expression, BinaryOperation):
+			return None
+
+		left, right = expression.left, expression.right
+
+		if expression.commutative and right.readsVariable(self.target) and not left.readsVariable(self.target):
+			left, right = right, left
+
+		instructions = self.accumulate(context, containingFunction, containingLoop, left)
+
+		if instructions is None or instructions and right.readsVariable(self.target):
+			return None
+
+		rightInstructions, operand = self.transformValue(context, containingFunction, containingLoop, right)
+
+		return instructions + rightInstructions + [
+			Instruction(Comment, expression.operator),
+			Instruction(expression.opcode, targetOperand(context, containingFunction, self.target), operand),
+		]
 
 class Discard(CodeItemBase):
 
 	argumentNames = ('expression',)
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.expression.transformToAsm(containingFunction, containingLoop):
+	def transformToAsm(self, context, containingFunction, containingLoop):
+		instructions, value = self.transformValue(context, containingFunction, containingLoop, self.expression)
+
+		for instruction in instructions:
 			yield instruction
 
 		yield Instruction(Comment, 'discard')
-		yield Instruction(ADD, SP(), Literal(1))
 
-		# TODO: discard words specified by data type
+	def optimize(self, containingFunction):
+		CodeItemBase.optimize(self, containingFunction)
 
-	def stackUsage(self, functions):
-		return self.expression.stackUsage(functions)
+		# only calls can change anything
+		if not self.expression.containsCall():
+			return StatementBlock(self.filename, self.line, [])
+
+		return self
 
 class Decrement(CodeItemBase):
 
@@ -120,44 +177,84 @@ class Decrement(CodeItemBase):
 	def verifyIdentifiers(self, datafields, functions, containingFunction):
 		CodeItemBase.verifyIdentifiers(self, datafields, functions, containingFunction)
 
-		if self.target not in containingFunction.identifiers:
-			qualName = '%s.%s' % (self.containingModule, self.target)
-			if qualName in datafields:
-				self.target = qualName
-			else:
-				self.error("Data field '%s' not found" % self.target)
-
-		containingFunction.identifiers[self.target].assigned = True
+		target = containingFunction.identifiers.lookup(self.target)
+		if target is None:
+			self.error("Data field '%s' not found" % self.target)
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		if '.' in self.target:
-			# identifier is a data field
-			location = containingFunction.identifiers[self.target].location
+		self.target = target.name
+		target.assigned = True
 
-			yield Instruction(SUB, Pointer(self.target), Literal(1))
-		else:
-			# identifier is a local variable
-			yield Instruction(SUB, containingFunction.getLocationForVariable(self.target), Literal(1))
+	def transformToAsm(self, context, containingFunction, containingLoop):
+		if containingFunction.identifiers[self.target].constant:
+			self.error("Constant field '%s' cannot be assigned to" % self.target)
 
-	def stackUsage(self, functions):
-		return 0
+		yield Instruction(SUB, targetOperand(context, containingFunction, self.target), Literal(1))
 
 class DerefAssignment(CodeItemBase):
+	'''
+	Sets the word at an address, used as [address] or [offset + register]
+	where possible. When the value is an operation on the word itself, as in
+	*p = *p + 1, the word is changed in place.
+	'''
 
 	argumentNames = ('target', 'value')
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		for instruction in self.value.transformToAsm(containingFunction, containingLoop):
-			yield instruction
-		for instruction in self.target.transformToAsm(containingFunction, containingLoop):
+	def isTarget(self, expression):
+		'''Returns whether expression reads the word that is assigned to.'''
+
+		if not isinstance(expression, Dereference):
+			return False
+
+		base, offset = constantOffset(self.target)
+		otherBase, otherOffset = constantOffset(expression.expr)
+
+		if (offset - otherOffset) % 0x10000 != 0:
+			return False
+
+		if isinstance(base, Identifier) and isinstance(otherBase, Identifier):
+			return base.name == otherBase.name
+		if isinstance(base, Constant) and isinstance(otherBase, Constant):
+			return (base.value - otherBase.value) % 0x10000 == 0
+
+		return False
+
+	def transformToAsm(self, context, containingFunction, containingLoop):
+		value = self.value
+		opcode = SET
+
+		# without calls, nothing changes the word or its address before it is changed
+		if isinstance(value, BinaryOperation) and not value.containsCall():
+			left, right = value.left, value.right
+
+			if value.commutative and self.isTarget(right) and not self.isTarget(left):
+				left, right = right, left
+
+			if self.isTarget(left):
+				value = right
+				opcode = self.value.opcode
+
+		base, offset = constantOffset(self.target)
+
+		if isinstance(base, Constant) or base.operandExpression and isinstance(base.operand(context, containingFunction), Register):
+			# the address needs no register
+			ignore, target = Dereference(self.filename, self.line, self.target).transformToOperand(context, containingFunction, containingLoop, [])
+			instructions, operand = self.transformValue(context, containingFunction, containingLoop, value)
+		elif self.keepsOrder(base, value):
+			# the value is evaluated before the address, as it is written
+			registers = containingFunction.evaluationRegisters(self)
+			instructions, address = self.transformOperands(context, containingFunction, containingLoop, value, base, registers, False)
+			target = pointerOperand(address, offset)
+			operand = registers[0]
+		else:
+			registers = containingFunction.evaluationRegisters(self)
+			instructions, operand = self.transformOperands(context, containingFunction, containingLoop, base, value, registers)
+			target = pointerOperand(registers[0], offset)
+
+		for instruction in instructions:
 			yield instruction
 
 		yield Instruction(Comment, 'derefassignment')
-		yield Instruction(SET, A, Pop())
-		yield Instruction(SET, RegisterPointer(A), Pop())
-
-	def stackUsage(self, functions):
-		return self.value.stackUsage(functions)
+		yield Instruction(opcode, target, operand)
 
 class Increment(CodeItemBase):
 
@@ -167,33 +264,26 @@ class Increment(CodeItemBase):
 	def verifyIdentifiers(self, datafields, functions, containingFunction):
 		CodeItemBase.verifyIdentifiers(self, datafields, functions, containingFunction)
 
-		if self.target not in containingFunction.identifiers:
-			qualName = '%s.%s' % (self.containingModule, self.target)
-			if qualName in datafields:
-				self.target = qualName
-			else:
-				self.error("Data field '%s' not found" % self.target)
-
-		containingFunction.identifiers[self.target].assigned = True
+		target = containingFunction.identifiers.lookup(self.target)
+		if target is None:
+			self.error("Data field '%s' not found" % self.target)
 
-	def transformToAsm(self, containingFunction, containingLoop):
-		if '.' in self.target:
-			# identifier is a data field
-			location = containingFunction.identifiers[self.target].location
+		self.target = target.name
+		target.assigned = True
 
-			yield Instruction(ADD, Pointer(self.target), Literal(1))
-		else:
-			# identifier is a local variable
-			yield Instruction(ADD, containingFunction.getLocationForVariable(self.target), Literal(1))
+	def transformToAsm(self, context, containingFunction, containingLoop):
+		if containingFunction.identifiers[self.target].constant:
+			self.error("Constant field '%s' cannot be assigned to" % self.target)
 
-	def stackUsage(self, functions):
-		return 0
+		yield Instruction(ADD, targetOperand(context, containingFunction, self.target), Literal(1))
 
 class Return(CodeItemBase):
 
 	argumentNames = ()
 
-	def transformToAsm(self, containingFunction, containingLoop):
+	leavesBlock = True
+
+	def transformToAsm(self, context, containingFunction, containingLoop):
 		if containingFunction.datatype != 'void':
 			self.error("Functions with data type '%s' cannot return without a value" % containingFunction.datatype)
 
@@ -201,23 +291,23 @@ class Return(CodeItemBase):
 
 		yield Instruction(SET, PC(), LabelReference('ret_' + containingFunction.name))
 
-	def stackUsage(self, functions):
-		return 0
-
 class ReturnValue(CodeItemBase):
 
 	argumentNames = ('value',)
 
-	def transformToAsm(self, containingFunction, containingLoop):
+	leavesBlock = True
+
+	def transformToAsm(self, context, containingFunction, containingLoop):
 		if containingFunction.datatype == 'void':
 			self.error("A value cannot be returned from 'void' functions")
 
-		for instruction in self.value.transformToAsm(containingFunction, containingLoop):
+		instructions, value = self.transformValue(context, containingFunction, containingLoop, self.value)
+
+		for instruction in instructions:
 			yield instruction
 
 		yield Instruction(Comment, 'return')
-		yield Instruction(SET, A, Pop())
-		yield Instruction(SET, PC(), LabelReference('ret_' + containingFunction.name))
 
-	def stackUsage(self, functions):
-		return self.value.stackUsage(functions)
+		if value is not A:
+			yield Instruction(SET, A, value)
+		yield Instruction(SET, PC(), LabelReference('ret_' + containingFunction.name))
@@ -17,19 +17,29 @@ class StatementBlock(CodeItemBase):
 		for statement in self.statements:
 			statement.verifyIdentifiers(datafields, functions, containingFunction)
 
-	def transformToAsm(self, containingFunction, containingLoop):
+	def transformToAsm(self, context, containingFunction, containingLoop):
 		for statement in self.statements:
-			for instruction in statement.transformToAsm(containingFunction, containingLoop):
+			for instruction in statement.transformToAsm(context, containingFunction, containingLoop):
 				yield instruction
 
-	def optimize(self):
-		for i in xrange(len(self.statements)):
-			self.statements[i] = self.statements[i].optimize()
+	def optimize(self, containingFunction):
+		statements = []
 
-		return self
+		for statement in self.statements:
+			statement = statement.optimize(containingFunction)
+
+			# the statements of blocks left by other optimizations become part of this one
+			if isinstance(statement, StatementBlock):
+				statements += statement.statements
+			else:
+				statements.append(statement)
 
-	def stackUsage(self, functions):
-		if not self.statements:
-			return 0
+		# statements after a jump never run
+		for index, statement in enumerate(statements):
+			if statement.leavesBlock:
+				del statements[index + 1:]
+				break
 
-		return max(statement.stackUsage(functions) for statement in self.statements)
+		self.statements = statements
+
+		return self
@@ -0,0 +1,52 @@
+import contextlib
+import json
+import resource
+import sys
+import time
+
+def peakMemory():
+	'''Returns the peak resident memory of this process in kilobytes.'''
+
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+	if sys.platform == 'darwin':
+		# reported in bytes instead of kilobytes
+		peak /= 1024
+
+	return peak
+
+class TimeReport(object):
+	'''Records the wall time and peak memory of each compilation phase.'''
+
+	def __init__(self):
+		self.phases = []
+
+	@contextlib.contextmanager
+	def phase(self, name):
+		start = time.time()
+		startPeak = peakMemory()
+
+		yield
+
+		peak = peakMemory()
+		self.phases.append({
+			'phase': name,
+			'time': time.time() - start,
+			'peakMemory': peak,
+			'memoryIncrease': peak - startPeak,
+		})
+
+	def write(self, out):
+		print >>out, '%-24s %10s %18s %15s' % ('Phase', 'Time (s)', 'Peak memory (KB)', 'Increase (KB)')
+
+		for phase in self.phases:
+			print >>out, '%-24s %10.3f %18d %15d' % (phase['phase'], phase['time'], phase['peakMemory'], phase['memoryIncrease'])
+
+		print >>out, '%-24s %10.3f %18d' % ('Total', self.totalTime(), peakMemory())
+
+	def writeJson(self, out):
+		json.dump({'phases': self.phases, 'time': self.totalTime(), 'peakMemory': peakMemory()}, out, indent=2)
+		out.write('\n')
+
+	def totalTime(self):
+		return sum(phase['time'] for phase in self.phases)
@@ -1,13 +1,15 @@
 #!/usr/bin/python
 
+import filecmp
 import os
 import sys
+import time
 
 import json
 
 from optparse import OptionParser, OptionGroup
 
-from compiler import DCCompiler, CompilerError
+from compiler import DCCompiler, CompilerError, CompileServer, ModuleCache, writeAsm, writeStatisticsJson
 
 def main():
 	usage = 'usage: %prog [options]'
@@ -15,10 +17,26 @@ def main():
 	epilog = 'Report bugs and feature requests to zr40.nl@gmail.com'
 	version = '%prog 0.9 dev'
 	parser = OptionParser(usage=usage, description=description, epilog=epilog, version=version)
+	parser.add_option('-o', metavar='PATH', dest='output', help="write assembly to PATH, or to standard output if PATH is '-' (default: %default)", default='output.asm')
 	parser.add_option('-m', metavar='PATH', action='append', dest='moduleSearchPath', help='look for referenced modules in PATH', default=[os.path.dirname(os.path.realpath(__file__)) + '/stdlib'])
 	parser.add_option('--no-opt', action='store_false', dest='optimize', help='do not perform optimizations', default=True)
 	parser.add_option('-v', action='store_true', dest='verboseinfo', help='show verbose information', default=False)
 	parser.add_option('-p', action='store_true', dest='verboseprogress', help='show verbose progress', default=False)
+	parser.add_option('--inline-limit', metavar='WORDS', type='int', dest='inlineLimit', help='inline calls to functions of at most WORDS words of code, or none if 0 (default: %default)', default=24)
+	parser.add_option('--inline-report', action='store_true', dest='inlineReport', help='show which calls were inlined', default=False)
+	parser.add_option('--call-graph', action='store_true', dest='callGraph', help='show the call graph and the functions and data fields removed as unreachable', default=False)
+	parser.add_option('--stack-report', action='store_true', dest='stackReport', help='show the worst-case stack depth of each function', default=False)
+	parser.add_option('--stack-size', metavar='WORDS', type='int', dest='stackSize', help='warn when the stack may need more than WORDS words (default: mem.STACK_SIZE if the program uses mem)', default=None)
+	parser.add_option('-j', metavar='N', type='int', dest='jobs', help='parse modules in N processes', default=1)
+	parser.add_option('--cache-dir', metavar='PATH', dest='cacheDirectory', help='cache parsed modules and generated code in PATH', default=None)
+	parser.add_option('--cache-size', metavar='MB', type='int', dest='cacheSize', help='limit the cache to MB megabytes (default: %default)', default=64)
+	parser.add_option('--time-report', action='store_true', dest='timeReport', help='show the time and peak memory used by each compilation phase', default=False)
+	parser.add_option('--time-report-json', metavar='PATH', dest='timeReportJson', help="write the time report as JSON to PATH, or to standard output if PATH is '-'", default=None)
+	parser.add_option('--optimizer-report', action='store_true', dest='optimizerReport', help='show how often each optimizer rule was applied and how many words it saved', default=False)
+	parser.add_option('--optimizer-report-json', metavar='PATH', dest='optimizerReportJson', help="write the optimizer report as JSON to PATH, or to standard output if PATH is '-'", default=None)
+	parser.add_option('--watch', action='store_true', dest='watch', help='keep running and recompile when source files change', default=False)
+	parser.add_option('--serve', action='store_true', dest='serve', help='keep running and compile programs sent as JSON requests on standard input', default=False)
+	parser.add_option('--socket', metavar='PATH', dest='socket', help='with --serve, accept requests on the Unix socket PATH instead', default=None)
 
 	group = OptionGroup(parser, 'Debugging options')
 	group.add_option('--debug-compiler', action='store_true', dest='debugCompiler', help='show a stack trace for compile errors', default=False)
@@ -33,23 +51,158 @@ def main():
 	if args:
 		parser.error("no such option: %s" % args[0])
 
+	if options.socket and not options.serve:
+		parser.error('--socket requires --serve')
+
+	if options.serve:
+		serve(options)
+		return
+
 	if not os.path.exists('main.dc'):
 		parser.error("'main.dc' does not exist")
 
+	if options.watch:
+		if options.output == '-':
+			parser.error('--watch cannot write to standard output')
+
+		watch(options)
+		return
+
+	jsonReports = [option for option, path in (('--time-report-json', options.timeReportJson), ('--optimizer-report-json', options.optimizerReportJson)) if path == '-']
+
+	if jsonReports and options.output == '-':
+		parser.error('%s cannot write to standard output with -o -' % jsonReports[0])
+
+	if len(jsonReports) > 1:
+		parser.error('only one JSON report can be written to standard output')
+
+	# keep standard output free for the assembly or the JSON report
+	if options.output == '-' or jsonReports:
+		messages = sys.stderr
+	else:
+		messages = sys.stdout
+
+	compiler = DCCompiler(out=messages)
+
 	def compile():
-		return DCCompiler().compile(options)
+		return compiler.compile(options)
 
 	try:
-		asm = compile()
+		program = compile()
 	except CompilerError as e:
 		if options.debugCompiler:
 			raise
 
-		print e
+		print >>messages, e
 		sys.exit(1)
 
-	with open('output.asm', 'w') as outputfile:
-		outputfile.write(asm)
+	with compiler.timeReport.phase('writeAsm'):
+		if options.output == '-':
+			writeAsm(compiler.context, program, sys.stdout)
+		else:
+			with open(options.output, 'w') as outputfile:
+				writeAsm(compiler.context, program, outputfile)
+
+	if options.timeReport:
+		compiler.timeReport.write(messages)
+
+	if options.timeReportJson == '-':
+		compiler.timeReport.writeJson(sys.stdout)
+	elif options.timeReportJson:
+		with open(options.timeReportJson, 'w') as reportfile:
+			compiler.timeReport.writeJson(reportfile)
+
+	if options.inlineReport and compiler.inliner:
+		compiler.inliner.write(messages)
+
+	if options.callGraph and compiler.callGraph:
+		compiler.callGraph.write(messages)
+
+	if options.stackReport:
+		compiler.stackAnalysis.write(messages)
+
+	statistics = [compiler.functionStatistics, compiler.programStatistics]
+
+	if options.optimizerReport:
+		for item in statistics:
+			item.write(messages)
+
+	if options.optimizerReportJson == '-':
+		writeStatisticsJson(statistics, sys.stdout)
+	elif options.optimizerReportJson:
+		with open(options.optimizerReportJson, 'w') as reportfile:
+			writeStatisticsJson(statistics, reportfile)
+
+def watch(options):
+	'''Recompiles whenever a .dc file in the working directory or module search path changes.'''
+
+	# keep parsed modules and generated code in memory, unless a cache directory is given
+	compiler = DCCompiler(ModuleCache(options.cacheDirectory, options.cacheSize * 1024 * 1024))
+	sources = None
+
+	try:
+		while True:
+			newSources = findSources(options)
+
+			if newSources != sources:
+				sources = newSources
+				rebuild(options, compiler)
+
+			time.sleep(0.5)
+	except KeyboardInterrupt:
+		pass
+
+def serve(options):
+	'''Compiles programs sent as JSON requests until standard input ends, or forever with --socket.'''
+
+	server = CompileServer(options)
+	server.warmUp()
+
+	try:
+		if options.socket:
+			server.serveSocket(options.socket)
+		else:
+			server.serveStream(sys.stdin, sys.stdout)
+	except KeyboardInterrupt:
+		pass
+
+def findSources(options):
+	'''Returns the modification time and size of every .dc file that may be compiled.'''
+
+	sources = {}
+
+	for directory in ['.'] + options.moduleSearchPath:
+		for filename in os.listdir(directory):
+			if filename.endswith('.dc'):
+				path = os.path.join(directory, filename)
+				status = os.stat(path)
+				sources[path] = (status.st_mtime, status.st_size)
+
+	return sources
+
+def rebuild(options, compiler):
+	start = time.time()
+
+	try:
+		program = compiler.compile(options)
+	except CompilerError as e:
+		if options.debugCompiler:
+			raise
+
+		print e
+		print 'Build failed after %.3f s' % (time.time() - start)
+		return
+
+	temporary = options.output + '.tmp'
+	with open(temporary, 'w') as outputfile:
+		writeAsm(compiler.context, program, outputfile)
+
+	if os.path.exists(options.output) and filecmp.cmp(temporary, options.output, shallow=False):
+		os.remove(temporary)
+		print 'Rebuilt in %.3f s; %s is unchanged' % (time.time() - start, options.output)
+	else:
+		os.rename(temporary, options.output)
+		print 'Rebuilt in %.3f s' % (time.time() - start)
 
 if __name__ == '__main__':
 	main()
@@ -0,0 +1,84 @@
+#!/usr/bin/python
+
+'''
+Measures how long a new compiler process takes to parse a program of 10
+modules: main and 9 generated modules of 20 functions each. Every run is a
+new process, so the parser is built and its parse table loaded each time.
+Only the parsing is timed, not starting Python or importing the compiler.
+
+usage: coldstart.py [--compiler ROOT] [--runs N]
+
+ROOT is the checkout whose compiler is measured, by default this one. To
+measure a read-only installation without a usable parse table, copy the
+checkout, remove compiler/dcparsetab.py and make the copy read-only.
+'''
+
+import optparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import generate
+
+benchmarksDirectory = os.path.dirname(os.path.realpath(__file__))
+defaultRoot = os.path.dirname(os.path.dirname(benchmarksDirectory))
+
+modules = 9
+functions = 20
+
+def parseOnce(root, directory):
+	'''Parses the program in directory with the compiler in root and returns the time it took.'''
+
+	sys.path.insert(0, root)
+	from compiler import DCCompiler
+
+	options = optparse.Values({
+		'moduleSearchPath': [os.path.join(root, 'stdlib')],
+		'debugParser': False,
+		'verboseprogress': False,
+	})
+
+	os.chdir(directory)
+	compiler = DCCompiler()
+
+	start = time.time()
+	for modulename in ['main'] + ['m%d' % module for module in range(modules)]:
+		compiler.parse(options, modulename)
+
+	return time.time() - start
+
+def main():
+	parser = optparse.OptionParser(usage='usage: %prog [--compiler ROOT] [--runs N]')
+	parser.add_option('--compiler', metavar='ROOT', dest='root', help='measure the compiler in ROOT (default: %default)', default=defaultRoot)
+	parser.add_option('--runs', metavar='N', type='int', dest='runs', help='start N processes (default: %default)', default=5)
+	parser.add_option('--parse', metavar='DIRECTORY', dest='parse', help=optparse.SUPPRESS_HELP, default=None)
+
+	options, args = parser.parse_args()
+
+	if options.parse:
+		# a single run, in its own process
+		print parseOnce(os.path.realpath(options.root), options.parse)
+		return 0
+
+	directory = tempfile.mkdtemp()
+
+	try:
+		generate.writeProgram(directory, modules, functions)
+
+		times = []
+		for run in range(options.runs):
+			output = subprocess.check_output([sys.executable, __file__, '--compiler', options.root, '--parse', directory])
+			times.append(float(output.split()[-1]))
+	finally:
+		shutil.rmtree(directory)
+
+	times.sort()
+	print 'Cold parse of %d modules: best %.3f s, median %.3f s over %d runs' % (modules + 1, times[0], times[len(times) // 2], len(times))
+
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/python
+
+'''
+Writes a generated DC program for the benchmarks. The program has a main
+module and modules m0 to mN, each with 20 data fields and a chain of
+functions that each call the function before them. The first function of a
+module calls the last function of the module before it, and main calls the
+last function of the last module, so every function is used.
+
+usage: generate.py DIRECTORY MODULES FUNCTIONS
+
+MODULES is the number of modules besides main, FUNCTIONS the number of
+functions in each of them.
+'''
+
+import os
+import sys
+
+fieldsPerModule = 20
+
+def functionSource(module, function, functions):
+	lines = [
+		'int f%d(int a)' % function,
+		'{',
+		'\tint l;',
+		'\tl = a + field%d;' % (function % fieldsPerModule),
+	]
+
+	if function > 0:
+		lines.append('\tl = l + f%d(l);' % (function - 1))
+	elif module > 0:
+		lines.append('\tl = l + m%d.f%d(l);' % (module - 1, functions - 1))
+
+	lines += [
+		'\treturn l;',
+		'}',
+	]
+
+	return '\n'.join(lines) + '\n'
+
+def writeProgram(directory, modules, functions):
+	'''Writes main.dc and the modules of the program to directory.'''
+
+	if not os.path.isdir(directory):
+		os.makedirs(directory)
+
+	for module in range(modules):
+		lines = ['int field%d = %d;' % (field, field) for field in range(fieldsPerModule)]
+		lines += [functionSource(module, function, functions) for function in range(functions)]
+
+		with open(os.path.join(directory, 'm%d.dc' % module), 'w') as f:
+			f.write('\n'.join(lines))
+
+	with open(os.path.join(directory, 'main.dc'), 'w') as f:
+		f.write('int r;\nvoid main()\n{\n\tr = m%d.f%d(1);\n}\n' % (modules - 1, functions - 1))
+
+def main():
+	if len(sys.argv) != 4:
+		print >>sys.stderr, __doc__.strip()
+		return 2
+
+	writeProgram(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]))
+
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
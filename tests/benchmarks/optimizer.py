@@ -0,0 +1,65 @@
+#!/usr/bin/python
+
+'''
+Measures how the whole-program optimizer scales with the size of the
+program. For each count, a program of 10 generated modules with that many
+functions in total is compiled, and the number of instructions and the time
+and number of the optimizer passes are shown. 1000 functions make about 16k
+instructions.
+
+usage: optimizer.py [--compiler ROOT] [FUNCTIONS ...] [-- OPTIONS]
+
+ROOT is the checkout whose compiler is measured, by default this one. It
+needs --time-report-json. FUNCTIONS defaults to 1000 2000 4000 8000. OPTIONS
+are passed on to the compiler, such as --inline-limit 0.
+'''
+
+import optparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+import generate
+from phases import timePhases
+
+benchmarksDirectory = os.path.dirname(os.path.realpath(__file__))
+defaultRoot = os.path.dirname(os.path.dirname(benchmarksDirectory))
+
+modules = 10
+
+def main():
+	parser = optparse.OptionParser(usage='usage: %prog [--compiler ROOT] [FUNCTIONS ...] [-- OPTIONS]')
+	parser.add_option('--compiler', metavar='ROOT', dest='root', help='measure the compiler in ROOT (default: %default)', default=defaultRoot)
+
+	arguments = sys.argv[1:]
+	compilerOptions = []
+
+	if '--' in arguments:
+		compilerOptions = arguments[arguments.index('--') + 1:]
+		arguments = arguments[:arguments.index('--')]
+
+	options, args = parser.parse_args(arguments)
+	counts = [int(arg) for arg in args] or [1000, 2000, 4000, 8000]
+
+	print '%10s %14s %14s %8s' % ('Functions', 'Instructions', 'Optimizer (s)', 'Passes')
+
+	for count in counts:
+		directory = tempfile.mkdtemp()
+
+		try:
+			generate.writeProgram(directory, modules, count // modules)
+			report, messages = timePhases(options.root, directory, compilerOptions)
+		finally:
+			shutil.rmtree(directory)
+
+		passes = [phase for phase in report['phases'] if phase['phase'].startswith('optimizer pass ')]
+		instructions = int(re.search(r'(\d+) instructions\)', messages).group(1))
+
+		print '%10d %14d %14.2f %8d' % (count, instructions, sum(phase['time'] for phase in passes), len(passes))
+
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
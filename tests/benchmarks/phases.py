@@ -0,0 +1,34 @@
+'''
+Runs the compiler of a checkout with --time-report-json, which it has had
+since the time report was added, and returns the report.
+'''
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+def timePhases(root, directory, options=[]):
+	'''
+	Compiles main.dc in directory with the compiler in root and the given
+	command line options. Returns the time report and the compiler messages.
+	'''
+
+	temporaryDirectory = tempfile.mkdtemp()
+	report = os.path.join(temporaryDirectory, 'report.json')
+
+	try:
+		command = [sys.executable, os.path.join(root, 'dcc.py'), '-o', os.path.join(temporaryDirectory, 'output.asm'), '--time-report-json', report] + options
+		messages = subprocess.check_output(command, cwd=directory, stderr=subprocess.STDOUT)
+
+		with open(report) as f:
+			return json.load(f), messages
+	finally:
+		shutil.rmtree(temporaryDirectory)
+
+def phaseTime(report, *names):
+	'''Returns the time of the phases with the given names.'''
+
+	return sum(phase['time'] for phase in report['phases'] if phase['phase'] in names)
@@ -0,0 +1,53 @@
+#!/usr/bin/python
+
+'''
+Measures how identifier registration and lookup scale with the number of
+functions. For each count, a program of 10 generated modules with that many
+functions in total is compiled with --no-opt, and the time of the
+registerIdentifiers and verifyIdentifiers phases, the time of the transform
+phase and the peak memory of the compiler are shown.
+
+usage: symbols.py [--compiler ROOT] [FUNCTIONS ...]
+
+ROOT is the checkout whose compiler is measured, by default this one. It
+needs --time-report-json. FUNCTIONS defaults to 1000 2000 4000.
+'''
+
+import optparse
+import os
+import shutil
+import sys
+import tempfile
+
+import generate
+from phases import timePhases, phaseTime
+
+benchmarksDirectory = os.path.dirname(os.path.realpath(__file__))
+defaultRoot = os.path.dirname(os.path.dirname(benchmarksDirectory))
+
+modules = 10
+
+def main():
+	parser = optparse.OptionParser(usage='usage: %prog [--compiler ROOT] [FUNCTIONS ...]')
+	parser.add_option('--compiler', metavar='ROOT', dest='root', help='measure the compiler in ROOT (default: %default)', default=defaultRoot)
+
+	options, args = parser.parse_args()
+	counts = [int(arg) for arg in args] or [1000, 2000, 4000]
+
+	print '%10s %24s %14s %18s' % ('Functions', 'register+verify (s)', 'transform (s)', 'Peak memory (MB)')
+
+	for count in counts:
+		directory = tempfile.mkdtemp()
+
+		try:
+			generate.writeProgram(directory, modules, count // modules)
+			report, messages = timePhases(options.root, directory, ['--no-opt'])
+		finally:
+			shutil.rmtree(directory)
+
+		print '%10d %24.2f %14.2f %18d' % (count, phaseTime(report, 'registerIdentifiers', 'verifyIdentifiers'), phaseTime(report, 'transform'), report['peakMemory'] // 1024)
+
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
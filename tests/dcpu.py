@@ -0,0 +1,237 @@
+'''
+A DCPU-16 1.1 emulator for the assembly written by dcc, so the tests can run
+compiled programs. Labels are always encoded as a next word and literals up
+to 0x1f in the operand itself, as the compiler counts them.
+'''
+
+import re
+
+registerNames = ('A', 'B', 'C', 'X', 'Y', 'Z', 'I', 'J')
+skipOpcodes = ('IFE', 'IFN', 'IFG', 'IFB')
+
+class EmulatorError(Exception):
+	pass
+
+class Operand(object):
+	'''
+	An operand of an instruction. kind is 'register', 'pointer' ([register]),
+	'offset' ([word + register]), 'address' ([word]), 'literal', or the name
+	of a special value such as 'PUSH'.
+	'''
+
+	def __init__(self, kind, register=None, word=None):
+		self.kind = kind
+		self.register = register
+		self.word = word
+
+	def size(self):
+		if self.kind in ('offset', 'address'):
+			return 1
+		if self.kind == 'literal':
+			return 0 if isinstance(self.word, int) and self.word < 0x20 else 1
+
+		return 0
+
+def parseOperand(text):
+	text = text.strip()
+	upper = text.upper()
+
+	if upper in registerNames:
+		return Operand('register', register=upper)
+	if upper in ('POP', 'PEEK', 'PUSH', 'SP', 'PC', 'O'):
+		return Operand(upper)
+
+	if text.startswith('[') and text.endswith(']'):
+		parts = [part.strip() for part in text[1:-1].split('+')]
+
+		if len(parts) == 1 and parts[0].upper() in registerNames:
+			return Operand('pointer', register=parts[0].upper())
+		if len(parts) == 1:
+			return Operand('address', word=parseWord(parts[0]))
+		if len(parts) == 2:
+			if parts[0].upper() in registerNames:
+				parts.reverse()
+			return Operand('offset', register=parts[1].upper(), word=parseWord(parts[0]))
+
+		raise EmulatorError("Unknown operand '%s'" % text)
+
+	return Operand('literal', word=parseWord(text))
+
+def parseWord(text):
+	'''Returns the number in text, or text itself if it is a label.'''
+
+	if re.match(r'^(0x[0-9a-fA-F]+|[0-9]+)$', text):
+		return int(text, 0) % 0x10000
+
+	return text
+
+class Program(object):
+	'''The instructions of an assembly file, by address, and the addresses of its labels.'''
+
+	def __init__(self, text):
+		self.instructions = {}
+		self.next = {}
+		self.labels = {}
+
+		address = 0
+
+		for line in text.splitlines():
+			line = line.split(';')[0].strip()
+
+			if not line:
+				continue
+
+			if line.startswith(':'):
+				self.labels[line[1:].strip()] = address
+				continue
+
+			match = re.match(r'^(\w+)\s+(.*)$', line)
+			if match is None:
+				raise EmulatorError("Cannot parse '%s'" % line)
+
+			opcode = match.group(1).upper()
+			operands = [parseOperand(operand) for operand in match.group(2).split(',')]
+
+			self.instructions[address] = (opcode, operands)
+			self.next[address] = address + 1 + sum(operand.size() for operand in operands)
+			address = self.next[address]
+
+		self.size = address
+
+class Emulator(object):
+	'''Runs a Program from address 0, with the code loaded at the start of memory.'''
+
+	def __init__(self, program):
+		self.program = program
+		self.memory = [0] * 0x10000
+		self.registers = dict((name, 0) for name in registerNames)
+		self.sp = 0
+		self.pc = 0
+		self.o = 0
+		self.steps = 0
+
+	def word(self, word):
+		if isinstance(word, int):
+			return word
+		if word not in self.program.labels:
+			raise EmulatorError("Label '%s' not found" % word)
+
+		return self.program.labels[word]
+
+	def address(self, operand):
+		'''Returns the memory address of operand, or None if it is not in memory.'''
+
+		if operand.kind == 'pointer':
+			return self.registers[operand.register]
+		if operand.kind == 'offset':
+			return (self.word(operand.word) + self.registers[operand.register]) % 0x10000
+		if operand.kind == 'address':
+			return self.word(operand.word)
+		if operand.kind == 'POP':
+			address = self.sp
+			self.sp = (self.sp + 1) % 0x10000
+			return address
+		if operand.kind == 'PEEK':
+			return self.sp
+		if operand.kind == 'PUSH':
+			self.sp = (self.sp - 1) % 0x10000
+			return self.sp
+
+		return None
+
+	def read(self, operand, address):
+		if address is not None:
+			return self.memory[address]
+		if operand.kind == 'register':
+			return self.registers[operand.register]
+		if operand.kind == 'literal':
+			return self.word(operand.word)
+
+		return getattr(self, operand.kind.lower())
+
+	def write(self, operand, address, value):
+		value %= 0x10000
+
+		if address is not None:
+			self.memory[address] = value
+		elif operand.kind == 'register':
+			self.registers[operand.register] = value
+		elif operand.kind in ('SP', 'PC', 'O'):
+			setattr(self, operand.kind.lower(), value)
+
+	def step(self):
+		if self.pc not in self.program.instructions:
+			raise EmulatorError('No instruction at 0x%04x' % self.pc)
+
+		opcode, operands = self.program.instructions[self.pc]
+		self.pc = self.program.next[self.pc]
+		self.steps += 1
+
+		if opcode == 'JSR':
+			target = self.read(operands[0], self.address(operands[0]))
+			self.sp = (self.sp - 1) % 0x10000
+			self.memory[self.sp] = self.pc
+			self.pc = target
+			return
+
+		a, b = operands
+		addressA = self.address(a)
+		addressB = self.address(b)
+		left = self.read(a, addressA)
+		right = self.read(b, addressB)
+
+		if opcode == 'SET':
+			self.write(a, addressA, right)
+		elif opcode == 'ADD':
+			self.o = 1 if left + right > 0xffff else 0
+			self.write(a, addressA, left + right)
+		elif opcode == 'SUB':
+			self.o = 0xffff if left < right else 0
+			self.write(a, addressA, left - right)
+		elif opcode == 'MUL':
+			self.o = (left * right >> 16) % 0x10000
+			self.write(a, addressA, left * right)
+		elif opcode == 'DIV':
+			self.o = 0 if right == 0 else ((left << 16) // right) % 0x10000
+			self.write(a, addressA, 0 if right == 0 else left // right)
+		elif opcode == 'MOD':
+			self.write(a, addressA, 0 if right == 0 else left % right)
+		elif opcode == 'SHL':
+			self.o = (left << right >> 16) % 0x10000
+			self.write(a, addressA, left << right)
+		elif opcode == 'SHR':
+			self.o = ((left << 16) >> right) % 0x10000
+			self.write(a, addressA, left >> right)
+		elif opcode == 'AND':
+			self.write(a, addressA, left & right)
+		elif opcode == 'BOR':
+			self.write(a, addressA, left | right)
+		elif opcode == 'XOR':
+			self.write(a, addressA, left ^ right)
+		elif opcode in skipOpcodes:
+			if opcode == 'IFE':
+				passed = left == right
+			elif opcode == 'IFN':
+				passed = left != right
+			elif opcode == 'IFG':
+				passed = left > right
+			else:
+				passed = left & right != 0
+
+			if not passed:
+				self.pc = self.program.next[self.pc]
+		else:
+			raise EmulatorError("Unknown opcode '%s'" % opcode)
+
+	def run(self, stopLabel='mainexited', limit=1000000):
+		'''Runs until the program reaches stopLabel. Returns False if it takes more than limit instructions.'''
+
+		stop = self.program.labels[stopLabel]
+
+		while self.pc != stop:
+			if self.steps >= limit:
+				return False
+
+			self.step()
+
+		return True
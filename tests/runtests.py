@@ -0,0 +1,106 @@
+#!/usr/bin/python
+
+'''
+Compiles each program in tests/programs with and without optimizations, runs
+both in the emulator, and compares the words the programs leave from
+resultsStart to resultsEnd. The programs write their results there, as the
+data fields are at other addresses in each build.
+
+usage: runtests.py [program ...]
+'''
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from dcpu import Program, Emulator, EmulatorError
+
+testsDirectory = os.path.dirname(os.path.realpath(__file__))
+programsDirectory = os.path.join(testsDirectory, 'programs')
+compilerPath = os.path.join(os.path.dirname(testsDirectory), 'dcc.py')
+
+resultsStart = 0x8000
+resultsEnd = 0xc000
+
+builds = [
+	('optimized', []),
+	('unoptimized', ['--no-opt']),
+]
+
+def compile(directory, options, output):
+	'''Compiles main.dc in directory to output. Returns the messages of the compiler if it fails.'''
+
+	process = subprocess.Popen([sys.executable, compilerPath, '-o', output] + options, cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+	messages = process.communicate()[0]
+
+	if process.returncode != 0:
+		return messages
+
+	return None
+
+def run(path):
+	'''Returns the results of the program in path, or raises EmulatorError.'''
+
+	with open(path) as f:
+		emulator = Emulator(Program(f.read()))
+
+	if not emulator.run():
+		raise EmulatorError('the program did not finish')
+
+	return emulator.memory[resultsStart:resultsEnd]
+
+def testProgram(name, temporaryDirectory):
+	'''Returns a list of the problems found in the program.'''
+
+	directory = os.path.join(programsDirectory, name)
+	results = []
+
+	for build, options in builds:
+		output = os.path.join(temporaryDirectory, '%s-%s.asm' % (name, build))
+
+		messages = compile(directory, options, output)
+		if messages is not None:
+			return ['%s build failed:\n%s' % (build, messages)]
+
+		try:
+			results.append(run(output))
+		except EmulatorError as e:
+			return ['%s build: %s' % (build, e)]
+
+	problems = []
+
+	for address in xrange(resultsEnd - resultsStart):
+		values = [result[address] for result in results]
+
+		if len(set(values)) > 1:
+			problems.append('[0x%04x]: ' % (resultsStart + address) + ', '.join('%s %d' % (build, value) for (build, options), value in zip(builds, values)))
+
+	return problems
+
+def main():
+	names = sys.argv[1:] or sorted(os.listdir(programsDirectory))
+	temporaryDirectory = tempfile.mkdtemp()
+	failed = 0
+
+	try:
+		for name in names:
+			problems = testProgram(name, temporaryDirectory)
+
+			if problems:
+				failed += 1
+				print '%s: FAILED' % name
+				for problem in problems:
+					print '  ' + problem
+			else:
+				print '%s: ok' % name
+	finally:
+		shutil.rmtree(temporaryDirectory)
+
+	print '%d of %d programs failed' % (failed, len(names))
+
+	return 1 if failed else 0
+
+if __name__ == '__main__':
+	sys.exit(main())